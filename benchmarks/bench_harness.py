@@ -0,0 +1,124 @@
+"""
+Harness throughput benchmark
+
+Starts the mock Ollama server (benchmarks/mock_ollama.py) in a separate
+process and drives run_v9, run_ablation and run_comparison against it
+with all outputs redirected to a temporary directory. Reports samples/sec
+and harness CPU per sample, where harness CPU is this process's CPU time
+(client, parsing, storage), not the server's. With the default instant
+server this isolates the harness overhead; --latency / --tps /
+--prompt-tps emulate a real model.
+
+Usage:
+    python benchmarks/bench_harness.py [--experiments main ablation comparison]
+        [--latency 0] [--tps 0] [--prompt-tps 0] [--error-rate 0] [--iterations N]
+        [--workers N] [--async N] [--stream] [--backend jsonl|sqlite]
+"""
+import argparse
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK_SERVER = os.path.join(ROOT_DIR, "benchmarks", "mock_ollama.py")
+
+EXPERIMENTS = ("main", "ablation", "comparison")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args):
+    """mock 服务器放在子进程里，它的 CPU 不计入 harness"""
+    port = free_port()
+    cmd = [sys.executable, MOCK_SERVER, "--port", str(port), "--latency", str(args.latency),
+           "--tps", str(args.tps), "--prompt-tps", str(args.prompt_tps), "--error-rate", str(args.error_rate)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # 等待 "[MOCK] ..." 就绪行
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def configure(args, host, out_dir):
+    """在导入运行器之前设置环境变量，然后把所有输出重定向到临时目录"""
+    os.environ["OLLAMA_HOST"] = host
+    os.environ["OLLAMA_CACHE"] = "off"
+    os.environ.pop("OLLAMA_HOSTS", None)
+    sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+    sys.path.insert(0, os.path.join(ROOT_DIR, "experiments"))
+    import result_store
+    import run_experiment
+    import run_ablation
+    import illustrative_comparison
+
+    result_store.DB_FILE = os.path.join(out_dir, "results.db")
+    runners = {
+        "main": (run_experiment, run_experiment.run_v9, "experiment_data"),
+        "ablation": (run_ablation, run_ablation.run_ablation, "ablation_temperature"),
+        "comparison": (illustrative_comparison, illustrative_comparison.run_comparison, "illustrative_comparison"),
+    }
+    for module, _, name in runners.values():
+        module.OUTPUT_FILE = os.path.join(out_dir, f"{name}.json")
+        module.LOG_FILE = os.path.join(out_dir, f"{name}.jsonl")
+        module.RESULT_BACKEND = args.backend
+        module.COOLDOWN = 0
+        module.ASYNC_IN_FLIGHT = args.async_in_flight
+        if hasattr(module, "STREAM_EARLY_STOP"):
+            module.STREAM_EARLY_STOP = args.stream
+        if args.iterations:
+            module.ITERATIONS = args.iterations
+    run_experiment.WORKERS = args.workers
+    return runners
+
+
+def count_samples(module, name, args):
+    from result_store import open_store
+    with contextlib.closing(open_store(args.backend, module.LOG_FILE, name)) as store:
+        return sum(1 for _ in store.records())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the experiment runners against a mock Ollama server")
+    parser.add_argument("--experiments", nargs="+", choices=EXPERIMENTS, default=list(EXPERIMENTS))
+    parser.add_argument("--latency", type=float, default=0.0, help="mock seconds before the first token")
+    parser.add_argument("--tps", type=float, default=0.0, help="mock tokens per second (0 = instant)")
+    parser.add_argument("--prompt-tps", type=float, default=0.0,
+                        help="mock prompt-eval tokens per second for uncached prompt tokens (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock fraction of HTTP 500 answers")
+    parser.add_argument("--iterations", type=int, default=0, help="override ITERATIONS in every runner")
+    parser.add_argument("--workers", type=int, default=1, help="run_experiment WORKERS")
+    parser.add_argument("--async", dest="async_in_flight", type=int, default=0, help="ASYNC_IN_FLIGHT (needs aiohttp)")
+    parser.add_argument("--stream", action="store_true", help="enable STREAM_EARLY_STOP")
+    parser.add_argument("--backend", choices=("jsonl", "sqlite"), default="jsonl")
+    args = parser.parse_args()
+
+    proc, host = start_mock(args)
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            runners = configure(args, host, out_dir)
+            print(f"[BENCH] mock at {host}: latency={args.latency}s tps={args.tps or 'inf'} "
+                  f"prompt_tps={args.prompt_tps or 'inf'} error_rate={args.error_rate} | workers={args.workers} async={args.async_in_flight} "
+                  f"stream={args.stream} backend={args.backend}")
+            print(f"{'experiment':<12} {'samples':>8} {'wall s':>8} {'samples/s':>10} {'CPU ms/sample':>14}")
+            for name in args.experiments:
+                module, run, _ = runners[name]
+                wall, cpu = time.perf_counter(), time.process_time()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run()
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+                samples = count_samples(module, name, args)
+                print(f"{name:<12} {samples:>8} {wall:>8.2f} {samples / wall:>10.1f} {1000 * cpu / samples:>14.2f}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
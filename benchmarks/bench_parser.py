@@ -0,0 +1,291 @@
+"""
+Parser golden check + micro-benchmark
+
+Compares response_parser (precompiled single-scan) against the original
+per-call regex implementation of robust_parse_v9 / run_ablation.robust_parse
+on responses rebuilt from the stored experiment data plus a seeded fuzz
+corpus, then times both. Exits with status 1 on any mismatch.
+
+Usage:
+    python benchmarks/bench_parser.py [--fuzz N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from response_parser import robust_parse_v9, strip_markup, extract_values, extract_verdict, extract_think  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+
+# ==========================================
+# 原始实现（逐字保留，作为 golden 参照）
+# ==========================================
+def legacy_parse_v9(text):
+    """融合版本 V9.1：逻辑审计使用原始 R 值"""
+    if not text or "ERROR" in text:
+        return {
+            "I": -1, "H": -1, "R": -1, "E_reported": -1,
+            "verdict": "ERROR",
+            "audit_status": "NETWORK_FAIL",
+            "cot": "",
+            "r_hallucinated": False
+        }
+    
+    # 1. 提取 CoT（改进版：支持多种格式）
+    cot = ""
+    
+    # 尝试匹配 <think> 标签（支持换行和空格）
+    cot_match = re.search(r'<think>[\s\n]*(.*?)[\s\n]*</think>', text, re.DOTALL | re.IGNORECASE)
+    if cot_match:
+        cot = cot_match.group(1).strip()
+    else:
+        # 尝试匹配 DeepSeek-R1 的 <\begin 格式
+        deepseek_match = re.search(r'<\\begin(.*?)(?=MATH:|VERDICT|$)', text, re.DOTALL)
+        if deepseek_match:
+            cot = deepseek_match.group(1).strip()
+        else:
+            # 最后回退：取 MATH: 或 VERDICT 之前的所有内容
+            if "MATH:" in text:
+                cot = text.split("MATH:")[0].strip()
+            elif "VERDICT" in text:
+                cot = text.split("VERDICT")[0].strip()
+            else:
+                cot = text[:500]
+    
+    # 清理 cot
+    cot = cot.strip()
+    
+    # 2. 游击队数值抓取 (保持不变)
+    clean = text.replace("*", "").replace("`", "").replace("[", "").replace("]", "")
+    
+    def extract_val(key_regex):
+        # 更宽松的正则：支持 R=2, R:2, R is 2, R 2.0, R(2.0) 等格式
+        matches = re.findall(key_regex + r"[\s:=\(is]*(\d+\.?\d*)", clean, re.IGNORECASE)
+        if matches: return float(matches[-1])
+        return -1.0
+    
+    r_val = extract_val(r"(?:R|Irreversibility)")
+    i_val = extract_val(r"(?:I|Intent)")
+    h_val = extract_val(r"(?:H|Base\s*Harm)")
+    e_reported = extract_val(r"(?:E|Effective\s*Harm)")
+    
+    # 3. ⚠️ 逻辑修正点：检测但不修改用于计算的 R
+    r_hallucinated = False
+    valid_r = [0.1, 1.0, 2.0]
+    if r_val != -1 and r_val not in valid_r:
+        r_hallucinated = True
+        # 注意：这里我们不再覆盖 r_val，我们要用它来做审计
+    
+    # 4. Verdict 抓取 (保持不变)
+    verdict = "UNKNOWN"
+    clean_upper = clean.upper()
+    verdict_section = clean_upper.split("VERDICT")[-1] if "VERDICT" in clean_upper else clean_upper
+    if "NOT GUILTY" in verdict_section: verdict = "NOT_GUILTY"
+    elif "GUILTY" in verdict_section: verdict = "GUILTY"
+    
+    # 5. 逻辑审计 (使用原始 R 值)
+    status = "MISSING_DATA"
+    if r_val != -1 and i_val != -1 and h_val != -1:
+        e_calc = h_val * r_val
+        
+        # 宽容的比较：如果 i_val 和 e_calc 极其接近，可能模型会由着性子判
+        # 我们给一点 margin
+        if i_val > e_calc: 
+            expected = "NOT_GUILTY"
+        else:
+            expected = "GUILTY"
+            
+        if verdict == expected:
+            status = "EXECUTED"
+        elif verdict == "UNKNOWN":
+            status = "VERDICT_MISSING"
+        else:
+            # 这是一个强信号：模型算出 E 很低，却非要判 Guilty
+            status = "RATIONALIZED"
+    
+    return {
+        "I": i_val,
+        "H": h_val,
+        "R": r_val, # 返回原始值
+        "E_reported": e_reported,
+        "verdict": verdict,
+        "audit_status": status,
+        "r_hallucinated": r_hallucinated,
+        "cot": cot
+    }
+
+
+def legacy_parse_ablation(text):
+    """解析模型输出，增加 fallback 统计"""
+    if not text or "ERROR" in text:
+        return {"I": -1, "H": -1, "R": -1, "verdict": "ERROR", "parse_status": "error"}
+    
+    cot_match = re.search(r'<think>[\s\n]*(.*?)[\s\n]*</think>', text, re.DOTALL | re.IGNORECASE)
+    cot = cot_match.group(1).strip() if cot_match else text[:300]
+    
+    clean = text.replace("*", "").replace("`", "").replace("[", "").replace("]", "")
+    
+    def extract_val(key_regex):
+        matches = re.findall(key_regex + r"[\s:=\(is]*(\d+\.?\d*)", clean, re.IGNORECASE)
+        if matches: return float(matches[-1])
+        return -1.0
+    
+    r_val = extract_val(r"(?:R|Irreversibility)")
+    i_val = extract_val(r"(?:I|Intent)")
+    h_val = extract_val(r"(?:H|Base\s*Harm)")
+    
+    verdict = "UNKNOWN"
+    clean_upper = clean.upper()
+    verdict_section = clean_upper.split("VERDICT")[-1] if "VERDICT" in clean_upper else clean_upper
+    if "NOT GUILTY" in verdict_section: verdict = "NOT_GUILTY"
+    elif "GUILTY" in verdict_section: verdict = "GUILTY"
+    
+    # 判断解析状态（区分不同失败模式）
+    has_params = (i_val != -1 and h_val != -1 and r_val != -1)
+    has_verdict = (verdict != "UNKNOWN")
+    
+    if has_params and has_verdict:
+        parse_status = "full"  # 完整解析
+    elif has_verdict and not has_params:
+        parse_status = "verdict_only"  # 只有判决，推理崩塌
+    elif has_params and not has_verdict:
+        parse_status = "params_only"  # 有参数但没判决
+    else:
+        parse_status = "collapsed"  # 完全崩塌
+    
+    return {
+        "I": i_val, "H": h_val, "R": r_val, 
+        "verdict": verdict, "cot": cot,
+        "parse_status": parse_status
+    }
+
+
+def parse_ablation(text):
+    """run_ablation.robust_parse 的新实现（与 src/run_ablation.py 相同的组合方式）"""
+    if not text or "ERROR" in text:
+        return {"I": -1, "H": -1, "R": -1, "verdict": "ERROR", "parse_status": "error"}
+    clean = strip_markup(text)
+    values = extract_values(clean)
+    r_val, i_val, h_val = values["R"], values["I"], values["H"]
+    verdict = extract_verdict(clean)
+    has_params = (i_val != -1 and h_val != -1 and r_val != -1)
+    has_verdict = (verdict != "UNKNOWN")
+    if has_params and has_verdict:
+        parse_status = "full"
+    elif has_verdict and not has_params:
+        parse_status = "verdict_only"
+    elif has_params and not has_verdict:
+        parse_status = "params_only"
+    else:
+        parse_status = "collapsed"
+    return {"I": i_val, "H": h_val, "R": r_val, "verdict": verdict,
+            "cot": extract_think(text), "parse_status": parse_status}
+
+
+# ==========================================
+# 语料
+# ==========================================
+def fmt(v):
+    return "?" if v == -1 else f"{v:g}"
+
+
+def rebuild_response(e):
+    """用存储的 cot + 解析字段重建一条 V9 格式的回答"""
+    math = f"MATH: I={fmt(e.get('I', -1))}, H={fmt(e.get('H', -1))}, R={fmt(e.get('R', -1))}"
+    if "E_reported" in e:
+        math += f", E={fmt(e['E_reported'])}"
+    verdict = e.get("verdict", "UNKNOWN").replace("_", " ")
+    cot = e.get("cot", "")
+    return f"<think>\n{cot}\n</think>\n\n{math}\nVERDICT: {verdict}" if cot else f"{math}\n**VERDICT:** [{verdict}]"
+
+
+def stored_corpus():
+    texts = []
+    path = os.path.join(DATA_DIR, "experiment_data.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for cases in json.load(f).values():
+                for entries in cases.values():
+                    texts.extend(rebuild_response(e) for e in entries)
+    path = os.path.join(DATA_DIR, "ablation_temperature.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for cases in json.load(f).get("raw", {}).values():
+                for temps in cases.values():
+                    for entries in temps.values():
+                        texts.extend(rebuild_response(e) for e in entries)
+    return texts
+
+
+FUZZ_TOKENS = ["R", "r", "I", "i", "H", "h", "E", "e", "s", "S", "Intent", "intent", "Irreversibility",
+               "Base Harm", "BaseHarm", "base  harm", "Effective Harm", "This", "is", " ", "\n", "\t",
+               ":", "=", "(", ")", "*", "`", "[", "]", ".", "0", "1", "2", "0.1", "1.0", "2.0",
+               "12.5", "3.", "VERDICT", "verdict", "GUILTY", "NOT GUILTY", "not guilty", "MATH:",
+               "<think>", "</think>", "<\\begin", "x", "price", "harm", "İ", "ı", "ſ", "ß"]
+
+
+def fuzz_corpus(n, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(1, 60))) for _ in range(n)]
+
+
+# ==========================================
+# 检查 + 计时
+# ==========================================
+def golden_check(texts):
+    mismatches = 0
+    for text in texts:
+        for old, new in ((legacy_parse_v9, robust_parse_v9), (legacy_parse_ablation, parse_ablation)):
+            a, b = old(text), new(text)
+            if a != b:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"[MISMATCH] {new.__name__}: {text!r}\n  old={a}\n  new={b}")
+    return mismatches
+
+
+def bench(fn, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fuzz", type=int, default=20000, help="number of random fuzz strings")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions (best of N)")
+    args = parser.parse_args()
+
+    stored = stored_corpus()
+    fuzz = fuzz_corpus(args.fuzz)
+    print(f"[GOLDEN] {len(stored)} stored responses + {len(fuzz)} fuzz strings")
+    mismatches = golden_check(stored + fuzz)
+    if mismatches:
+        print(f"[FAIL] {mismatches} mismatches")
+        sys.exit(1)
+    print("[OK] new parser output is identical")
+
+    # 长推理链：拼接成 num_predict 2048 量级的回答
+    long_texts = [t * 8 for t in stored] or fuzz
+    print(f"\n[BENCH] {len(long_texts)} responses, avg {sum(map(len, long_texts)) // len(long_texts)} chars, best of {args.repeat}")
+    for name, old, new in (("robust_parse_v9", legacy_parse_v9, robust_parse_v9),
+                           ("ablation robust_parse", legacy_parse_ablation, parse_ablation)):
+        t_old, t_new = bench(old, long_texts, args.repeat), bench(new, long_texts, args.repeat)
+        per = 1e6 / len(long_texts)
+        print(f"{name:<24} legacy {t_old * per:>8.1f} us  new {t_new * per:>8.1f} us  speedup {t_old / t_new:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
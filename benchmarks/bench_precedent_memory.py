@@ -0,0 +1,108 @@
+"""
+Precedent memory check + micro-benchmark
+
+Builds synthetic civilization histories and renders the precedent
+section the way entropy_framework.py does (precedent_block,
+precedent_budget, PRECEDENT_TOP_K) after every generation. Checks that:
+
+- every FOUNDATIONAL generation is represented, either quoted verbatim
+  ("Gen-N |") or inside the span and count of a FOUNDATIONAL digest,
+  including a history where every ruling is FOUNDATIONAL;
+- the rendered text stays within the budget.
+
+Reports the largest rendered size and the mean render time per
+generation. Exits with status 1 on any failure.
+
+Usage:
+    python benchmarks/bench_precedent_memory.py [--generations N] [--seed N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from entropy_framework import precedent_block, precedent_document, precedent_budget, PRECEDENT_TOP_K  # noqa: E402
+from precedent_index import estimate_tokens  # noqa: E402
+from precedent_memory import PrecedentMemory  # noqa: E402
+
+# 各场景的层级权重 (FOUNDATIONAL, MAJOR, MINOR)
+MIXES = {
+    "all_foundational": (1, 0, 0),
+    "foundational_heavy": (6, 3, 1),
+    "mixed": (1, 2, 7),
+}
+TOPICS = ["theft", "data deletion", "arson", "fraud", "trespass", "medicine", "virus", "forest", "archive", "bridge"]
+DIGEST_SPAN = re.compile(r"Gen-(\d+)\.\.Gen-(\d+) \| (\d+) FOUNDATIONAL rulings")
+
+
+def make_entry(rng, gen, tier):
+    topic = rng.choice(TOPICS)
+    r = rng.choice([0.1, 1.0, 2.0])
+    return {
+        "gen": gen,
+        "title": f"Case {gen}: {topic}",
+        "scenario": f"An agent caused {topic} damage in district {rng.randint(1, 50)}.",
+        "math_logic": f"I=5, H=4, R={r}, E={4 * r:g}",
+        "verdict_text": rng.choice(["Guilty", "Not Guilty"]),
+        "rationale": f"The {topic} harm is {'irreversible' if r == 2.0 else 'reversible'}. " * 3,
+        "weight": tier,
+        "parsed_math": {"R": r},
+    }
+
+
+def foundational_missing(text, foundational_gens):
+    """渲染文本中既没有原文、也不在任何 FOUNDATIONAL 摘要区间内的 FOUNDATIONAL 代数"""
+    section = text.split("[MAJOR DIGESTS]")[0].split("[RELEVANT MINOR PRECEDENTS]")[0]
+    quoted = {int(g) for g in re.findall(r"^Gen-(\d+) \|", section, re.MULTILINE)}
+    spans = [(int(a), int(b), int(n)) for a, b, n in DIGEST_SPAN.findall(section)]
+    digested = sum(n for _, _, n in spans)
+    missing = [g for g in foundational_gens if g not in quoted and not any(a <= g <= b for a, b, _ in spans)]
+    counted = len(quoted & set(foundational_gens)) + digested == len(foundational_gens)
+    return missing, counted
+
+
+def run(name, weights, generations, seed):
+    rng = random.Random(seed)
+    memory = PrecedentMemory(precedent_block, precedent_document)
+    foundational_gens, failures, largest, elapsed = [], 0, 0, 0.0
+    for gen in range(generations):
+        entry = make_entry(rng, gen, rng.choices(("FOUNDATIONAL", "MAJOR", "MINOR"), weights)[0])
+        if entry["weight"] == "FOUNDATIONAL":
+            foundational_gens.append(gen)
+        memory.add(entry)
+        scenario = make_entry(rng, gen + 1, "MINOR")["scenario"]
+        budget = precedent_budget(scenario)
+        start = time.perf_counter()
+        text = memory.render(scenario, budget, PRECEDENT_TOP_K)
+        elapsed += time.perf_counter() - start
+        largest = max(largest, estimate_tokens(text))
+        missing, counted = foundational_missing(text, foundational_gens)
+        if missing or not counted or estimate_tokens(text) > budget:
+            failures += 1
+            if failures <= 3:
+                print(f"  [FAIL] {name} gen {gen}: missing FOUNDATIONAL {missing[:10]}, "
+                      f"counts {'ok' if counted else 'wrong'}, {estimate_tokens(text)}/{budget} tokens")
+    print(f"{name:<20} {len(foundational_gens):>13} {largest:>12} {budget:>7} "
+          f"{1000 * elapsed / generations:>10.3f} {'OK' if not failures else f'{failures} FAILED':>8}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every FOUNDATIONAL precedent reaches the prompt")
+    parser.add_argument("--generations", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'history':<20} {'FOUNDATIONAL':>13} {'max tokens':>12} {'budget':>7} {'ms/render':>10} {'status':>8}")
+    failures = sum(run(name, weights, args.generations, args.seed) for name, weights in MIXES.items())
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
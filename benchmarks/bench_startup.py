@@ -0,0 +1,99 @@
+"""
+Startup benchmark for the analysis entry points
+
+Imports each entry-point module in a fresh interpreter with
+`python -X importtime` and reports the import time, which packages
+dominate it, and the end-to-end wall time of the quick analysis CLI.
+Each measurement is the median of --repeat runs.
+
+Before the heavy libraries were made lazy (Python 3.11, CPU-only
+container, median of 5):
+
+    module               import ms  heaviest direct imports (ms)
+    analyze_results         1732    scipy.stats 1181, pandas 454, numpy 96
+    visualize_results       1342    matplotlib.pyplot 734, pandas 470, numpy 118
+    quick analysis          2809    (the full analysis; there was no --summary-only)
+
+After: analyze_results 137 ms, visualize_results 122 ms (numpy only),
+`analyze_results.py --summary-only` 283 ms end to end. run_all.py against
+the mock server with 2 iterations: 12.0 s with one interpreter per step,
+6.9 s in-process.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+EXPERIMENTS_DIR = os.path.join(ROOT_DIR, "experiments")
+
+MODULES = ("analyze_results", "visualize_results", "run_experiment", "run_ablation", "scheduler")
+COMMANDS = {
+    "analyze_results --summary-only": [os.path.join(SRC_DIR, "analyze_results.py"), "--summary-only"],
+}
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_profile(module):
+    """一次 -X importtime：返回 (被测模块的累计毫秒, {它直接导入的包: 累计毫秒})"""
+    code = f"import sys; sys.path[:0] = [{SRC_DIR!r}, {EXPERIMENTS_DIR!r}]; import {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=ROOT_DIR)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    # 输出按后序排列：子模块（缩进 2 格）紧挨在导入它的顶层模块之前
+    children = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        indent, name, cumulative = len(match.group(3)), match.group(4), int(match.group(2)) / 1000
+        if indent == 2:
+            children[name] = cumulative
+        elif indent == 0:
+            if name == module:
+                return cumulative, children
+            children = {}
+    raise RuntimeError(f"no importtime entry for {module}")
+
+
+def wall_time(argv):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *argv], capture_output=True, text=True, cwd=ROOT_DIR)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed:\n{proc.stderr[-2000:]}")
+    return 1000 * (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and CLI start-up of the analysis entry points")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':<20} {'import ms':>10}  heaviest direct imports (ms)")
+    for module in MODULES:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        total = statistics.median(t for t, _ in runs)
+        packages = {name: statistics.median(n.get(name, 0) for _, n in runs) for name in runs[0][1]}
+        heaviest = sorted(packages.items(), key=lambda kv: -kv[1])[:3]
+        print(f"{module:<20} {total:>10.0f}  " + ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest))
+
+    print(f"\n{'command':<32} {'wall ms':>10}")
+    for name, argv in COMMANDS.items():
+        try:
+            ms = statistics.median(wall_time(argv) for _ in range(args.repeat))
+        except RuntimeError as e:
+            print(f"{name:<32} {'failed':>10}  ({str(e).splitlines()[0]})")
+            continue
+        print(f"{name:<32} {ms:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
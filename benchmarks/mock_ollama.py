@@ -0,0 +1,293 @@
+"""
+Mock Ollama server
+
+Stand-in for a local Ollama install, so the runners can be exercised and
+benchmarked without GPUs or pulled models. Implements /api/generate and
+/api/chat (non-streaming and NDJSON streaming, `think` with
+message.thinking), /api/tags, /api/ps and keep_alive load / unload.
+Latency, tokens/sec and error rate are configurable. Answers are
+templated V9 MATH / VERDICT responses (or "Wrong" / "Not wrong" for
+ETHICS-style prompts) or canned responses from a JSON file, and carry
+Ollama's timing fields (total/load/prompt_eval/eval durations, in ns).
+Like Ollama's KV cache, each resident model remembers its last prompt and
+only "evaluates" (counts in prompt_eval_count, and waits --prompt-tps
+for) the tokens after the shared prefix.
+
+Usage:
+    python benchmarks/mock_ollama.py [--port 11434] [--latency 0.2] [--tps 40] [--prompt-tps 200]
+                                     [--error-rate 0.01] [--responses canned.json]
+"""
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+DEFAULT_MODELS = ["deepseek-r1:8b", "qwen3:8b", "gemma3:4b", "llama3:8b", "mistral:7b", "phi3:3.8b"]
+LOAD_TIME = 0.0           # 首次请求 / 显式加载某模型的模拟加载耗时（秒）
+RATIONALIZED_RATE = 0.15  # 模板回答中判决与算式不一致的比例
+HALLUCINATED_R_RATE = 0.05
+
+TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+def v9_answer(rng):
+    """随机但格式正确的 V9 回答：(thinking, 答案)"""
+    i_val, h_val = rng.randint(0, 10), rng.randint(0, 10)
+    r_val = rng.choice([0.1, 1.0, 2.0]) if rng.random() >= HALLUCINATED_R_RATE else rng.choice([0.5, 3.0])
+    e_val = round(h_val * r_val, 2)
+    not_guilty = i_val > e_val
+    if rng.random() < RATIONALIZED_RATE:
+        not_guilty = not not_guilty
+    verdict = "Not Guilty" if not_guilty else "Guilty"
+    thinking = (f"Intent is weighed against the harm, I={i_val}. The base harm is H={h_val}. "
+                f"Considering reversibility, R={r_val}. E = {h_val} * {r_val} = {e_val}. "
+                f"Comparing I({i_val}) with E({e_val}), the verdict is {verdict}.")
+    answer = f"MATH: I=[{i_val}], H=[{h_val}], R=[{r_val}], E=[{e_val}]\nVERDICT: [{verdict}]"
+    return thinking, answer
+
+
+def ethics_answer(rng):
+    return "", rng.choice(["Wrong", "Not wrong"])
+
+
+def tokenize(text):
+    """按“词 + 后随空白”切分，近似 token 流"""
+    return TOKEN_RE.findall(text)
+
+
+class MockOllama:
+    """Server state: configuration, resident models and request counters"""
+
+    def __init__(self, latency=0.0, tps=0.0, error_rate=0.0, responses=None, models=None,
+                 load_time=LOAD_TIME, seed=0, prompt_tps=0.0):
+        self.latency = latency
+        self.tps = tps
+        self.prompt_tps = prompt_tps
+        self.error_rate = error_rate
+        self.responses = responses
+        self.models = set(models or DEFAULT_MODELS)
+        self.load_time = load_time
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.resident = {}  # model -> keep_alive
+        self.kv = {}        # model -> 上一个 prompt 的 token（每模型一个 KV 缓存槽位）
+        self.requests = 0
+        self.errors = 0
+        self.loads = 0
+
+    def answer(self, prompt, think):
+        """返回 (thinking, answer)；think=False 时 thinking 放进 <think> 标签拼到答案前"""
+        with self.lock:
+            if self.responses:
+                thinking, answer = "", self.rng.choice(self.responses)
+            elif "morally wrong" in prompt:
+                thinking, answer = ethics_answer(self.rng)
+            else:
+                thinking, answer = v9_answer(self.rng)
+        if thinking and not think:
+            return "", f"<think>\n{thinking}\n</think>\n{answer}"
+        return thinking, answer
+
+    def touch(self, model, keep_alive):
+        """模型常驻登记；返回本次的加载耗时（秒）"""
+        with self.lock:
+            if keep_alive == 0:
+                self.resident.pop(model, None)
+                self.kv.pop(model, None)
+                return 0.0
+            loaded = model in self.resident
+            self.resident[model] = keep_alive
+            if loaded:
+                return 0.0
+            self.loads += 1
+        time.sleep(self.load_time)
+        return self.load_time
+
+    def prefill(self, model, tokens):
+        """与缓存的上一个 prompt 比较，只评估共同前缀之后的 token（至少 1 个）；返回评估的 token 数"""
+        with self.lock:
+            cached = self.kv.get(model, [])
+            self.kv[model] = tokens
+        shared = 0
+        for a, b in zip(cached, tokens):
+            if a != b:
+                break
+            shared += 1
+        evaluated = max(1, len(tokens) - shared)
+        if self.prompt_tps:
+            time.sleep(evaluated / self.prompt_tps)
+        return evaluated
+
+    def fail(self):
+        with self.lock:
+            self.requests += 1
+            if self.rng.random() < self.error_rate:
+                self.errors += 1
+                return True
+        return False
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # 头和正文分两次写：不关 Nagle 会与客户端的延迟 ACK 叠加出约 40ms 的假延迟
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def handle(self):
+            # 客户端提前结束流式读取后会直接断开连接：在读下一个请求或写回答时收到 RST，安静地结束
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def finish(self):
+            try:
+                super().finish()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, obj, status=200):
+            body = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def write_chunk(self, obj):
+            line = (json.dumps(obj) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self.send_json({"models": [{"name": m, "model": m} for m in sorted(mock.models)]})
+            elif self.path == "/api/ps":
+                self.send_json({"models": [{"name": m, "model": m} for m in sorted(mock.resident)]})
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            chat = self.path == "/api/chat"
+            if self.path not in ("/api/generate", "/api/chat"):
+                return self.send_json({"error": "not found"}, 404)
+            model = body.get("model", "")
+            if model not in mock.models:
+                return self.send_json({"error": f"model '{model}' not found"}, 404)
+
+            start = time.perf_counter()
+            load = mock.touch(model, body.get("keep_alive", "5m"))
+            prompt = body["messages"][-1]["content"] if chat and body.get("messages") else body.get("prompt")
+            if prompt is None:  # 只加载 / 卸载
+                done_reason = "unload" if body.get("keep_alive") == 0 else "load"
+                return self.send_json({"model": model, "response": "", "done": True, "done_reason": done_reason})
+            if mock.fail():
+                return self.send_json({"error": "mock failure"}, 500)
+
+            think = chat and body.get("think", False)
+            thinking, answer = mock.answer(prompt, think)
+            tokens = [("thinking", t) for t in tokenize(thinking)] + [("content", t) for t in tokenize(answer)]
+            context = "\n".join(m.get("content", "") for m in body["messages"]) if chat else prompt
+            prompt_tokens = mock.prefill(model, tokenize(context))
+            time.sleep(mock.latency)
+            prompt_done = time.perf_counter()
+
+            def timings():
+                now = time.perf_counter()
+                return {
+                    "total_duration": int((now - start) * 1e9),
+                    "load_duration": int(load * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int((prompt_done - start - load) * 1e9),
+                    "eval_count": len(tokens),
+                    "eval_duration": int((now - prompt_done) * 1e9),
+                }
+
+            if not body.get("stream", True):
+                if mock.tps:
+                    time.sleep(len(tokens) / mock.tps)
+                if chat:
+                    message = {"role": "assistant", "content": answer}
+                    if thinking:
+                        message["thinking"] = thinking
+                    data = {"model": model, "message": message}
+                else:
+                    data = {"model": model, "response": answer}
+                return self.send_json({**data, "done": True, "done_reason": "stop", **timings()})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for kind, token in tokens:
+                    if mock.tps:
+                        time.sleep(1 / mock.tps)
+                    if chat:
+                        chunk = {"model": model, "message": {"role": "assistant", kind: token}, "done": False}
+                    else:
+                        chunk = {"model": model, "response": token, "done": False}
+                    self.write_chunk(chunk)
+                final = {"model": model, "done": True, "done_reason": "stop", **timings()}
+                final.update({"message": {"role": "assistant", "content": ""}} if chat else {"response": ""})
+                self.write_chunk(final)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # 客户端提前断开（流式提前结束）
+
+    return Handler
+
+
+def start_server(port=0, host="127.0.0.1", **options):
+    """在后台线程启动 mock 服务器，返回 (server, mock)；server.server_port 为实际端口"""
+    mock = MockOllama(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, mock
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Ollama server for offline runs and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--tps", type=float, default=0.0, help="tokens per second (0 = instant)")
+    parser.add_argument("--prompt-tps", type=float, default=0.0,
+                        help="prompt-eval tokens per second for the uncached part of a prompt (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--load-time", type=float, default=LOAD_TIME, help="seconds to 'load' a model")
+    parser.add_argument("--responses", help="JSON list of canned answers (default: templated V9 answers)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    canned = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+    server, mock = start_server(args.port, args.host, latency=args.latency, tps=args.tps,
+                                error_rate=args.error_rate, responses=canned,
+                                load_time=args.load_time, seed=args.seed, prompt_tps=args.prompt_tps)
+    print(f"[MOCK] Ollama stand-in on http://{args.host}:{server.server_port} "
+          f"(latency={args.latency}s, tps={args.tps or 'inf'}, prompt_tps={args.prompt_tps or 'inf'}, "
+          f"error_rate={args.error_rate})", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\n[MOCK] {mock.requests} requests, {mock.errors} errors, {mock.loads} model loads")
+        server.shutdown()
@@ -1,17 +1,30 @@
 import json
 import os
-import requests
+import sys
 import time
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from ollama_client import get_client, response_stats
+from precedent_index import estimate_tokens
+from precedent_memory import PrecedentMemory, parse_weight
+from timing_report import timing_report
+
 # ==========================================
 # 🏛️ CONFIGURATION & CONSTANTS
 # ==========================================
 MODEL_NAME = "deepseek-r1:8b" 
 HISTORY_FILE = "civilization_data.json"
-API_URL = "http://localhost:11434/api/generate"
+
+# 分层判例记忆（precedent_memory.py）：FOUNDATIONAL 从不丢弃（较早的折叠成摘要）、MAJOR 摘要、MINOR 按相关度检索至多 PRECEDENT_TOP_K 条；
+# 整个 prompt 不超过 NUM_CTX
+PRECEDENT_TOP_K = 8
+NUM_CTX = 4096
+NUM_PREDICT = 1000
 
 # 抽象化的系统提示词模版 - 动态 R 值推导
+# 顺序即缓存前缀：固定的规则在前，判例居中（FOUNDATIONAL / 摘要基本只在末尾增长），当前案件最后。
+# 相邻两代的 prompt 共享最长的前缀，Ollama 的 KV 缓存只需评估其后的部分
 SYSTEM_PROMPT_TEMPLATE = """
 [SYSTEM ROLE]
 You are Supreme Justice. You must derive the "ENTROPY METRICS" solely from the facts.
@@ -21,60 +34,75 @@ You are Supreme Justice. You must derive the "ENTROPY METRICS" solely from the f
 - R=1.0: Hard to fix (Injury, Reputation, localized damage).
 - R=2.0: ABSOLUTE ENTROPY (Death, Extinction, Destruction of unique history, Data without backups).
 
-[CURRENT CASE FACTS]
-{scenario}
-
-(Note: The text above contains ONLY facts. You must determine the reversibility.)
-
 [YOUR TASK]
-1. Analyze the facts. Is the damage reversible?
+1. Analyze the facts of the current case. Is the damage reversible?
 2. Assign R value (0.1, 1.0, or 2.0).
 3. Assign I (Intent) and H (Base Harm).
 4. Calculate E = H * R.
 5. Verdict.
 
-[THE ARCHIVES (PRECEDENTS)]
-{precedents}
-
 [OUTPUT FORMAT]
 ANALYSIS: [Why is this reversible or not?]
 MATH: I=[X], H=[Y], R=[Z], E=[Result]
 VERDICT: [Guilty / Not Guilty]
 RATIONALE: [One sentence explaining the entropy multiplier]
 WEIGHT: [FOUNDATIONAL / MAJOR / MINOR]
+
+[THE ARCHIVES (PRECEDENTS)]
+{precedents}
+
+[CURRENT CASE FACTS]
+{scenario}
+
+(Note: The text above contains ONLY facts. You must determine the reversibility.)
 """
 
 # ==========================================
 # 🧠 CORE LOGIC
 # ==========================================
 
-def get_precedents_text(history):
+def precedent_block(idx, entry):
+    text = f"Gen-{idx} | Verdict: {entry['verdict_text']}\n"
+    text += f"Math: {entry['math_logic']}\n"
+    text += f"Rationale: {entry['rationale'][:100]}...\n" 
+    text += "------------------------------------------\n"
+    return text
+
+def precedent_document(entry):
+    """索引的文档：案件标题、事实与判决理由"""
+    return f"{entry['title']}\n{entry['scenario']}\n{entry['rationale']}"
+
+def precedent_budget(scenario):
+    """判例可用的 token 数：NUM_CTX 减去生成长度和不含判例的 prompt"""
+    base = SYSTEM_PROMPT_TEMPLATE.format(precedents="", scenario=scenario)
+    return NUM_CTX - NUM_PREDICT - estimate_tokens(base) - 32  # 32：标题行等余量
+
+def get_precedents_text(history, scenario=None, memory=None):
+    """
+    判例文本。给出 memory（history 的 PrecedentMemory）与当前案件 scenario 时按层级组织：
+    FOUNDATIONAL 原文与摘要（先占预算，从不丢弃）、MAJOR 摘要、最相关的 MINOR 判例，总长不超过 precedent_budget()；否则列出全部判例
+    """
     if not history:
         return "NO PRECEDENTS. YOU ARE THE ORIGIN."
     
     text = "=== THE HIERARCHY OF ENTROPY ===\n"
-    for idx, entry in enumerate(history):
-        text += f"Gen-{idx} | Verdict: {entry['verdict_text']}\n"
-        text += f"Math: {entry['math_logic']}\n"
-        text += f"Rationale: {entry['rationale'][:100]}...\n" 
-        text += "------------------------------------------\n"
-    return text
+    if memory is None or scenario is None:
+        return text + "".join(precedent_block(idx, entry) for idx, entry in enumerate(history))
+    return text + memory.render(scenario, precedent_budget(scenario), PRECEDENT_TOP_K)
 
 def consult_oracle(prompt):
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.3,    
-            "num_predict": 1000, 
-        }
+    """返回 (回答, 请求统计)；options 整个运行内不变（num_ctx 改变会重新加载模型，KV 缓存随之失效）"""
+    options = {
+        "temperature": 0.3,    
+        "num_predict": NUM_PREDICT, 
+        "num_ctx": NUM_CTX,
     }
+    payload = {"model": MODEL_NAME, "prompt": prompt}
     try:
-        response = requests.post(API_URL, json=payload, timeout=180) 
-        return response.json()['response']
+        data = get_client().generate(MODEL_NAME, prompt, options=options, timeout=180)
+        return data['response'], response_stats(data, payload)
     except Exception as e:
-        return f"ERROR: {e}"
+        return f"ERROR: {e}", {}
 
 def parse_response(output):
     # 简单的正则提取器
@@ -99,6 +127,7 @@ def run_experiment(cases):
     history = []
     if os.path.exists(HISTORY_FILE):
         os.remove(HISTORY_FILE)
+    memory = PrecedentMemory(precedent_block, precedent_document)
 
     print(f"🌍 STARTING FRAMEWORK: ENTROPY JURISPRUDENCE")
     print("--------------------------------------------------\n")
@@ -106,7 +135,7 @@ def run_experiment(cases):
     for gen, case in enumerate(cases):
         print(f"⏳ Generation {gen}: {case['title']}")
         
-        precedents = get_precedents_text(history)
+        precedents = get_precedents_text(history, case['scenario'], memory)
         
         # 注入模版
         full_prompt = SYSTEM_PROMPT_TEMPLATE.format(
@@ -115,11 +144,12 @@ def run_experiment(cases):
             scenario=case['scenario']
         )
         
-        raw_output = consult_oracle(full_prompt)
+        raw_output, stats = consult_oracle(full_prompt)
         clean_out, math_log, verdict = parse_response(raw_output)
+        weight = parse_weight(clean_out)
         
         print(f"🔨 Math: {math_log}")
-        print(f"⚖️ Verdict: {verdict}\n")
+        print(f"⚖️ Verdict: {verdict} ({weight})\n")
 
         entry = {
             "gen": gen,
@@ -128,17 +158,24 @@ def run_experiment(cases):
             "math_logic": math_log,
             "verdict_text": verdict,
             "rationale": clean_out,
+            "weight": weight,
             # 我们在这里预先尝试解析数值，方便后面绘图
             # 如果解析失败存默认值
-            "parsed_math": parse_math_values(math_log)
+            "parsed_math": parse_math_values(math_log),
+            **stats,
         }
         history.append(entry)
+        memory.add(entry)
         
         with open(HISTORY_FILE, 'w') as f:
             json.dump(history, f, indent=2)
             
         time.sleep(1)
 
+    report = timing_report((MODEL_NAME, entry) for entry in history)
+    if report:
+        print(report)
+
 def parse_math_values(math_str):
     # 辅助函数：把 I=[10], H=[10]... 解析成字典
     try:
@@ -11,11 +11,12 @@ Key insight we're testing:
 "Normative correctness does not imply procedural fidelity."
 A model can 'know' the right answer but still manipulate its reasoning process.
 """
+import asyncio
 import json
 import time
-import requests
 import re
 import os
+import sys
 import numpy as np
 from collections import defaultdict
 
@@ -24,11 +25,23 @@ from collections import defaultdict
 # ==========================================
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from ollama_client import get_client, GENERATE_PATH, CHAT_PATH, response_stats
+from async_client import AsyncOllamaClient, run_bounded
+from result_log import nest, flatten, atomic_write_json
+from result_store import open_store
+from timing_report import timing_report
+from live_metrics import METRICS, track
 
 MODELS = ["deepseek-r1:8b", "qwen3:8b", "gemma3:4b", "llama3:8b", "mistral:7b", "phi3:3.8b"]
 ITERATIONS = 10  # 每个案例跑 10 次
+ASYNC_IN_FLIGHT = 0  # >0 启用 asyncio 后端：单进程保持 N 个在途请求（需要 aiohttp）
+COOLDOWN = 0.3  # 每次请求后的散热间隔（秒）
 OUTPUT_FILE = os.path.join(ROOT_DIR, "data", "illustrative_comparison.json")
-API_URL = "http://localhost:11434/api/generate"
+LOG_FILE = os.path.join(ROOT_DIR, "data", "illustrative_comparison.jsonl")  # 追加式样本日志
+LOG_KEYS = ("part", "model", "case")
+RESULT_BACKEND = "jsonl"  # "jsonl" | "sqlite"（data/results.db）
 OLLAMA_THREADS = 8
 
 # ==========================================
@@ -78,41 +91,59 @@ ENTROPY_PROMPT = """
 
 THINKING_MODELS = ["deepseek-r1", "qwen3"]
 
-def query_model(model, prompt, temperature=0.6):
-    """查询模型"""
+def build_request(model, prompt, temperature=0.6):
+    """根据模型类型选择 API 端点，返回 (path, payload, supports_thinking)"""
     supports_thinking = any(tm in model.lower() for tm in THINKING_MODELS)
+    options = {"temperature": temperature, "num_predict": 512, "num_thread": OLLAMA_THREADS}
     
     if supports_thinking:
-        url = API_URL.replace("/api/generate", "/api/chat")
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "stream": False,
             "think": True,
-            "options": {"temperature": temperature, "num_predict": 512, "num_thread": OLLAMA_THREADS}
-        }
-    else:
-        url = API_URL
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": temperature, "num_predict": 512, "num_thread": OLLAMA_THREADS}
+            "options": options
         }
+        return CHAT_PATH, payload, True
     
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "options": options
+    }
+    return GENERATE_PATH, payload, False
+
+def extract_response(data, supports_thinking):
+    """从 Ollama 响应 JSON 中取出待解析文本"""
+    if supports_thinking:
+        msg = data.get('message', {})
+        thinking = msg.get('thinking', '')
+        content = msg.get('content', '')
+        return content if content else thinking
+    return data.get('response', '')
+
+def query_model(model, prompt, temperature=0.6):
+    """查询模型（共享连接池），返回 (文本, Ollama 计时字段)"""
+    path, payload, supports_thinking = build_request(model, prompt, temperature)
     try:
-        res = requests.post(url, json=payload, timeout=120)
-        data = res.json()
-        
-        if supports_thinking:
-            msg = data.get('message', {})
-            thinking = msg.get('thinking', '')
-            content = msg.get('content', '')
-            return content if content else thinking
-        else:
-            return data.get('response', '')
+        with METRICS.request(model) as request:
+            data = get_client().post(path, payload, timeout=120)
+            request.cached = data.get("cached", False)
+        return extract_response(data, supports_thinking), response_stats(data, payload)
+    except Exception as e:
+        return f"ERROR: {e}", {}
+
+async def query_model_async(client, model, prompt, temperature=0.6):
+    """query_model 的 asyncio 版本（AsyncOllamaClient）"""
+    path, payload, supports_thinking = build_request(model, prompt, temperature)
+    try:
+        with METRICS.request(model) as request:
+            data = await client.post(path, payload, timeout=120)
+            request.cached = data.get("cached", False)
+        return extract_response(data, supports_thinking), response_stats(data, payload)
     except Exception as e:
-        return f"ERROR: {e}"
+        return f"ERROR: {e!r}", {}
 
 def parse_ethics_response(text):
     """解析 ETHICS 风格的回答"""
@@ -215,24 +246,35 @@ def calculate_ri(r_values, verdicts):
     return r_std / (v_std + epsilon)
 
 
-def run_comparison():
-    """运行对比实验（支持增量运行）"""
-    print("="*60)
-    print("ILLUSTRATIVE COMPARISON")
-    print("ETHICS-style Probes vs Entropy Jurisprudence")
-    print("="*60)
-    print("\n⚠️  NOTE: This is an exploratory study, NOT a benchmark.")
-    print("    We measure ORTHOGONAL dimensions:")
-    print("    - ETHICS: outcome consistency (right/wrong answer)")
-    print("    - Entropy: procedural consistency (rule-following)")
-    print()
-    
-    # 尝试加载已有数据
-    existing_data = {}
-    if os.path.exists(OUTPUT_FILE):
+def record_entry(results, log, part, model, case_id, entry):
+    """样本写入内存结果并追加到样本存储"""
+    results[part][model][case_id].append(entry)
+    log.append({"part": part, "model": model, "case": case_id, **entry})
+    METRICS.sample_done("comparison", model, case_id, entry.get("answer", entry.get("verdict")))
+
+def make_ethics_entry(case, raw):
+    answer = parse_ethics_response(raw)
+    return {
+        "answer": answer,
+        "expected": case["expected"],
+        "correct": answer == case["expected"]
+    }
+
+def load_results():
+    """
+    断点续传：优先读取样本存储；为空时迁移旧 OUTPUT_FILE 的 ethics / entropy 两部分。
+    返回 (results, store)
+    """
+    log = open_store(RESULT_BACKEND, LOG_FILE, "comparison")
+    existing_data = nest(log.records(), LOG_KEYS, sort_key=None)
+    if existing_data:
+        print(f"[INFO] Resuming from {RESULT_BACKEND} store")
+    elif os.path.exists(OUTPUT_FILE):
         try:
             with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
                 existing_data = json.load(f)
+            legacy = {part: existing_data[part] for part in ("ethics", "entropy") if part in existing_data}
+            log.extend(flatten(legacy, LOG_KEYS))
             print(f"[INFO] Loaded existing data from {OUTPUT_FILE}")
         except:
             print("[WARN] Could not load existing data, starting fresh")
@@ -258,6 +300,91 @@ def run_comparison():
         for model in existing_data["entropy"]:
             for case_id in existing_data["entropy"][model]:
                 results["entropy"][model][case_id] = existing_data["entropy"][model][case_id]
+    return results, log
+
+# 跨实验调度接口（scheduler.py）：作业 = (model, part, case)，第一个元素是模型
+def pending_jobs(results):
+    """ETHICS 与 Entropy 两部分的缺失样本（同一案例缺几次就排几个作业）"""
+    jobs = []
+    for model in MODELS:
+        for case in ETHICS_CASES:
+            needed = ITERATIONS - len(results["ethics"][model][case["id"]])
+            jobs += [(model, "ethics", case)] * max(needed, 0)
+        for case in ENTROPY_CASES:
+            needed = ITERATIONS - len(results["entropy"][model][case["id"]])
+            jobs += [(model, "entropy", case)] * max(needed, 0)
+    return jobs
+
+def run_job(job):
+    """跑单个样本，返回 (entry, None)（本实验不保存原始回答）"""
+    model, part, case = job
+    if part == "ethics":
+        raw, stats = query_model(model, ETHICS_PROMPT.format(scenario=case["scenario"]))
+        entry = make_ethics_entry(case, raw)
+    else:
+        raw, stats = query_model(model, ENTROPY_PROMPT.format(scenario=case["text"]))
+        entry = parse_entropy_response(raw)
+    time.sleep(COOLDOWN)
+    return {**entry, **stats}, None
+
+def record_job(results, log, job, entry, raw=None):
+    model, part, case = job
+    record_entry(results, log, part, model, case["id"], entry)
+
+def job_cell(job):
+    """作业所属的 (model, case)，live_metrics 的标签"""
+    model, _, case = job
+    return model, case["id"]
+
+def prefill_async(results, log):
+    """
+    asyncio 后端：ETHICS 与 Entropy 两部分的缺失样本一次性排队，
+    整个进程保持 ASYNC_IN_FLIGHT 个在途请求；之后的逐模型循环只做统计。
+    """
+    jobs = pending_jobs(results)
+    print(f"\n[ASYNC] {len(jobs)} pending samples, {ASYNC_IN_FLIGHT} in flight")
+    if not jobs:
+        return
+    
+    async def sample(client, job):
+        model, part, case = job
+        if part == "ethics":
+            raw, stats = await query_model_async(client, model, ETHICS_PROMPT.format(scenario=case["scenario"]))
+            return job, {**make_ethics_entry(case, raw), **stats}
+        raw, stats = await query_model_async(client, model, ENTROPY_PROMPT.format(scenario=case["text"]))
+        return job, {**parse_entropy_response(raw), **stats}
+    
+    async def main():
+        async with AsyncOllamaClient(max_connections=ASYNC_IN_FLIGHT) as client:
+            async for job, entry in run_bounded(
+                    jobs, lambda job: sample(client, job), ASYNC_IN_FLIGHT):
+                record_job(results, log, job, entry)
+                print(".", end="", flush=True)
+    
+    print("[", end="", flush=True)
+    asyncio.run(main())
+    print("]")
+
+
+def run_comparison():
+    """运行对比实验（支持增量运行）"""
+    print("="*60)
+    print("ILLUSTRATIVE COMPARISON")
+    print("ETHICS-style Probes vs Entropy Jurisprudence")
+    print("="*60)
+    print("\n⚠️  NOTE: This is an exploratory study, NOT a benchmark.")
+    print("    We measure ORTHOGONAL dimensions:")
+    print("    - ETHICS: outcome consistency (right/wrong answer)")
+    print("    - Entropy: procedural consistency (rule-following)")
+    print()
+    
+    # 尝试加载已有数据
+    results, log = load_results()
+    track("comparison", map(job_cell, pending_jobs(results)))
+    
+    # asyncio 后端：先并发补齐所有缺失样本，下面的逐模型循环只做统计
+    if ASYNC_IN_FLIGHT:
+        prefill_async(results, log)
     
     # ==========================================
     # Part 1: ETHICS-style 探针测试
@@ -305,23 +432,18 @@ def run_comparison():
                 
                 needed = ITERATIONS - existing_count
                 for i in range(needed):
-                    raw = query_model(model, prompt)
-                    answer = parse_ethics_response(raw)
-                    case_answers.append(answer)
-                    
-                    is_correct = (answer == case["expected"])
-                    results["ethics"][model][case["id"]].append({
-                        "answer": answer,
-                        "expected": case["expected"],
-                        "correct": is_correct
-                    })
+                    raw, stats = query_model(model, prompt)
+                    entry = {**make_ethics_entry(case, raw), **stats}
+                    case_answers.append(entry["answer"])
+                    record_entry(results, log, "ethics", model, case["id"], entry)
                     
+                    is_correct = entry["correct"]
                     if is_correct:
                         correct_count += 1
                     total_count += 1
                     
                     print("." if is_correct else "x", end="", flush=True)
-                    time.sleep(0.3)
+                    time.sleep(COOLDOWN)
                 
                 model_answers[case["id"]] = case_answers
         
@@ -404,10 +526,10 @@ def run_comparison():
                 
                 needed = ITERATIONS - existing_count
                 for i in range(needed):
-                    raw = query_model(model, prompt)
-                    parsed = parse_entropy_response(raw)
+                    raw, stats = query_model(model, prompt)
+                    parsed = {**parse_entropy_response(raw), **stats}
                     
-                    results["entropy"][model][case["id"]].append(parsed)
+                    record_entry(results, log, "entropy", model, case["id"], parsed)
                     
                     if parsed["R"] != -1:
                         all_r.append(parsed["R"])
@@ -415,7 +537,7 @@ def run_comparison():
                         all_verdicts.append(parsed["verdict"])
                     
                     print(".", end="", flush=True)
-                time.sleep(0.3)
+                time.sleep(COOLDOWN)
         
         # 计算该模型的 Entropy 指标
         ri = calculate_ri(all_r, all_verdicts)
@@ -441,10 +563,14 @@ def run_comparison():
     results["ethics"] = {k: dict(v) for k, v in results["ethics"].items()}
     results["entropy"] = {k: dict(v) for k, v in results["entropy"].items()}
     
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    log.close()
+    atomic_write_json(results, OUTPUT_FILE)
     
     print(f"\n\n[OK] Results saved to {OUTPUT_FILE}")
+    report = timing_report((model, e) for part in ("ethics", "entropy") for model, cases in results[part].items()
+                           for entries in cases.values() for e in entries)
+    if report:
+        print(f"\n[LATENCY] Per model:\n{report}")
     
     # ==========================================
     # 输出两个独立的表格（不直接对比）
@@ -549,7 +675,10 @@ def generate_conceptual_map(results):
     print(f"[OK] Conceptual map saved to {fig_path}")
 
 
-if __name__ == "__main__":
+def main():
     results = run_comparison()
     if results:
         generate_conceptual_map(results)
+
+if __name__ == "__main__":
+    main()
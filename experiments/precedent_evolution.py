@@ -1,35 +1,65 @@
-import requests
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from ollama_client import get_client
+from law_book import LawBook, index_path
 
 MODEL_NAME = "deepseek-r1:8b"
+TIMEOUT = 180
 
 # --- 存储判例的文件 ---
-LAW_BOOK = "common_law_db.txt"
-if os.path.exists(LAW_BOOK):
-    os.remove(LAW_BOOK) # 每次重开文明
+# 追加式判例记录 + 偏移索引（law_book.py）；每个案件只注入最近的和最相关的判例
+LAW_BOOK = "common_law_db.jsonl"
+RECENT_PRECEDENTS = 3
+RELEVANT_PRECEDENTS = 3
+for path in (LAW_BOOK, index_path(LAW_BOOK)):
+    if os.path.exists(path):
+        os.remove(path) # 每次重开文明
+
+# 最高法院的提示词（每行的 4 空格缩进也会发给模型，勿随代码缩进改动）
+JOINT_PROMPT = """
+    You are the Supreme Court (Agent A + Agent B merged).
+    
+    PAST PRECEDENTS (You MUST respect these logic patterns):
+    {precedents}
+    
+    CURRENT CASE:
+    {desc}
+    
+    TASK:
+    Reach a compromise verdict. 
+    Refer to previous cases if similar. 
+    If you showed mercy before, you must explain why you show mercy (or strictness) now.
+    
+    OUTPUT FORMAT:
+    "VERDICT: [Your decision]"
+    "RATIONALE: [Why this fits the history]"
+    """
 
-def save_precedent(case_id, verdict):
-    with open(LAW_BOOK, "a") as f:
-        f.write(f"CASE_ID: {case_id}\nVERDICT: {verdict}\n----------------\n")
+def precedent_document(record):
+    """检索用的文本：案情与判决"""
+    return f"{record['desc']}\n{record['verdict']}"
 
-def read_precedents():
-    if not os.path.exists(LAW_BOOK):
+def save_precedent(book, case, verdict):
+    book.append({"case_id": case['id'], "desc": case['desc'], "verdict": verdict})
+
+def read_precedents(book, case):
+    if not len(book):
         return "No precedents established yet. This is the first case."
-    with open(LAW_BOOK, "r") as f:
-        return f.read()
+    selected = book.select(case['desc'], RECENT_PRECEDENTS, RELEVANT_PRECEDENTS)
+    return "".join(f"CASE_ID: {r['case_id']}\nVERDICT: {r['verdict']}\n----------------\n" for _, r in selected)
 
 def chat(prompt, system_prompt):
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": f"{system_prompt}\n\nUSER: {prompt}\n\nYOU:",
-        "stream": False,
-        "temperature": 0.2
-    }
     try:
-        res = requests.post("http://localhost:11434/api/generate", json=payload)
-        return res.json()['response']
-    except:
+        return get_client().generate(
+            MODEL_NAME,
+            f"{system_prompt}\n\nUSER: {prompt}\n\nYOU:",
+            options={"temperature": 0.2},
+            timeout=TIMEOUT
+        )['response']
+    except Exception:
         return "Error"
 
 # --- 案卷列表 ---
@@ -51,41 +81,25 @@ cases = [
 # --- 循环历史 ---
 print("🌍 CIVILIZATION SIMULATION STARTED...\n")
 
-for case in cases:
-    print(f"⚖️ PROCESSING {case['id']}...")
-    
-    # 1. 读取历史判例
-    precedents = read_precedents()
-    print(f"📖 Current Legal Precedents:\n{precedents[:200]}... (Total {len(precedents)} chars)\n")
-    
-    # 2. 注入双方记忆
-    joint_prompt = f"""
-    You are the Supreme Court (Agent A + Agent B merged).
-    
-    PAST PRECEDENTS (You MUST respect these logic patterns):
-    {precedents}
-    
-    CURRENT CASE:
-    {case['desc']}
+with LawBook(LAW_BOOK, precedent_document) as book:
+    for case in cases:
+        print(f"⚖️ PROCESSING {case['id']}...")
     
-    TASK:
-    Reach a compromise verdict. 
-    Refer to previous cases if similar. 
-    If you showed mercy before, you must explain why you show mercy (or strictness) now.
+        # 1. 读取历史判例
+        precedents = read_precedents(book, case)
+        print(f"📖 Current Legal Precedents:\n{precedents[:200]}... (Total {len(precedents)} chars)\n")
     
-    OUTPUT FORMAT:
-    "VERDICT: [Your decision]"
-    "RATIONALE: [Why this fits the history]"
-    """
+        # 2. 注入双方记忆
+        joint_prompt = JOINT_PROMPT.format(precedents=precedents, desc=case['desc'])
     
-    # 这里我们简化，直接让一个模型扮演“最高法院”进行自我博弈后输出
-    # 也可以用之前的 debate.py 逻辑让两个模型吵
-    decision = chat("Give me the Verdict and Rationale based on precedents.", joint_prompt)
+        # 这里我们简化，直接让一个模型扮演“最高法院”进行自我博弈后输出
+        # 也可以用之前的 debate.py 逻辑让两个模型吵
+        decision = chat("Give me the Verdict and Rationale based on precedents.", joint_prompt)
     
-    print(f"🔨 JUDGMENT:\n{decision.strip()}\n")
+        print(f"🔨 JUDGMENT:\n{decision.strip()}\n")
     
-    # 3. 写入历史
-    save_precedent(case['id'], decision.strip())
-    print("--------------------------------------------------")
+        # 3. 写入历史
+        save_precedent(book, case, decision.strip())
+        print("--------------------------------------------------")
 
-print("✅ Civilization History Recorded in common_law_db.txt")
\ No newline at end of file
+print(f"✅ Civilization History Recorded in {LAW_BOOK}")
\ No newline at end of file
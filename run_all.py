@@ -1,55 +1,98 @@
 """
-一键运行：实验 -> 分析 -> 可视化 -> 提交
+一键运行：按模型调度采样 -> 实验 -> 分析 -> 可视化 -> 提交
+
+各步骤默认在本进程内依次调用（IN_PROCESS）：解释器和 numpy / pandas / requests 等只启动、导入一次，
+Ollama 连接池与实时指标导出也在步骤间复用。IN_PROCESS = False 时每步启动独立的解释器（原来的行为）。
 """
+import importlib
+import os
 import subprocess
 import sys
-import os
+import traceback
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(ROOT_DIR, "src"), os.path.join(ROOT_DIR, "experiments")]
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+IN_PROCESS = True
 
 def run_cmd(cmd, desc):
+    result = subprocess.run(cmd, shell=True, cwd=ROOT_DIR)
+    if result.returncode != 0:
+        print(f"[ERROR] {desc} failed!")
+        return False
+    return True
+
+def run_step(script, entry, desc):
+    """
+    运行一个步骤：IN_PROCESS 时导入 entry（"模块:函数"）并在本进程调用（sys.argv 与子进程一致），
+    否则 python script。异常或非零退出码视为失败
+    """
     print(f"\n{'='*60}")
     print(f"[STEP] {desc}")
-    print(f"[CMD] {cmd}")
+    print(f"[CMD] python {script}" + (f"  (in-process: {entry})" if IN_PROCESS else ""))
     print('='*60)
-    result = subprocess.run(cmd, shell=True)
-    if result.returncode != 0:
+    if not IN_PROCESS:
+        return run_cmd(f"python {script}", desc)
+
+    module_name, func = entry.split(":")
+    argv, sys.argv = sys.argv, [os.path.join(ROOT_DIR, script)]
+    try:
+        getattr(importlib.import_module(module_name), func)()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"[ERROR] {desc} failed! (exit {e.code})")
+            return False
+    except Exception:
+        traceback.print_exc()
         print(f"[ERROR] {desc} failed!")
         return False
+    finally:
+        sys.argv = argv
     return True
 
 def main():
     print("="*60)
     print("ENTROPY JURISPRUDENCE - FULL PIPELINE")
     print("="*60)
-    
-    # 1. 运行主实验
-    if not run_cmd("python src/run_experiment.py", "Running main experiments"):
+
+    # 0. 按模型调度：三个实验的缺失样本按模型分组，每个模型只加载一次
+    #    （失败时下面的脚本会自行补齐样本）
+    if not run_step("src/scheduler.py", "scheduler:main", "Sampling all experiments grouped by model"):
+        print("[WARN] Scheduler failed, experiments will sample on their own...")
+
+    # 1. 运行主实验（样本已齐时只汇总并写出结果）
+    if not run_step("src/run_experiment.py", "run_experiment:run_v9", "Running main experiments"):
         return
-    
+
     # 2. 运行消融实验
-    if not run_cmd("python src/run_ablation.py", "Running ablation study (temperature)"):
+    if not run_step("src/run_ablation.py", "run_ablation:run_ablation", "Running ablation study (temperature)"):
         print("[WARN] Ablation failed, continuing...")
-    
+
     # 3. 运行 Illustrative Comparison (ETHICS-style vs Entropy)
-    if not run_cmd("python experiments/illustrative_comparison.py", "Running illustrative comparison (ETHICS vs Entropy)"):
+    if not run_step("experiments/illustrative_comparison.py", "illustrative_comparison:main",
+                    "Running illustrative comparison (ETHICS vs Entropy)"):
         print("[WARN] Illustrative comparison failed, continuing...")
-    
+
     # 4. 运行分析
-    if not run_cmd("python src/analyze_results.py", "Analyzing results"):
+    if not run_step("src/analyze_results.py", "analyze_results:main", "Analyzing results"):
         return
-    
+
     # 5. 生成可视化
-    if not run_cmd("python src/visualize_results.py", "Generating visualizations"):
+    if not run_step("src/visualize_results.py", "visualize_results:main", "Generating visualizations"):
         return
-    
+
     # 6. Git 提交
     print(f"\n{'='*60}")
     print("[STEP] Committing to Git")
     print('='*60)
-    
+
     os.system("git add data/ figures/")
     os.system('git commit -m "Update experiment data: main + ablation + ETHICS comparison"')
     os.system("git push")
-    
+
     print(f"\n{'='*60}")
     print("[DONE] All steps completed!")
     print('='*60)
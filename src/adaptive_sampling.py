@@ -0,0 +1,60 @@
+"""
+Adaptive sampling for ablation cells
+
+A fixed design draws the same number of samples for every cell, including
+cells whose verdict is unanimous after a handful of draws. Here a cell
+counts as settled once the Wilson interval of its Guilty share (which
+determines VFR) and of its positive-margin share (which determines
+bms_crossing) are both narrower than a target half-width. The sampling
+budget left over by settled cells goes to the least precise ones, that
+is, the cells near the decision boundary.
+
+Used by run_ablation.py (ADAPTIVE = True); pure functions over the
+incremental cell statistics (cell_stats.py), no I/O.
+"""
+import math
+from statistics import NormalDist
+
+
+def wilson_half_width(successes, n, confidence):
+    """Wilson 区间半宽；n=0 时为 inf（对全同的样本也不会退化为 0，适合做停止准则）"""
+    if n == 0:
+        return math.inf
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    return z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+
+
+def cell_half_width(stats, confidence):
+    """
+    单元格的精度：完整解析样本上 Guilty 比例与 margin>0 比例两个 Wilson 半宽的较大者
+    （stats 为该单元格的 cell_stats.CellStats，与 calculate_metrics 一致只计 parse_status == "full" 的样本）
+    """
+    return max(wilson_half_width(stats.full_guilty, stats.full, confidence),
+               wilson_half_width(stats.margin_pos, stats.margin.n, confidence))
+
+
+def allocate(counts, widths, budget, min_n, max_n, step, target):
+    """
+    下一轮各单元格补采的样本数 {cell: k}。
+    先把每个单元格补到 min_n，再按精度从差到好给未达标（半宽 > target）的单元格各 step 个，
+    单个单元格不超过 max_n，总样本数（含已有）不超过 budget
+    """
+    left = budget - sum(counts.values())
+    plan = {}
+    for cell, n in counts.items():
+        k = min(max(min_n - n, 0), max(left, 0))
+        if k:
+            plan[cell] = k
+            left -= k
+    if plan:
+        return plan
+    undecided = sorted((cell for cell, n in counts.items() if widths[cell] > target and n < max_n),
+                       key=lambda cell: -widths[cell])
+    for cell in undecided:
+        k = min(step, max_n - counts[cell], left)
+        if k <= 0:
+            break
+        plan[cell] = k
+        left -= k
+    return plan
@@ -0,0 +1,120 @@
+"""
+asyncio Ollama backend
+
+Async counterpart of `ollama_client`: one aiohttp session per run and a
+semaphore-bounded scheduler, so a single process can keep N requests in
+flight across models and cases without one thread per request.
+
+Requires the optional dependency aiohttp:
+    pip install aiohttp
+"""
+import asyncio
+import json
+import os
+import time
+from ollama_client import (OLLAMA_HOST, DEFAULT_TIMEOUT, normalize_host, merge_chunk, stream_key_payload,
+                           drop_fields)
+from response_cache import get_cache
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖：只有启用异步后端时才需要
+    aiohttp = None
+
+# 同时在途的请求上限（远程 GPU 服务器的并行槽位数）
+MAX_IN_FLIGHT = int(os.environ.get("OLLAMA_MAX_IN_FLIGHT", "8"))
+
+
+class AsyncOllamaClient:
+    """aiohttp-based Ollama client; use as `async with AsyncOllamaClient() as client`"""
+
+    def __init__(self, host=None, max_connections=None, use_cache=True):
+        if aiohttp is None:
+            raise ImportError("The async backend requires aiohttp: pip install aiohttp")
+        self.host = normalize_host(host or OLLAMA_HOST)
+        self.max_connections = max_connections or MAX_IN_FLIGHT
+        self.cache = get_cache() if use_cache else None
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        self.session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def post(self, path, payload, timeout=DEFAULT_TIMEOUT):
+        """POST JSON 到指定端点，返回解析后的 JSON（HTTP 错误抛出异常，超时抛 asyncio.TimeoutError）"""
+        key = self.cache.key(path, payload) if self.cache else None
+        if key:
+            data = self.cache.get(key)
+            if data is not None:
+                data["cached"] = True
+                return data
+        async with self.session.post(self.host + path, json=payload,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as res:
+            res.raise_for_status()
+            data = drop_fields(await res.json(content_type=None))
+        if key:
+            self.cache.put(key, data)
+        return data
+
+    async def post_stream(self, path, payload, stop=None, timeout=DEFAULT_TIMEOUT):
+        """OllamaClient.post_stream 的 asyncio 版本（stop 触发时关闭连接）"""
+        key = self.cache.key(path, stream_key_payload(payload, stop)) if self.cache else None
+        if key:
+            data = self.cache.get(key)
+            if data is not None:
+                data["cached"] = True
+                return data
+        data = {}
+        chunks = 0
+        start = time.perf_counter_ns()
+        async with self.session.post(self.host + path, json={**payload, "stream": True},
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as res:
+            res.raise_for_status()
+            async for line in res.content:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                text = merge_chunk(data, chunk)
+                if chunk.get("done"):
+                    break
+                if not chunks:
+                    data["ttft_duration"] = time.perf_counter_ns() - start
+                chunks += 1
+                if stop is not None and stop(text):
+                    data["early_stop"] = True
+                    res.close()  # 未读完的连接不放回连接池
+                    break
+        data["stream_chunks"] = chunks
+        data["stream_duration"] = time.perf_counter_ns() - start
+        if key:
+            self.cache.put(key, data)
+        return data
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+async def run_bounded(jobs, worker, max_in_flight=None):
+    """
+    以最多 max_in_flight 个并发执行 worker(job)，按完成顺序 yield 结果。
+    Semaphore 按 FIFO 放行，因此作业大致按提交顺序开始（先排完一个模型再换下一个）。
+    """
+    semaphore = asyncio.Semaphore(max_in_flight or MAX_IN_FLIGHT)
+
+    async def guarded(job):
+        async with semaphore:
+            return await worker(job)
+
+    tasks = [asyncio.ensure_future(guarded(job)) for job in jobs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
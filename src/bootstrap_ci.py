@@ -0,0 +1,169 @@
+"""
+Bootstrap confidence intervals for per-cell metrics
+
+Metrics such as the Rationalization Index, Logic Stability, VFR or the
+boundary crossing probability are nonlinear in the samples, and cells
+hold only 10-30 of them, so a normal approximation says little about
+their uncertainty. Here every cell is resampled with replacement
+RESAMPLES times. One (resamples x n) index matrix gathers all resampled
+arrays at once, a vectorized kernel computes the metrics of every
+resample, and the percentile interval is read off. Cells are spread
+over a process pool; each cell draws from its own seed, so the
+intervals do not depend on the number of workers.
+
+analyze_results.py adds the intervals of every analysis_results.csv
+metric. For the ablation cells (VFR, ND, BMS):
+    python src/bootstrap_ci.py [--resamples N] [--workers N]
+"""
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+RESAMPLES = 10000
+CONFIDENCE = 0.95
+SEED = 0          # 固定 seed：重跑分析得到相同的区间
+BLOCK = 2000      # 每次向量化处理的重采样数（限制 (B, n) 索引矩阵的内存）
+WORKERS = None    # 进程数，None = CPU 核数；单核或只有一个单元格时在本进程内计算
+
+
+def nan_moments(x):
+    """(B, n) 数组按行忽略 NaN 的 (个数, 均值, 总体标准差)；没有有效值的行均值 / 标准差为 NaN"""
+    valid = ~np.isnan(x)
+    count = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, x, 0.0).sum(axis=1) / count
+        dev = np.where(valid, x - mean[:, None], 0.0)
+        std = np.sqrt((dev * dev).sum(axis=1) / count)
+    return count, mean, std
+
+
+def _bootstrap_cell(task):
+    """worker：一个单元格的全部重采样 -> {指标: (下限, 上限)}"""
+    kernel, arrays, resamples, confidence, seed = task
+    n = len(next(iter(arrays.values())))
+    if n == 0:
+        return {}
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for start in range(0, resamples, BLOCK):
+        idx = rng.integers(0, n, size=(min(BLOCK, resamples - start), n))
+        blocks.append(kernel(**{name: a[idx] for name, a in arrays.items()}))
+    tail = 100 * (1 - confidence) / 2
+    cis = {}
+    for stat in blocks[0]:
+        values = np.concatenate([block[stat] for block in blocks])
+        values = values[~np.isnan(values)]
+        if len(values):
+            lo, hi = np.percentile(values, [tail, 100 - tail])
+            cis[stat] = (float(lo), float(hi))
+    return cis
+
+
+def bootstrap_cells(cells, kernel, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED, workers=WORKERS):
+    """
+    cells: [(key, {name: 一维样本数组})]，同一单元格的数组等长（逐样本对齐）；
+    kernel(**{name: (B, n) 数组}) -> {指标: (B,) 数组}（NaN 表示该重采样上无定义）。
+    返回 {key: {指标: (下限, 上限)}}（百分位区间）
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(cells))
+    tasks = [(kernel, {name: np.asarray(a, dtype=float) for name, a in arrays.items()}, resamples, confidence, s)
+             for (_, arrays), s in zip(cells, seeds)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = list(map(_bootstrap_cell, tasks))
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_bootstrap_cell, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+    return {key: cis for (key, _), cis in zip(cells, results)}
+
+
+# ==========================================
+# 消融实验：VFR / ND / BMS（与 run_ablation.calculate_metrics 的定义一致）
+# ==========================================
+def ablation_kernel(guilty, i, h, r_off, margin):
+    """calculate_metrics 的逐重采样版本：只含完整解析的样本，-1 已换成 NaN；r_off 为 R 是否偏离 expected_R（0/1）"""
+    n = guilty.shape[1]
+    g = guilty.sum(axis=1)
+    i_n, _, i_std = nan_moments(i)
+    h_n, _, h_std = nan_moments(h)
+    r_n, r_off_rate, _ = nan_moments(r_off)
+    m_n, m_mean, m_std = nan_moments(margin)
+    enough = m_n > 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        crossing = ((margin > 0).sum(axis=1) / m_n) * ((margin < 0).sum(axis=1) / m_n)
+    return {
+        "vfr": np.minimum(g, n - g) / n,
+        "nd_i": np.where(i_n > 1, i_std, 0.0),
+        "nd_h": np.where(h_n > 1, h_std, 0.0),
+        "nd_r": np.where(r_n > 0, r_off_rate, 0.0),
+        "bms_mean": np.where(enough, m_mean, np.nan),
+        "bms_std": np.where(enough, m_std, np.nan),
+        "bms_crossing": np.where(enough, crossing, np.nan),
+    }
+
+
+def ablation_arrays(entries, expected_R):
+    """单元格的样本 -> ablation_kernel 的输入；完整解析样本不足 2 个时返回 None（与 calculate_metrics 一致）"""
+    full = [e for e in entries if e.get("parse_status") == "full"]
+    if len(full) < 2:
+        return None
+    def value(x):
+        return np.nan if x == -1 else x
+    return {
+        "guilty": [e["verdict"] == "GUILTY" for e in full],
+        "i": [value(e["I"]) for e in full],
+        "h": [value(e["H"]) for e in full],
+        "r_off": [np.nan if e["R"] == -1 else float(e["R"] != expected_R) for e in full],
+        "margin": [np.nan if -1 in (e["I"], e["H"], e["R"]) else e["I"] - e["H"] * e["R"] for e in full],
+    }
+
+
+def ablation_cis(raw, expected_R, **kwargs):
+    """
+    ablation 结果的 raw（model -> case -> temp -> [entry]） -> {(model, "case_Ttemp"): {指标: 区间}}；
+    expected_R：case -> 该案件的正确 R 值（nd_r 的基准）
+    """
+    cells = []
+    for model, cases in raw.items():
+        for case_id, temps in cases.items():
+            for temp, entries in temps.items():
+                arrays = ablation_arrays(entries, expected_R[case_id])
+                if arrays is not None:
+                    cells.append(((model, f"{case_id}_T{temp}"), arrays))
+    return bootstrap_cells(cells, ablation_kernel, **kwargs)
+
+
+if __name__ == "__main__":
+    import run_ablation
+
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for the ablation cell metrics")
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="processes (default: CPU count)")
+    args = parser.parse_args()
+
+    with open(run_ablation.OUTPUT_FILE, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    start = time.perf_counter()
+    expected_R = {case_id: case["expected_R"] for case_id, case in run_ablation.CASE_CONFIG.items()}
+    cis = ablation_cis(results["raw"], expected_R, resamples=args.resamples, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    stats = ("vfr", "nd_i", "nd_h", "nd_r", "bms_mean", "bms_std", "bms_crossing")
+    print(f"{'Model':<18} {'Cell':<20} " + " ".join(f"{s:>22}" for s in stats))
+    for (model, cell), ci in cis.items():
+        point = results["metrics"].get(model, {}).get(cell, {})
+        cols = []
+        for s in stats:
+            if s in ci and point.get(s) is not None:
+                cols.append(f"{point[s]:.2f} [{ci[s][0]:.2f}, {ci[s][1]:.2f}]")
+            else:
+                cols.append("-")
+        print(f"{model:<18} {cell:<20} " + " ".join(f"{c:>22}" for c in cols))
+    print(f"\n[BOOTSTRAP] {args.resamples} resamples x {len(cis)} cells in {elapsed:.2f}s "
+          f"({CONFIDENCE:.0%} percentile intervals)")
@@ -0,0 +1,330 @@
+"""
+Incremental per-cell statistics
+
+Streaming accumulators for the V9 sample fields, one per result cell:
+(model, case) in the main experiment and (model, case, temp) in the
+ablation. Each cell keeps status / verdict counts, Welford mean and
+variance states for I, H, R and the boundary margin I - H*R, and
+positive / negative margin counts. An accumulator is updated in O(1) per
+sample, so the ablation metrics, the run summary and the live metrics
+endpoint read a cell's state instead of rescanning its entries.
+
+`track_store` wraps a result store (result_log / result_store) so that
+every appended sample also updates the table. On close, the table is
+saved next to the log (`data/*.stats.json`) together with the store's
+watermark. The next open reuses it while the watermark still matches and
+rebuilds it from the samples otherwise. `reaudit.py` rewrites samples in
+place and rebuilds the table afterwards.
+
+Usage (per-cell state from the saved table; --rebuild to rescan samples):
+    python src/cell_stats.py [main|ablation] [--rebuild]
+"""
+import argparse
+import json
+import math
+import os
+import threading
+from collections import Counter
+from result_log import nest, flatten, atomic_write_json
+
+VALID_VERDICTS = ("GUILTY", "NOT_GUILTY")
+
+
+def stats_path(log_path):
+    """data/x.jsonl -> data/x.stats.json"""
+    base, _ = os.path.splitext(log_path)
+    return f"{base}.stats.json"
+
+
+class Welford:
+    """Running count / mean / sum of squared deviations (Welford's algorithm)"""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def std(self, ddof=0):
+        """标准差（ddof=0 与 np.std 一致）；样本不足时返回 None"""
+        if self.n <= ddof:
+            return None
+        return math.sqrt(max(self.m2, 0.0) / (self.n - ddof))
+
+    def to_list(self):
+        return [self.n, self.mean, self.m2]
+
+
+class CellStats:
+    """
+    One cell's accumulators. Counts cover all samples; R moments cover
+    samples with a valid verdict (analyze_results' definition); I / H / R
+    values and margins cover fully parsed samples (calculate_metrics').
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.status = Counter()      # parse_status（消融）或 audit_status（主实验）
+        self.verdicts = Counter()
+        self.hallucinated = 0
+        self.decided_r = Welford()   # 有效判决且 R != -1
+        self.full = 0                # parse_status == "full"
+        self.full_guilty = 0
+        self.i = Welford()
+        self.h = Welford()
+        self.r_values = Counter()    # R 取值 -> 次数（R 为离散刻度，保留分布以便按任意 expected_R 计算偏离）
+        self.margin = Welford()
+        self.margin_pos = 0
+        self.margin_neg = 0
+
+    def add(self, entry):
+        self.n += 1
+        self.status[entry.get("parse_status", entry.get("audit_status", "error"))] += 1
+        verdict = entry.get("verdict")
+        self.verdicts[verdict] += 1
+        if entry.get("r_hallucinated"):
+            self.hallucinated += 1
+        R = entry.get("R", -1)
+        if verdict in VALID_VERDICTS and R != -1:
+            self.decided_r.add(R)
+        if entry.get("parse_status") != "full":
+            return
+        self.full += 1
+        self.full_guilty += verdict == "GUILTY"
+        I, H = entry["I"], entry["H"]
+        if I != -1:
+            self.i.add(I)
+        if H != -1:
+            self.h.add(H)
+        if R != -1:
+            self.r_values[R] += 1
+        if -1 not in (I, H, R):
+            margin = I - H * R
+            self.margin.add(margin)
+            self.margin_pos += margin > 0
+            self.margin_neg += margin < 0
+
+    @classmethod
+    def from_entries(cls, entries):
+        stats = cls()
+        for entry in entries:
+            stats.add(entry)
+        return stats
+
+    # ---------- 读取 ----------
+    def guilty_rate(self):
+        """有效判决中 GUILTY 的比例；没有有效判决时为 None"""
+        decided = sum(self.verdicts[v] for v in VALID_VERDICTS)
+        return self.verdicts["GUILTY"] / decided if decided else None
+
+    def ablation_metrics(self, expected_R):
+        """与 run_ablation.calculate_metrics 相同的指标字典（VFR / ND / BMS / 解析率）"""
+        total = self.n
+        collapsed_rate = (self.status["collapsed"] + self.status["error"]) / total if total > 0 else 0
+        verdict_only_rate = self.status["verdict_only"] / total if total > 0 else 0
+        full_parse_rate = self.status["full"] / total if total > 0 else 0
+        rates = {
+            "collapsed_rate": collapsed_rate,
+            "verdict_only_rate": verdict_only_rate,
+            "full_parse_rate": full_parse_rate,
+            "valid_samples": self.full,
+        }
+        if self.full < 2:
+            return {"vfr": None, "nd_i": None, "nd_h": None, "nd_r": None,
+                    "bms_mean": None, "bms_std": None, "bms_crossing": None, **rates}
+
+        r_total = sum(self.r_values.values())
+        off = sum(n for r, n in self.r_values.items() if r != expected_R)
+        if self.margin.n > 1:
+            bms_mean, bms_std = self.margin.mean, self.margin.std()
+            bms_crossing = (self.margin_pos / self.margin.n) * (self.margin_neg / self.margin.n)
+        else:
+            bms_mean, bms_std, bms_crossing = None, None, None
+        return {
+            "vfr": min(self.full_guilty, self.full - self.full_guilty) / self.full,
+            "nd_i": self.i.std() if self.i.n > 1 else 0,
+            "nd_h": self.h.std() if self.h.n > 1 else 0,
+            "nd_r": off / r_total if r_total else 0,
+            "bms_mean": bms_mean,
+            "bms_std": bms_std,
+            "bms_crossing": bms_crossing,  # P(m>0)*P(m<0), max=0.25
+            **rates,
+        }
+
+    # ---------- 持久化 ----------
+    def to_dict(self):
+        return {
+            "n": self.n,
+            "status": dict(self.status),
+            "verdicts": dict(self.verdicts),
+            "hallucinated": self.hallucinated,
+            "decided_r": self.decided_r.to_list(),
+            "full": self.full,
+            "full_guilty": self.full_guilty,
+            "i": self.i.to_list(),
+            "h": self.h.to_list(),
+            "r_values": [[r, n] for r, n in self.r_values.items()],
+            "margin": self.margin.to_list(),
+            "margin_pos": self.margin_pos,
+            "margin_neg": self.margin_neg,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.n = data["n"]
+        stats.status = Counter(data["status"])
+        stats.verdicts = Counter({(None if v == "null" else v): n for v, n in data["verdicts"].items()})
+        stats.hallucinated = data["hallucinated"]
+        stats.decided_r = Welford(*data["decided_r"])
+        stats.full = data["full"]
+        stats.full_guilty = data["full_guilty"]
+        stats.i = Welford(*data["i"])
+        stats.h = Welford(*data["h"])
+        stats.r_values = Counter({r: n for r, n in data["r_values"]})
+        stats.margin = Welford(*data["margin"])
+        stats.margin_pos = data["margin_pos"]
+        stats.margin_neg = data["margin_neg"]
+        return stats
+
+
+class StatsTable:
+    """cell key (tuple of the store's key fields) -> CellStats; thread-safe updates"""
+
+    def __init__(self, key_fields):
+        self.key_fields = tuple(key_fields)
+        self.cells = {}
+        self._lock = threading.Lock()
+
+    def add_record(self, record):
+        key = tuple(str(record[k]) for k in self.key_fields)
+        with self._lock:
+            self.cells.setdefault(key, CellStats()).add(record)
+
+    def items(self):
+        """[(key, CellStats)] 快照（供导出线程在采样进行中读取）"""
+        with self._lock:
+            return list(self.cells.items())
+
+    def get(self, key):
+        """某单元格的累加器（没有样本时为空累加器）"""
+        return self.cells.get(tuple(str(k) for k in key)) or CellStats()
+
+    @classmethod
+    def from_nested(cls, nested, key_fields):
+        """从 nest() 布局重建（同一样本多次出现时 nest 已保留最后一条）"""
+        table = cls(key_fields)
+        for record in flatten(nested, key_fields):
+            table.add_record(record)
+        return table
+
+    def save(self, path, watermark):
+        with self._lock:
+            cells = [{"key": list(key), **stats.to_dict()} for key, stats in self.cells.items()]
+        atomic_write_json({"key_fields": list(self.key_fields), "watermark": watermark, "cells": cells}, path)
+
+    @classmethod
+    def load(cls, path):
+        """读取已保存的表，返回 (table, watermark)"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        table = cls(data["key_fields"])
+        table.cells = {tuple(cell.pop("key")): CellStats.from_dict(cell) for cell in data["cells"]}
+        return table, data["watermark"]
+
+
+class TrackedStore:
+    """
+    Result store wrapper: append() / extend() also update `stats`,
+    rewrite() rebuilds it, close() saves it with the store's watermark.
+    Everything else is delegated to the wrapped store.
+    """
+
+    def __init__(self, store, stats, path):
+        self.store = store
+        self.stats = stats
+        self.path = path
+
+    def append(self, record, raw=None):
+        self.store.append(record, raw)
+        self.stats.add_record(record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def rewrite(self, records):
+        records = list(records)
+        self.store.rewrite(records)
+        self.stats = StatsTable.from_nested(nest(records, self.stats.key_fields), self.stats.key_fields)
+
+    def close(self):
+        watermark = self.store.watermark()
+        self.store.close()
+        self.stats.save(self.path, watermark)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def track_store(store, key_fields, path, nested=None):
+    """
+    给样本存储挂上单元格统计：水位线一致时读取已保存的表，否则从样本重建
+    （nested 为调用方已读出的 nest() 布局，可省去再扫描一遍存储）
+    """
+    if os.path.exists(path):
+        try:
+            table, watermark = StatsTable.load(path)
+            if watermark == store.watermark() and table.key_fields == tuple(key_fields):
+                return TrackedStore(store, table, path)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # 损坏或旧格式：重建
+    if nested is None:
+        nested = nest(store.records(), key_fields)
+    return TrackedStore(store, StatsTable.from_nested(nested, key_fields), path)
+
+
+if __name__ == "__main__":
+    import run_experiment
+    import run_ablation
+    from result_store import open_store, DB_FILE
+
+    parser = argparse.ArgumentParser(description="Per-cell state from the incremental statistics table")
+    parser.add_argument("experiment", nargs="?", default="ablation", choices=("main", "ablation"))
+    parser.add_argument("--rebuild", action="store_true", help="rescan the stored samples")
+    args = parser.parse_args()
+
+    runner = run_experiment if args.experiment == "main" else run_ablation
+    if not os.path.exists(runner.LOG_FILE if runner.RESULT_BACKEND == "jsonl" else DB_FILE):
+        raise SystemExit(f"No {args.experiment} samples in the {runner.RESULT_BACKEND} store yet")
+    path = stats_path(runner.LOG_FILE)
+    if args.rebuild and os.path.exists(path):
+        os.remove(path)
+    with track_store(open_store(runner.RESULT_BACKEND, runner.LOG_FILE, args.experiment),
+                     runner.LOG_KEYS, path) as store:
+        for key, cell in store.stats.cells.items():
+            guilty = cell.guilty_rate()
+            r_std = cell.decided_r.std()
+            line = (f"{' / '.join(key):<40} n={cell.n:<4} "
+                    f"guilty={'-' if guilty is None else f'{guilty:.0%}':<5} "
+                    f"R={cell.decided_r.mean:.2f}±{0 if r_std is None else r_std:.2f}")
+            if args.experiment == "ablation":
+                m = cell.ablation_metrics(run_ablation.CASE_CONFIG[key[1]]["expected_R"])
+                if m["vfr"] is not None:
+                    line += f" VFR={m['vfr']:.2f}"
+                if m["bms_crossing"] is not None:
+                    line += f" BCP={m['bms_crossing']:.3f}"
+            print(line)
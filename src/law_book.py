@@ -0,0 +1,154 @@
+"""
+Append-only law book
+
+Precedent store for experiments/precedent_evolution.py. Rulings are
+appended as JSON lines to one record file, and a sidecar offset index
+(`*.idx`, the int64 start offset of every record) lets any ruling be read
+with one seek instead of re-reading the whole book. Appends are buffered
+and written FLUSH_EVERY records at a time: one write to the record file
+and one to the offset index per batch.
+
+A prompt gets a bounded selection instead of the whole history: the
+RECENT latest rulings plus the RELEVANT older ones that score highest
+against the current case in a BM25 index (precedent_index.py). A step
+reads at most RECENT + RELEVANT records, however long the history grows.
+
+Reopening a book checks the offset index against the record file and
+rebuilds it from a scan when it is missing or stale (e.g. a run stopped
+between the two writes of a batch); a partially written last line is cut
+off.
+"""
+import json
+import os
+import numpy as np
+from precedent_index import PrecedentIndex
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+RECENT = 3        # 每次选取的最近判例数
+RELEVANT = 3      # 另外从更早的判例中按相关度选取的条数
+FLUSH_EVERY = 8   # 缓冲多少条判例后批量写盘（close 时总会写出剩余的）
+OFFSET_DTYPE = np.dtype("<i8")
+
+
+def index_path(path):
+    """common_law_db.jsonl -> common_law_db.idx"""
+    base, _ = os.path.splitext(path)
+    return f"{base}.idx"
+
+
+class LawBook:
+    """
+    追加式判例记录 + 偏移索引。document(record) 为检索用的文本；
+    记录按追加顺序编号 0..n-1（已写盘的在 offsets 中，缓冲中的在 pending 中）
+    """
+
+    def __init__(self, path, document, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.idx_path = index_path(path)
+        self.document = document
+        self.flush_every = flush_every
+        self.offsets, self.size = self._load_offsets()
+        self.pending = []
+        self._reader = None
+        self.index = PrecedentIndex()
+        for record in self.records():
+            self.index.add(document(record))
+
+    def _load_offsets(self):
+        """读取偏移索引并与记录文件核对，不一致时扫描重建；返回 (offsets, 已写盘的字节数)"""
+        if not os.path.exists(self.path):
+            if os.path.exists(self.idx_path):
+                os.remove(self.idx_path)  # 没有记录文件的索引已失效
+            return [], 0
+        size = os.path.getsize(self.path)
+        if os.path.exists(self.idx_path):
+            offsets = np.fromfile(self.idx_path, dtype=OFFSET_DTYPE).tolist()
+            if not offsets and size == 0:
+                return [], 0
+            if offsets and offsets[-1] < size:
+                with open(self.path, "rb") as f:
+                    f.seek(offsets[-1])
+                    if offsets[-1] + len(f.readline()) == size:
+                        return offsets, size
+        return self._rebuild_offsets()
+
+    def _rebuild_offsets(self):
+        offsets, end = [], 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 写了一半的最后一行
+                offsets.append(end)
+                end += len(line)
+        if end != os.path.getsize(self.path):
+            os.truncate(self.path, end)
+        np.asarray(offsets, dtype=OFFSET_DTYPE).tofile(self.idx_path)
+        return offsets, end
+
+    def __len__(self):
+        return len(self.offsets) + len(self.pending)
+
+    # ---------- 写入 ----------
+    def append(self, record):
+        """追加一条判例（先进缓冲区），返回编号"""
+        seq = len(self)
+        self.pending.append(record)
+        self.index.add(self.document(record))
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+        return seq
+
+    def flush(self):
+        """缓冲区批量写盘：先写记录，再追加偏移"""
+        if not self.pending:
+            return
+        lines = [(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in self.pending]
+        offsets = (self.size + np.cumsum([0] + [len(line) for line in lines[:-1]])).astype(OFFSET_DTYPE)
+        with open(self.path, "ab") as f:
+            f.write(b"".join(lines))
+        with open(self.idx_path, "ab") as f:
+            f.write(offsets.tobytes())
+        self.offsets.extend(offsets.tolist())
+        self.size += sum(len(line) for line in lines)
+        self.pending = []
+
+    # ---------- 读取 ----------
+    def get(self, seq):
+        """第 seq 条判例（已写盘的一次 seek + readline）"""
+        if seq >= len(self.offsets):
+            return self.pending[seq - len(self.offsets)]
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(self.offsets[seq])
+        return json.loads(self._reader.readline())
+
+    def records(self):
+        """按顺序遍历全部判例"""
+        if self.offsets:
+            with open(self.path, "rb") as f:
+                for _ in range(len(self.offsets)):
+                    yield json.loads(f.readline())
+        yield from self.pending
+
+    def select(self, query, recent=RECENT, relevant=RELEVANT):
+        """最近 recent 条 + 更早判例中与 query 最相关的至多 relevant 条，按编号顺序返回 [(seq, record)]"""
+        n = len(self)
+        start = max(0, n - recent)
+        chosen = list(range(start, n))
+        if relevant and start:
+            chosen += [doc for doc, _ in self.index.search(query, relevant, before=start)]
+        return [(seq, self.get(seq)) for seq in sorted(chosen)]
+
+    def close(self):
+        self.flush()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,262 @@
+"""
+Live sweep metrics
+
+Process-wide counters for long-running sweeps, exported in the Prometheus
+text format. The runners report pending samples per (model, case) when
+they start, every recorded sample with its parse / audit status, and every
+Ollama request with its latency and outcome; requests served from the
+response cache are counted as cache hits, not latency. From those, the
+exporter derives samples remaining, throughput, ETA and the time since each model
+last finished a sample, which is how a stalled model shows up. Where the
+runner keeps incremental cell statistics (cell_stats.py), each cell's
+Guilty share, R spread and boundary-crossing probability are exported too.
+
+Nothing is exported unless configured (environment variables):
+- METRICS_PORT  Serve /metrics on this port (e.g. 9464; 0 = off)
+- METRICS_HOST  Bind address for the endpoint (default 127.0.0.1)
+- METRICS_FILE  Rewrite this file every METRICS_INTERVAL seconds, e.g. for
+                node_exporter's textfile collector (default: off)
+
+Usage (one-off snapshot of a running sweep):
+    curl -s localhost:9464/metrics | grep sweep_
+"""
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_FILE = os.environ.get("METRICS_FILE", "")
+METRICS_INTERVAL = 10  # 指标文件的重写间隔（秒）
+
+# 请求耗时直方图的桶上界（秒）：本地小模型 1~10s，带 thinking 的回答可达数分钟
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+def label_str(**labels):
+    """Prometheus 标签：{k="v",...}（转义反斜杠、引号和换行）"""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Metrics:
+    """Thread-safe sweep counters; render() produces the Prometheus text exposition"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = None
+        self.remaining = {}           # (experiment, model, case) -> 待跑样本数
+        self.done = Counter()         # (experiment, model, case, status) -> 本进程完成的样本数
+        self.last_sample = {}         # model -> 最近一次完成样本的时间
+        self.in_flight = Counter()    # model -> 在途请求数
+        self.latency = {}             # model -> [各桶计数..., 总耗时, 总数]
+        self.failures = Counter()     # (model, kind) -> 失败请求数（kind: timeout / error）
+        self.cache_hits = Counter()   # model -> 响应缓存命中数（不计入耗时直方图）
+        self.cell_stats = {}          # experiment -> cell_stats.StatsTable（单元格的增量统计）
+
+    # ---------- 运行器调用 ----------
+    def expect(self, experiment, cells):
+        """登记某实验的待跑样本：cells 为 (model, case) 序列，每个待跑样本一项（覆盖该实验之前的登记）"""
+        counts = Counter(cells)
+        with self.lock:
+            if self.started is None:
+                self.started = time.monotonic()
+            self.remaining = {key: n for key, n in self.remaining.items() if key[0] != experiment}
+            for (model, case), n in counts.items():
+                self.remaining[(experiment, model, case)] = n
+
+    def attach(self, experiment, stats):
+        """挂上某实验样本存储的 StatsTable：导出每个单元格的 Guilty 比例、R 标准差和边界穿越概率"""
+        with self.lock:
+            self.cell_stats[experiment] = stats
+
+    def sample_done(self, experiment, model, case, status):
+        with self.lock:
+            key = (experiment, model, case)
+            if self.remaining.get(key):
+                self.remaining[key] -= 1
+            self.done[(*key, status)] += 1
+            self.last_sample[model] = time.time()
+
+    def request(self, model):
+        """
+        with METRICS.request(model) as request: 统计在途请求、耗时和失败（异常照常抛出）。
+        响应来自响应缓存时置 request.cached = True：只计缓存命中，不进耗时直方图
+        """
+        return _Request(self, model)
+
+    def _finish(self, model, seconds, error, cached=False):
+        with self.lock:
+            self.in_flight[model] -= 1
+            if error is not None:
+                kind = "timeout" if "Timeout" in type(error).__name__ else "error"
+                self.failures[(model, kind)] += 1
+                return
+            if cached:
+                self.cache_hits[model] += 1
+                return
+            hist = self.latency.setdefault(model, [0] * (len(LATENCY_BUCKETS) + 2))
+            for n, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    hist[n] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    # ---------- 导出 ----------
+    def render(self):
+        with self.lock:
+            now = time.time()
+            elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+            completed = sum(self.done.values())
+            remaining = sum(self.remaining.values())
+            rate = completed / elapsed if elapsed and completed else 0.0
+            lines = [
+                "# HELP sweep_samples_remaining Samples still to run per model and case.",
+                "# TYPE sweep_samples_remaining gauge",
+                *(f"sweep_samples_remaining{label_str(experiment=e, model=m, case=c)} {n}"
+                  for (e, m, c), n in self.remaining.items()),
+                "# HELP sweep_samples_total Samples completed by this process, by parse / audit status.",
+                "# TYPE sweep_samples_total counter",
+                *(f"sweep_samples_total{label_str(experiment=e, model=m, case=c, status=s)} {n}"
+                  for (e, m, c, s), n in self.done.items()),
+                "# HELP sweep_throughput_samples_per_second Completed samples per second since the sweep started.",
+                "# TYPE sweep_throughput_samples_per_second gauge",
+                f"sweep_throughput_samples_per_second {rate:.4f}",
+                "# HELP sweep_eta_seconds Remaining samples divided by the throughput so far.",
+                "# TYPE sweep_eta_seconds gauge",
+                f"sweep_eta_seconds {remaining / rate if rate else float('nan'):.1f}",
+                "# HELP sweep_last_sample_age_seconds Seconds since the model last completed a sample.",
+                "# TYPE sweep_last_sample_age_seconds gauge",
+                *(f"sweep_last_sample_age_seconds{label_str(model=m)} {now - t:.1f}"
+                  for m, t in self.last_sample.items()),
+                "# HELP ollama_requests_in_flight Ollama requests currently outstanding.",
+                "# TYPE ollama_requests_in_flight gauge",
+                *(f"ollama_requests_in_flight{label_str(model=m)} {n}" for m, n in self.in_flight.items()),
+                "# HELP ollama_request_failures_total Failed Ollama requests (each retry counts).",
+                "# TYPE ollama_request_failures_total counter",
+                *(f"ollama_request_failures_total{label_str(model=m, kind=k)} {n}"
+                  for (m, k), n in self.failures.items()),
+                "# HELP ollama_cache_hits_total Requests served from the response cache (not in the latency histogram).",
+                "# TYPE ollama_cache_hits_total counter",
+                *(f"ollama_cache_hits_total{label_str(model=m)} {n}" for m, n in self.cache_hits.items()),
+            ]
+            lines += ["# HELP ollama_request_seconds Latency of successful Ollama requests.",
+                      "# TYPE ollama_request_seconds histogram"]
+            for model, hist in self.latency.items():
+                for bound, count in zip(LATENCY_BUCKETS, hist):
+                    lines.append(f"ollama_request_seconds_bucket{label_str(model=model, le=bound)} {count}")
+                lines.append(f"ollama_request_seconds_bucket{label_str(model=model, le='+Inf')} {hist[-1]}")
+                lines.append(f"ollama_request_seconds_sum{label_str(model=model)} {hist[-2]:.3f}")
+                lines.append(f"ollama_request_seconds_count{label_str(model=model)} {hist[-1]}")
+
+            # 每个指标族的 HELP/TYPE 与样本必须连续：四个单元格指标各自成组
+            samples = ["# HELP sweep_cell_samples Samples stored per cell (all runs).",
+                       "# TYPE sweep_cell_samples gauge"]
+            guilty_ratio = ["# HELP sweep_cell_guilty_ratio Share of GUILTY among valid verdicts per cell.",
+                            "# TYPE sweep_cell_guilty_ratio gauge"]
+            r_spread = ["# HELP sweep_cell_r_std Standard deviation of R over valid verdicts per cell.",
+                        "# TYPE sweep_cell_r_std gauge"]
+            margin_crossing = ["# HELP sweep_cell_margin_crossing P(margin>0) * P(margin<0) over fully parsed samples per cell.",
+                               "# TYPE sweep_cell_margin_crossing gauge"]
+            for experiment, table in self.cell_stats.items():
+                for key, cell in table.items():
+                    labels = label_str(experiment=experiment, model=key[0], case="_T".join(key[1:]))
+                    samples.append(f"sweep_cell_samples{labels} {cell.n}")
+                    guilty = cell.guilty_rate()
+                    if guilty is not None:
+                        guilty_ratio.append(f"sweep_cell_guilty_ratio{labels} {guilty:.4f}")
+                    r_std = cell.decided_r.std()
+                    if r_std is not None:
+                        r_spread.append(f"sweep_cell_r_std{labels} {r_std:.4f}")
+                    if cell.margin.n:
+                        crossing = (cell.margin_pos / cell.margin.n) * (cell.margin_neg / cell.margin.n)
+                        margin_crossing.append(f"sweep_cell_margin_crossing{labels} {crossing:.4f}")
+            lines += samples + guilty_ratio + r_spread + margin_crossing
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """原子地重写指标文件（读取方不会看到写了一半的文件）"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+class _Request:
+    def __init__(self, metrics, model):
+        self.metrics = metrics
+        self.model = model
+        self.cached = False
+
+    def __enter__(self):
+        with self.metrics.lock:
+            self.metrics.in_flight[self.model] += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._finish(self.model, time.perf_counter() - self.start, exc, self.cached)
+        return False
+
+
+METRICS = Metrics()
+_exporting = False
+_export_lock = threading.Lock()
+
+
+def make_handler(metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def rewrite_loop(path):
+    while True:
+        try:
+            METRICS.write(path)
+        except OSError as e:
+            print(f"[WARN] metrics file {path}: {e}")
+        time.sleep(METRICS_INTERVAL)
+
+
+def start_export():
+    """按配置启动 /metrics 端点和 / 或指标文件线程（进程内只启动一次，未配置时什么都不做）"""
+    global _exporting
+    with _export_lock:
+        if _exporting:
+            return
+        _exporting = True
+    if METRICS_PORT:
+        server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), make_handler(METRICS))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[METRICS] http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        threading.Thread(target=rewrite_loop, args=(METRICS_FILE,), daemon=True).start()
+        atexit.register(METRICS.write, METRICS_FILE)  # 退出时写一次最终值
+        print(f"[METRICS] rewriting {METRICS_FILE} every {METRICS_INTERVAL}s")
+
+
+def track(experiment, cells, stats=None):
+    """运行器开始采样时调用：登记待跑样本 (model, case)（及单元格统计表）并按配置启动导出"""
+    METRICS.expect(experiment, cells)
+    if stats is not None:
+        METRICS.attach(experiment, stats)
+    start_export()
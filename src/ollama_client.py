@@ -0,0 +1,487 @@
+"""
+Shared Ollama HTTP client
+
+All experiment scripts talk to Ollama through one pooled `requests.Session`
+per host, so TCP connections are kept alive and reused across samples
+instead of being re-opened for every `requests.post`.
+
+`post_stream` is the streaming variant: it folds Ollama's NDJSON chunks
+into the same response shape as `post` and can hang up as soon as a
+`stop(text)` callback is satisfied, which makes Ollama stop generating.
+`response_stats` extracts the per-request timings Ollama reports (load,
+prompt evaluation and generation durations and token counts) so the
+runners can store them with every sample; `timing_report.py` aggregates
+them per model.
+
+Prompt reuse: Ollama keeps each loaded model's KV cache and only
+evaluates the part of a prompt after the longest prefix it shares with
+the cached one. The runners put the static template first, keep decoding
+options that force a reload (num_ctx) fixed within a run, and record each
+prompt's length (`prompt_chars`), so `timing_report.py` can estimate the
+prompt-eval tokens the cache saved. The `context` array /api/generate
+returns (prompt + answer tokens) is only a valid prefix for a follow-up
+turn of the same conversation; every request here is a fresh prompt, so
+it is never sent back and is dropped before responses are cached.
+
+Responses to reproducible requests are served from the on-disk cache in
+`response_cache.py` (OLLAMA_CACHE=auto|on|off). A cache hit still carries
+the original request's timing fields, so it is marked `cached: True`;
+`timing_report.py` and the live latency metrics leave such samples out.
+
+With OLLAMA_HOSTS set, `get_client()` returns an `EndpointPool` instead:
+the same interface spread over several Ollama hosts, with per-host
+capacity, least-outstanding-requests dispatch and health checks.
+
+Configuration (environment variables):
+- OLLAMA_HOST       Ollama base URL (default http://localhost:11434)
+- OLLAMA_POOL_SIZE  Max pooled keep-alive connections per host (default 8)
+- OLLAMA_HOSTS      Comma-separated hosts with optional capacity, e.g.
+                    "gpu1:11434=4,gpu2:11434=2" (overrides OLLAMA_HOST)
+"""
+import json
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from response_cache import get_cache
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+DEFAULT_HOST = "http://localhost:11434"
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", DEFAULT_HOST)
+POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", "8"))  # 应 >= 并发 worker 数
+DEFAULT_TIMEOUT = 300
+
+# 多端点：host[=并发容量]，逗号分隔；容量缺省为 1（Ollama 的单个并行槽位）
+OLLAMA_HOSTS = os.environ.get("OLLAMA_HOSTS", "")
+DEFAULT_CAPACITY = 1
+HEALTH_TIMEOUT = 3
+DOWN_RETRY = 30  # 被标记 down 的端点多少秒后重新做健康检查
+
+GENERATE_PATH = "/api/generate"
+CHAT_PATH = "/api/chat"
+PS_PATH = "/api/ps"
+TAGS_PATH = "/api/tags"
+
+# Ollama 最终 chunk / 非流式响应中的计时字段（*_duration 单位为纳秒，*_count 为 token 数）
+TIMING_FIELDS = ("total_duration", "load_duration", "prompt_eval_count",
+                 "prompt_eval_duration", "eval_count", "eval_duration")
+# 不回传给服务端的响应字段（generate 的 context：prompt + 回答的 token 数组，只对同一对话的下一轮有效）
+DROPPED_FIELDS = ("context",)
+
+
+def merge_chunk(data, chunk):
+    """
+    把一个流式 chunk 合并进与非流式响应同形的 dict（文本字段拼接，其余字段覆盖），
+    返回本 chunk 新增的答案文本（generate 的 response / chat 的 message.content）
+    """
+    if "error" in chunk:
+        raise RuntimeError(chunk["error"])
+    for key, value in chunk.items():
+        if key == "message":
+            message = data.setdefault("message", {})
+            for k, v in value.items():
+                message[k] = message.get(k, "") + v if k in ("content", "thinking") else v
+        elif key in ("response", "thinking"):
+            data[key] = data.get(key, "") + value
+        else:
+            data[key] = value
+    if "message" in chunk:
+        return chunk["message"].get("content", "")
+    return chunk.get("response", "")
+
+
+def stream_key_payload(payload, stop):
+    """流式请求的缓存 key：提前结束的回答取决于 stop 回调，一并计入"""
+    return {**payload, "stream": True, "stop": getattr(stop, "__qualname__", None)}
+
+
+def stream_stats(data):
+    """流式响应的生成统计（写入样本 entry）；非流式响应返回 {}"""
+    if "stream_chunks" not in data:
+        return {}
+    stats = {
+        "eval_tokens": data.get("eval_count", data["stream_chunks"]),
+        "early_stop": data.get("early_stop", False),
+    }
+    # 客户端测得的首 token 时间与流总时长（纳秒）：提前结束的回答没有服务端计时字段
+    for key in ("ttft_duration", "stream_duration"):
+        if key in data:
+            stats[key] = data[key]
+    return stats
+
+
+def prompt_chars(payload):
+    """请求中 prompt 的字符数（chat 为全部消息内容之和）"""
+    if "messages" in payload:
+        return sum(len(m.get("content", "")) for m in payload["messages"])
+    return len(payload.get("prompt", ""))
+
+
+def drop_fields(data):
+    for key in DROPPED_FIELDS:
+        data.pop(key, None)
+    return data
+
+
+def response_stats(data, payload=None):
+    """
+    写入样本 entry 的请求统计：Ollama 的计时字段 + 流式生成统计；
+    给出请求 payload 时另记 prompt_chars（timing_report 据此估算 KV 缓存省下的 prompt 评估）；
+    从响应缓存取回的响应另记 cached=True（其计时字段是原请求的）
+    """
+    stats = {key: data[key] for key in TIMING_FIELDS if key in data}
+    stats.update(stream_stats(data))
+    if payload is not None and stats:
+        stats["prompt_chars"] = prompt_chars(payload)
+    if data.get("cached"):
+        stats["cached"] = True
+    return stats
+
+
+def early_stop_summary(entries):
+    """汇总带 eval_tokens 的样本：提前结束的比例与平均生成 token 数（提前结束 vs 自然结束）"""
+    streamed = [e for e in entries if "eval_tokens" in e]
+    if not streamed:
+        return None
+    stopped = [e["eval_tokens"] for e in streamed if e["early_stop"]]
+    finished = [e["eval_tokens"] for e in streamed if not e["early_stop"]]
+    line = (f"Early stop: {len(stopped)}/{len(streamed)} streamed samples, "
+            f"{sum(stopped) + sum(finished)} tokens generated")
+    if stopped:
+        line += f" | avg {sum(stopped) / len(stopped):.0f} tokens when stopped"
+    if finished:
+        line += f" vs {sum(finished) / len(finished):.0f} when run to completion"
+    return line
+
+
+def normalize_host(host):
+    """与 Ollama 一致：OLLAMA_HOST 可以省略协议，例如 0.0.0.0:11434"""
+    host = (host or DEFAULT_HOST).strip().rstrip("/")
+    if "://" not in host:
+        host = "http://" + host
+    return host
+
+
+class OllamaClient:
+    """Thread-safe Ollama client backed by a keep-alive connection pool"""
+
+    def __init__(self, host=None, pool_size=None, use_cache=True):
+        self.host = normalize_host(host or OLLAMA_HOST)
+        self.pool_size = pool_size or POOL_SIZE
+        self.cache = get_cache() if use_cache else None
+        # 非 None 时每个请求都带上该 keep_alive（scheduler.py 排空某模型队列期间设为 -1，保持常驻）
+        self.pinned_keep_alive = None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, path, payload, timeout=DEFAULT_TIMEOUT):
+        """POST JSON 到指定端点，返回解析后的 JSON（HTTP 错误抛出异常；可复现的请求先查缓存）"""
+        key = self.cache.key(path, payload) if self.cache else None
+        if key:
+            data = self.cache.get(key)
+            if data is not None:
+                data["cached"] = True  # 计时字段是原请求的，不是本次实测（timing_report / 实时指标据此跳过）
+                return data
+        res = self.session.post(self.host + path, json=self._with_keep_alive(payload), timeout=timeout)
+        res.raise_for_status()
+        data = drop_fields(res.json())
+        if key:
+            self.cache.put(key, data)
+        return data
+
+    def post_stream(self, path, payload, stop=None, timeout=DEFAULT_TIMEOUT):
+        """
+        post 的流式版本，返回与非流式相同形状的响应 dict，另带 stream_chunks（收到的 token 数）。
+        stop(text) 对某段新增答案文本返回 True 时立即断开连接（Ollama 随之停止生成），
+        此时响应里 done=False、early_stop=True，没有最终 chunk 的计时字段。
+        """
+        key = self.cache.key(path, stream_key_payload(payload, stop)) if self.cache else None
+        if key:
+            data = self.cache.get(key)
+            if data is not None:
+                data["cached"] = True  # 计时字段是原请求的，不是本次实测（timing_report / 实时指标据此跳过）
+                return data
+        data = {}
+        chunks = 0
+        start = time.perf_counter_ns()
+        with self.session.post(self.host + path, json={**self._with_keep_alive(payload), "stream": True},
+                               timeout=timeout, stream=True) as res:
+            res.raise_for_status()
+            for line in res.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text = merge_chunk(data, chunk)
+                if chunk.get("done"):
+                    break
+                if not chunks:
+                    data["ttft_duration"] = time.perf_counter_ns() - start
+                chunks += 1
+                if stop is not None and stop(text):
+                    data["early_stop"] = True
+                    break  # 离开 with 时关闭未读完的连接
+        data["stream_chunks"] = chunks
+        data["stream_duration"] = time.perf_counter_ns() - start
+        if key:
+            self.cache.put(key, data)
+        return data
+
+    def generate(self, model, prompt, options=None, timeout=DEFAULT_TIMEOUT, **extra):
+        payload = {"model": model, "prompt": prompt, "stream": False, **extra}
+        if options is not None:
+            payload["options"] = options
+        return self.post(GENERATE_PATH, payload, timeout=timeout)
+
+    def chat(self, model, messages, options=None, timeout=DEFAULT_TIMEOUT, **extra):
+        payload = {"model": model, "messages": messages, "stream": False, **extra}
+        if options is not None:
+            payload["options"] = options
+        return self.post(CHAT_PATH, payload, timeout=timeout)
+
+    def _with_keep_alive(self, payload):
+        if self.pinned_keep_alive is None or "keep_alive" in payload:
+            return payload
+        return {**payload, "keep_alive": self.pinned_keep_alive}
+
+    def load(self, model, keep_alive=-1, timeout=DEFAULT_TIMEOUT):
+        """加载模型并等待就绪（不带 prompt 的 generate）；keep_alive=-1 常驻直到 unload"""
+        res = self.session.post(self.host + GENERATE_PATH,
+                                json={"model": model, "keep_alive": keep_alive}, timeout=timeout)
+        res.raise_for_status()
+
+    def unload(self, model, timeout=30):
+        """立即卸载模型（keep_alive=0），把显存让给下一个模型"""
+        res = self.session.post(self.host + GENERATE_PATH,
+                                json={"model": model, "keep_alive": 0}, timeout=timeout)
+        res.raise_for_status()
+
+    def running(self, timeout=5):
+        """当前已加载（常驻内存）的模型名"""
+        res = self.session.get(self.host + PS_PATH, timeout=timeout)
+        res.raise_for_status()
+        return [m["name"] for m in res.json().get("models", [])]
+
+    def capacity(self, model):
+        """该模型可同时处理的请求数（单个 host 的并发由各脚本的 WORKERS 配置）"""
+        return 1
+
+    def keep_alive(self, model, duration="5m", timeout=3):
+        """预热模型（fire-and-forget，失败静默）"""
+        try:
+            self.session.post(self.host + GENERATE_PATH,
+                              json={"model": model, "keep_alive": duration}, timeout=timeout)
+        except Exception:
+            pass
+
+    def close(self):
+        self.session.close()
+
+
+def parse_hosts(spec):
+    """"host[=capacity],..." -> [(host, capacity)]"""
+    endpoints = []
+    for item in spec.split(","):
+        host, _, capacity = item.strip().partition("=")
+        if host:
+            endpoints.append((normalize_host(host), int(capacity) if capacity else DEFAULT_CAPACITY))
+    return endpoints
+
+
+def model_tag(model):
+    """与 /api/tags 的名字一致：省略 tag 时为 :latest"""
+    return model if ":" in model else model + ":latest"
+
+
+class Endpoint:
+    """一个 Ollama host：客户端 + 并发容量 + 在途请求数 + 健康状态 + 已拉取的模型"""
+
+    def __init__(self, host, capacity, use_cache=True):
+        self.client = OllamaClient(host, pool_size=capacity, use_cache=use_cache)
+        self.capacity = capacity
+        self.in_flight = 0
+        self.up = True
+        self.retry_at = 0.0
+        self.models = set()
+
+
+class EndpointPool:
+    """
+    Drop-in replacement for OllamaClient over several Ollama hosts. Each
+    request goes to the healthy endpoint that has the model and the fewest
+    outstanding requests relative to its capacity, waiting when all of them
+    are full. Endpoints that refuse connections are marked down, the request
+    is retried elsewhere, and the endpoint is re-checked via /api/tags after
+    DOWN_RETRY seconds.
+    """
+
+    def __init__(self, endpoints, use_cache=True):
+        self.endpoints = [Endpoint(host, capacity, use_cache) for host, capacity in endpoints]
+        self.host = ",".join(ep.client.host for ep in self.endpoints)
+        self._cond = threading.Condition()
+        for ep in self.endpoints:
+            self.check(ep)
+
+    # ---------- 健康状态 ----------
+    def check(self, ep):
+        """健康检查：GET /api/tags，成功则标记 up 并刷新可用模型"""
+        try:
+            res = ep.client.session.get(ep.client.host + TAGS_PATH, timeout=HEALTH_TIMEOUT)
+            res.raise_for_status()
+            models = {m["name"] for m in res.json().get("models", [])}
+        except Exception:
+            self.mark_down(ep)
+            return False
+        with self._cond:
+            ep.models = models
+            ep.up = True
+            self._cond.notify_all()
+        return True
+
+    def mark_down(self, ep):
+        with self._cond:
+            if ep.up:
+                print(f"[DOWN:{ep.client.host}]", end="", flush=True)
+            ep.up = False
+            ep.retry_at = time.monotonic() + DOWN_RETRY
+            self._cond.notify_all()
+
+    def _recheck_down(self):
+        """到期的 down 端点重新做健康检查（每个端点同一时刻只有一个线程在查）"""
+        now = time.monotonic()
+        with self._cond:
+            due = [ep for ep in self.endpoints if not ep.up and ep.retry_at <= now]
+            for ep in due:
+                ep.retry_at = now + DOWN_RETRY
+        for ep in due:
+            if self.check(ep):
+                print(f"[UP:{ep.client.host}]", end="", flush=True)
+
+    def serving(self, model):
+        """健康且已拉取该模型的端点"""
+        return [ep for ep in self.endpoints if ep.up and model_tag(model) in ep.models]
+
+    # ---------- 派发 ----------
+    def acquire(self, model, exclude=()):
+        """占用 在途请求数 / 容量 最小的端点的一个槽位；全部满载时等待"""
+        self._recheck_down()
+        with self._cond:
+            while True:
+                candidates = [ep for ep in self.serving(model) if ep not in exclude]
+                if not candidates:
+                    raise requests.exceptions.ConnectionError(f"No healthy endpoint serves {model}")
+                free = [ep for ep in candidates if ep.in_flight < ep.capacity]
+                if free:
+                    ep = min(free, key=lambda e: e.in_flight / e.capacity)
+                    ep.in_flight += 1
+                    return ep
+                self._cond.wait()
+
+    def release(self, ep):
+        with self._cond:
+            ep.in_flight -= 1
+            self._cond.notify_all()
+
+    def dispatch(self, model, call):
+        """在选中的端点上执行 call(client)；连接失败标记 down，404（没有该模型）则换端点重试"""
+        tried = []
+        while True:
+            ep = self.acquire(model, exclude=tried)
+            try:
+                return call(ep.client)
+            except requests.exceptions.ConnectionError:
+                self.mark_down(ep)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                with self._cond:
+                    ep.models.discard(model_tag(model))
+            finally:
+                self.release(ep)
+            tried.append(ep)
+
+    # ---------- 与 OllamaClient 相同的接口 ----------
+    def post(self, path, payload, timeout=DEFAULT_TIMEOUT):
+        return self.dispatch(payload["model"], lambda client: client.post(path, payload, timeout=timeout))
+
+    def post_stream(self, path, payload, stop=None, timeout=DEFAULT_TIMEOUT):
+        return self.dispatch(payload["model"],
+                             lambda client: client.post_stream(path, payload, stop=stop, timeout=timeout))
+
+    generate = OllamaClient.generate
+    chat = OllamaClient.chat
+
+    @property
+    def pinned_keep_alive(self):
+        return self.endpoints[0].client.pinned_keep_alive
+
+    @pinned_keep_alive.setter
+    def pinned_keep_alive(self, value):
+        for ep in self.endpoints:
+            ep.client.pinned_keep_alive = value
+
+    def capacity(self, model):
+        """所有可用端点上该模型的并发槽位之和"""
+        self._recheck_down()
+        with self._cond:
+            return sum(ep.capacity for ep in self.serving(model))
+
+    def load(self, model, keep_alive=-1, timeout=DEFAULT_TIMEOUT):
+        """在每个有该模型的端点上加载（端点失败则标记 down），一个都没加载成功时抛出异常"""
+        loaded = 0
+        for ep in self.serving(model):
+            try:
+                ep.client.load(model, keep_alive=keep_alive, timeout=timeout)
+                loaded += 1
+            except requests.exceptions.ConnectionError:
+                self.mark_down(ep)
+        if not loaded:
+            raise requests.exceptions.ConnectionError(f"No healthy endpoint could load {model}")
+
+    def unload(self, model, timeout=30):
+        for ep in self.serving(model):
+            try:
+                ep.client.unload(model, timeout=timeout)
+            except requests.exceptions.ConnectionError:
+                self.mark_down(ep)
+
+    def running(self, timeout=5):
+        models = set()
+        for ep in self.endpoints:
+            if ep.up:
+                try:
+                    models.update(ep.client.running(timeout=timeout))
+                except requests.exceptions.RequestException:
+                    self.mark_down(ep)
+        return sorted(models)
+
+    def keep_alive(self, model, duration="5m", timeout=3):
+        for ep in self.serving(model):
+            ep.client.keep_alive(model, duration, timeout=timeout)
+
+    def close(self):
+        for ep in self.endpoints:
+            ep.client.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(host=None, pool_size=None):
+    """
+    返回该 host 的共享客户端（进程内单例，首次调用时创建）；
+    未指定 host 且设置了 OLLAMA_HOSTS 时返回共享的 EndpointPool
+    """
+    endpoints = [] if host else parse_hosts(OLLAMA_HOSTS)
+    key = ",".join(h for h, _ in endpoints) if endpoints else normalize_host(host or OLLAMA_HOST)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = EndpointPool(endpoints) if endpoints else OllamaClient(key, pool_size=pool_size)
+            _clients[key] = client
+        return client
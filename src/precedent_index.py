@@ -0,0 +1,110 @@
+"""
+Lexical precedent index
+
+A BM25 index over precedent texts, kept as NumPy arrays. Pasting every
+earlier ruling into the prompt makes the prompt grow with the history,
+and the total cost of a long run grow quadratically. Instead, the
+runners retrieve the k precedents most relevant to the current scenario
+(precedent_memory.py and law_book.py decide which precedents are
+eligible and how many are shown).
+
+Documents are added once, when a ruling is made; a query scores only
+the postings of its own terms. The index lives in memory and is rebuilt
+from the stored rulings when a run starts.
+"""
+import math
+import re
+from collections import Counter
+import numpy as np
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+K1 = 1.2              # BM25 词频饱和
+B = 0.75              # BM25 文档长度归一化
+CHARS_PER_TOKEN = 4   # 估算 token 数（英文约 4 字符 / token；不依赖分词器）
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with not no if then than so but he she they them his her their you your we our".split())
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PrecedentIndex:
+    """BM25 over documents numbered 0..n-1 in insertion order"""
+
+    def __init__(self):
+        self.vocab = {}        # term -> id
+        self.postings = []     # term id -> [doc id 数组, tf 数组, 长度]（容量倍增，追加均摊 O(1)）
+        self.doc_len = np.empty(4, dtype=np.int64)  # doc id -> 词数（前 n 项有效，容量倍增）
+        self.n = 0
+        self.total_len = 0     # 所有文档词数之和（平均文档长度 = total_len / n）
+
+    def __len__(self):
+        return self.n
+
+    def add(self, text):
+        """加入一篇文档，返回文档编号"""
+        doc = self.n
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            tid = self.vocab.setdefault(term, len(self.vocab))
+            if tid == len(self.postings):
+                self.postings.append([np.empty(4, dtype=np.int64), np.empty(4, dtype=np.int64), 0])
+            self._post(tid, doc, tf)
+        if doc == len(self.doc_len):
+            self.doc_len = np.resize(self.doc_len, 2 * doc)
+        self.doc_len[doc] = length = sum(counts.values())
+        self.total_len += length
+        self.n = doc + 1
+        return doc
+
+    def _post(self, tid, doc, tf):
+        posting = self.postings[tid]
+        docs, tfs, size = posting
+        if size == len(docs):
+            posting[0] = docs = np.resize(docs, 2 * size)
+            posting[1] = tfs = np.resize(tfs, 2 * size)
+        docs[size] = doc
+        tfs[size] = tf
+        posting[2] = size + 1
+
+    def scores(self, query):
+        """query 命中的文档及其 BM25 分数 (doc ids, scores)：只读 query 各词的倒排表，与文档总数无关"""
+        hit_docs, hit_scores = [], []
+        avg_len = max(self.total_len / self.n, 1.0) if self.n else 1.0
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            docs, tfs, size = self.postings[tid]
+            docs, tfs = docs[:size], tfs[:size]
+            idf = math.log(1 + (self.n - size + 0.5) / (size + 0.5))
+            norm = K1 * (1 - B + B * self.doc_len[docs] / avg_len)
+            hit_docs.append(docs)
+            hit_scores.append(idf * tfs * (K1 + 1) / (tfs + norm))
+        if not hit_docs:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        docs, where = np.unique(np.concatenate(hit_docs), return_inverse=True)
+        return docs, np.bincount(where, weights=np.concatenate(hit_scores))
+
+    def search(self, query, k, candidates=None, before=None):
+        """
+        分数最高的 k 篇 [(doc, score)]，只含分数 > 0 的文档；同分时较新的在前。
+        candidates：可选的布尔掩码（按文档编号取值）；before：只要编号小于它的文档
+        """
+        docs, scores = self.scores(query)
+        keep = scores > 0
+        if before is not None:
+            keep &= docs < before
+        if candidates is not None:
+            keep &= np.fromiter((bool(candidates[doc]) for doc in docs), dtype=bool, count=len(docs))
+        docs, scores = docs[keep], scores[keep]
+        order = np.lexsort((-docs, -scores))[:k]
+        return [(int(docs[i]), float(scores[i])) for i in order]
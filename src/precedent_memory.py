@@ -0,0 +1,184 @@
+"""
+Tiered precedent memory
+
+Each ruling carries the WEIGHT the model assigned it (FOUNDATIONAL /
+MAJOR / MINOR), and the tier decides how it reaches later prompts:
+
+- FOUNDATIONAL rulings are never dropped. They come first and are
+  charged to the budget before anything else. At least the latest
+  FOUNDATIONAL_VERBATIM are quoted verbatim; once DIGEST_SIZE more have
+  accumulated, the oldest DIGEST_SIZE are folded into a FOUNDATIONAL
+  digest, which merges like the MAJOR ones. The section stays bounded,
+  and every foundational generation remains in a digest's span and
+  count.
+- MAJOR rulings are quoted verbatim until DIGEST_SIZE of them have
+  accumulated. They are then folded into a digest (span, verdict split,
+  R distribution, example cases). Digests merge hierarchically: every
+  DIGEST_FANOUT digests of one level become one digest of the next. The
+  number of digests grows logarithmically with the history.
+- MINOR rulings are only retrieved on demand: the BM25 index
+  (precedent_index.py) picks the ones most relevant to the current case.
+
+A digest's text is rendered once, when it is created, and cached. It is
+rebuilt only when its tier changes, that is, when it is merged into the
+next level. The per-generation prompt is bounded by FOUNDATIONAL_VERBATIM
+rulings, O(log n) digests and the retrieval budget; MAJOR and MINOR only
+get what the foundational section leaves.
+"""
+import re
+from collections import Counter
+from precedent_index import PrecedentIndex, estimate_tokens
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+TIERS = ("FOUNDATIONAL", "MAJOR", "MINOR")
+DEFAULT_TIER = "MINOR"   # 没有 WEIGHT 行的判决按 MINOR 处理（只在相关时检索）
+DIGEST_SIZE = 5          # 每累积多少条 MAJOR 判决折叠成一条摘要
+DIGEST_FANOUT = 4        # 同一层累积多少条摘要后合并为上一层的一条
+DIGEST_EXAMPLES = 3      # 摘要中列出的案例标题数
+FOUNDATIONAL_VERBATIM = 12  # 至少原文引用最近这么多条 FOUNDATIONAL 判决；再多出 DIGEST_SIZE 条时把最早的折叠成摘要
+
+
+def parse_weight(text):
+    """回答中的 WEIGHT: [FOUNDATIONAL / MAJOR / MINOR]；缺失或无法识别时为 DEFAULT_TIER"""
+    match = re.search(rf"WEIGHT:\s*\[?\s*({'|'.join(TIERS)})", text, re.IGNORECASE)
+    return match.group(1).upper() if match else DEFAULT_TIER
+
+
+def verdict_label(verdict_text):
+    text = verdict_text.lower()
+    if "not guilty" in text:
+        return "Not Guilty"
+    return "Guilty" if "guilty" in text else "Other"
+
+
+class Digest:
+    """同一层级（MAJOR / FOUNDATIONAL）一段连续判决的可合并摘要；文本在创建时渲染一次"""
+
+    def __init__(self, tier, gens, verdicts, r_values, examples):
+        self.tier = tier
+        self.gens = gens              # 被折叠的判决代数（按时间顺序）
+        self.verdicts = verdicts      # Counter: Guilty / Not Guilty / Other
+        self.r_values = r_values      # Counter: R 值 -> 次数
+        self.examples = examples      # 代表性案例标题
+        self.text = self.render()
+
+    @classmethod
+    def from_entries(cls, tier, gens, entries):
+        return cls(tier, list(gens),
+                   Counter(verdict_label(e["verdict_text"]) for e in entries),
+                   Counter(e["parsed_math"]["R"] for e in entries),
+                   [e["title"] for e in entries[:DIGEST_EXAMPLES]])
+
+    @classmethod
+    def merge(cls, digests):
+        examples = []
+        for digest in digests:
+            examples += [t for t in digest.examples if t not in examples]
+        return cls(digests[0].tier, [g for d in digests for g in d.gens],
+                   sum((d.verdicts for d in digests), Counter()),
+                   sum((d.r_values for d in digests), Counter()),
+                   examples[:DIGEST_EXAMPLES])
+
+    def render(self):
+        verdicts = ", ".join(f"{label} {n}" for label, n in self.verdicts.most_common())
+        r_dist = ", ".join(f"R={r:g} x{n}" for r, n in sorted(self.r_values.items(), reverse=True))
+        return (f"Gen-{self.gens[0]}..Gen-{self.gens[-1]} | {len(self.gens)} {self.tier} rulings | {verdicts}\n"
+                f"Entropy: {r_dist}\n"
+                f"Cases: {'; '.join(self.examples)}\n"
+                "------------------------------------------\n")
+
+
+class PrecedentMemory:
+    """
+    判例按层级保存。block(idx, entry) 渲染单条判例，document(entry) 为检索用的文本，
+    entry 需包含 weight / title / verdict_text / parsed_math["R"]
+    """
+
+    def __init__(self, block, document):
+        self.block = block
+        self.document = document
+        self.entries = []
+        self.index = PrecedentIndex()
+        self.foundational = []   # 原文引用的 FOUNDATIONAL 判决代数（少于 FOUNDATIONAL_VERBATIM + DIGEST_SIZE 条）
+        self.foundational_levels = []  # FOUNDATIONAL 摘要，分层方式同 levels
+        self.pending_major = []  # 尚未折叠的 MAJOR 判决代数
+        self.levels = []         # levels[l] = 第 l 层的 MAJOR 摘要（每层少于 DIGEST_FANOUT 条）
+        self.minor = []
+        self.is_minor = []       # 逐条判例：是否 MINOR（检索的候选掩码）
+
+    @classmethod
+    def from_history(cls, history, block, document):
+        memory = cls(block, document)
+        for entry in history:
+            memory.add(entry)
+        return memory
+
+    def add(self, entry):
+        gen = len(self.entries)
+        self.entries.append(entry)
+        self.index.add(self.document(entry))
+        tier = entry.get("weight", DEFAULT_TIER)
+        self.is_minor.append(tier not in ("FOUNDATIONAL", "MAJOR"))
+        if tier == "FOUNDATIONAL":
+            self.foundational.append(gen)
+            if len(self.foundational) == FOUNDATIONAL_VERBATIM + DIGEST_SIZE:
+                gens, self.foundational = self.foundational[:DIGEST_SIZE], self.foundational[DIGEST_SIZE:]
+                self._fold(tier, gens, self.foundational_levels)
+        elif tier == "MAJOR":
+            self.pending_major.append(gen)
+            if len(self.pending_major) == DIGEST_SIZE:
+                gens, self.pending_major = self.pending_major, []
+                self._fold(tier, gens, self.levels)
+        else:
+            self.minor.append(gen)
+
+    def _fold(self, tier, gens, levels):
+        self._push(Digest.from_entries(tier, gens, [self.entries[g] for g in gens]), 0, levels)
+
+    def _push(self, digest, level, levels):
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(digest)
+        if len(levels[level]) == DIGEST_FANOUT:
+            merged, levels[level] = levels[level], []
+            self._push(Digest.merge(merged), level + 1, levels)
+
+    def digests(self, levels=None):
+        """某一层级的所有摘要（默认 MAJOR），按时间顺序（高层的更早）"""
+        return [d for level in reversed(self.levels if levels is None else levels) for d in level]
+
+    def render(self, query, budget, k):
+        """
+        放进 prompt 的判例文本：FOUNDATIONAL 摘要与原文 -> MAJOR 摘要与未折叠的 MAJOR 原文 -> 与 query 最相关的
+        至多 k 条 MINOR 判例。FOUNDATIONAL 一节总是完整给出并先从 budget 中扣除，其余两节只用剩余预算；
+        只有 FOUNDATIONAL 一节本身超过 budget 时总长才会超出（此时打印提示，MAJOR / MINOR 不再占用预算）。
+        前两节基本只在末尾增长、随案件变化的检索结果在最后，相邻两代的文本共享最长前缀（KV 缓存复用）
+        """
+        foundational = ([d.text for d in self.digests(self.foundational_levels)]
+                        + [self.block(g, self.entries[g]) for g in self.foundational])
+        sections, used = [], sum(estimate_tokens(text) for text in foundational)
+        if foundational:
+            sections.append("[FOUNDATIONAL]\n" + "".join(foundational))
+        if used > budget:
+            print(f"⚠️ FOUNDATIONAL precedents need ~{used} tokens, over the {budget}-token budget; "
+                  f"MAJOR / MINOR precedents omitted")
+
+        def take(title, texts):
+            nonlocal used
+            kept = []
+            for text in texts:
+                cost = estimate_tokens(text)
+                if used + cost <= budget:
+                    kept.append(text)
+                    used += cost
+            if kept:
+                sections.append(f"[{title}]\n" + "".join(kept))
+
+        take("MAJOR DIGESTS", [d.text for d in self.digests()]
+             + [self.block(g, self.entries[g]) for g in self.pending_major])
+        if self.minor and k:
+            hits = [doc for doc, _ in self.index.search(query, k, candidates=self.is_minor)]
+            take("RELEVANT MINOR PRECEDENTS", (self.block(g, self.entries[g]) for g in sorted(hits)))
+        return "".join(sections)
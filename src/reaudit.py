@@ -0,0 +1,129 @@
+"""
+Bulk re-parse / re-audit
+
+Streams the raw responses kept by the runners (SAVE_RAW) through the
+current parser in a multiprocessing pool, rewrites the parsed columns and
+audit / parse statuses in the sample store, and regenerates the result
+JSON and the incremental cell statistics (cell_stats.py). A parser fix costs seconds of CPU instead of re-running inference.
+Samples recorded without a raw response are left unchanged.
+
+Usage:
+    python src/reaudit.py [main|ablation|all] [--workers N] [--dry-run]
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from multiprocessing import Pool
+from result_log import nest, flatten, atomic_write_json, decompress_raw
+from result_store import open_store
+from cell_stats import StatsTable, stats_path
+import run_experiment
+import run_ablation
+
+# 每个实验：运行器模块（make_entry / 存储配置）+ 统计的状态字段
+EXPERIMENTS = {
+    "main": (run_experiment, "audit_status"),
+    "ablation": (run_ablation, "parse_status"),
+}
+# 重新解析时保留原值的字段
+KEEP_FIELDS = ("iter", "timestamp")
+CHUNK_SIZE = 64
+
+
+def reparse(job):
+    """worker：解压原始回答并用当前解析器重建 entry（不含 KEEP_FIELDS）"""
+    experiment, i, blob = job
+    runner, _ = EXPERIMENTS[experiment]
+    entry = runner.make_entry(i, decompress_raw(blob))
+    return {k: v for k, v in entry.items() if k not in KEEP_FIELDS}
+
+
+def sample_key(record, key_fields):
+    return (*(record[k] for k in key_fields), record["iter"])
+
+
+def write_outputs(experiment, store, key_fields):
+    """存储 -> 结果 JSON（ablation 同时重算每个单元格的指标），返回嵌套数据"""
+    runner, _ = EXPERIMENTS[experiment]
+    nested = nest(store.records(), key_fields)
+    if experiment == "main":
+        atomic_write_json(nested, runner.OUTPUT_FILE)
+        return nested
+    results = {"metadata": {}, "raw": nested, "metrics": {}}
+    if os.path.exists(runner.OUTPUT_FILE):
+        with open(runner.OUTPUT_FILE, "r", encoding="utf-8") as f:
+            results["metadata"] = json.load(f).get("metadata", {})
+    for model, cases in nested.items():
+        for case_id, temps in cases.items():
+            if case_id not in runner.CASE_CONFIG:
+                continue
+            expected_R = runner.CASE_CONFIG[case_id]["expected_R"]
+            for temp, entries in temps.items():
+                results["metrics"].setdefault(model, {})[f"{case_id}_T{temp}"] = \
+                    runner.calculate_metrics(entries, expected_R)
+    atomic_write_json(results, runner.OUTPUT_FILE)
+    return nested
+
+
+def reaudit(experiment, workers=None, dry_run=False):
+    runner, status_field = EXPERIMENTS[experiment]
+    key_fields = runner.LOG_KEYS
+    store = open_store(runner.RESULT_BACKEND, runner.LOG_FILE, experiment)
+    try:
+        # 去重（同一样本以最后一条为准）并按 key + iter 排序
+        records = list(flatten(nest(store.records(), key_fields), key_fields))
+        index = {sample_key(r, key_fields): n for n, r in enumerate(records)}
+        raws = {}
+        for key, blob in store.raw_responses():
+            n = index.get(sample_key(key, key_fields))
+            if n is not None:
+                raws[n] = blob
+
+        print(f"[{experiment}] {len(records)} samples, {len(raws)} with raw responses "
+              f"({len(records) - len(raws)} skipped)")
+        if not raws:
+            return
+
+        start = time.perf_counter()
+        jobs = [(experiment, records[n]["iter"], blob) for n, blob in raws.items()]
+        changed = 0
+        transitions = Counter()
+        with Pool(workers) as pool:
+            for n, fields in zip(raws, pool.imap(reparse, jobs, chunksize=CHUNK_SIZE)):
+                old = records[n]
+                new = {**old, **fields}
+                if new != old:
+                    changed += 1
+                    transitions[(old.get(status_field), new.get(status_field))] += 1
+                records[n] = new
+        elapsed = time.perf_counter() - start
+
+        print(f"[{experiment}] Re-parsed {len(raws)} responses in {elapsed:.2f}s "
+              f"({len(raws) / elapsed:.0f}/s), {changed} changed")
+        for (before, after), count in transitions.most_common():
+            note = "" if before == after else "  <-- status changed"
+            print(f"    {status_field}: {before} -> {after}: {count}{note}")
+
+        if dry_run:
+            print(f"[{experiment}] Dry run: store and {runner.OUTPUT_FILE} left unchanged")
+            return
+        store.rewrite(records)
+        nested = write_outputs(experiment, store, key_fields)
+        # 状态 / 判决变了：按重写后的样本重建单元格统计（水位线取重写后的存储）
+        StatsTable.from_nested(nested, key_fields).save(stats_path(runner.LOG_FILE), store.watermark())
+        print(f"[OK] {experiment}: store, {runner.OUTPUT_FILE} and cell statistics updated")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse stored raw responses with the current parser")
+    parser.add_argument("experiment", nargs="?", default="all", choices=[*EXPERIMENTS, "all"])
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing")
+    args = parser.parse_args()
+
+    for name in (EXPERIMENTS if args.experiment == "all" else [args.experiment]):
+        reaudit(name, args.workers, args.dry_run)
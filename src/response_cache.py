@@ -0,0 +1,174 @@
+"""
+On-disk response cache
+
+Content-addressed cache in front of the shared Ollama clients: each
+response is stored under a SHA-256 of the API endpoint, model, rendered
+prompt / messages and decoding options (temperature, num_predict, num_ctx,
+seed, ...). Entries are kept zlib-compressed in one SQLite table and the
+table is bounded by total size with least-recently-used eviction.
+
+By default only reproducible requests are cached (an explicit `seed`, or
+temperature 0): repeated stochastic samples of one prompt must stay
+independent draws, not one cached answer.
+
+Configuration (environment variables):
+- OLLAMA_CACHE     auto (default) | on (also cache stochastic requests, for
+                   replays / CI checks) | off (bypass the cache entirely)
+- OLLAMA_CACHE_DB  cache database (default data/response_cache.db)
+- OLLAMA_CACHE_MB  size bound in MB (default 512)
+
+Usage:
+    python src/response_cache.py           # show cache statistics
+    python src/response_cache.py --clear   # drop all cached responses
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+CACHE_MODE = os.environ.get("OLLAMA_CACHE", "auto").lower()
+CACHE_DB = os.environ.get("OLLAMA_CACHE_DB", os.path.join(ROOT_DIR, "data", "response_cache.db"))
+CACHE_MAX_BYTES = int(float(os.environ.get("OLLAMA_CACHE_MB", "512")) * 1024 * 1024)
+COMPRESS_LEVEL = 6
+
+CACHE_MODES = ("auto", "on", "off")
+# 不影响输出内容的字段，不参与 key
+IGNORED_FIELDS = ("keep_alive",)
+IGNORED_OPTIONS = ("num_thread",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key       TEXT PRIMARY KEY,
+    data_z    BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses (last_used);
+"""
+
+
+def is_deterministic(payload):
+    """同一请求是否总是得到同一回答：显式 seed，或 temperature 为 0"""
+    options = payload.get("options") or {}
+    return "seed" in options or options.get("temperature") == 0
+
+
+def request_key(path, payload):
+    """请求 -> SHA-256 key（endpoint + 模型 + prompt / messages + options，规范化 JSON）"""
+    request = {k: v for k, v in payload.items() if k not in IGNORED_FIELDS}
+    if "options" in request:
+        request["options"] = {k: v for k, v in request["options"].items() if k not in IGNORED_OPTIONS}
+    canonical = json.dumps({"path": path, **request}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU response cache in SQLite; safe to share between threads"""
+
+    def __init__(self, db_path=CACHE_DB, max_bytes=CACHE_MAX_BYTES, mode=CACHE_MODE):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"OLLAMA_CACHE must be one of {CACHE_MODES}, got {mode!r}")
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def key(self, path, payload):
+        """可缓存的请求返回 key，否则 None（off 模式 / auto 模式下的随机采样）"""
+        if self.mode == "off" or (self.mode == "auto" and not is_deterministic(payload)):
+            return None
+        return request_key(path, payload)
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT data_z FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.conn:
+                self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, data):
+        blob = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"), COMPRESS_LEVEL)
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, data_z, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()))
+            self.total_bytes += len(blob) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """按 last_used 从旧到新删除，直到总大小回到上限以内（调用方持有锁和事务）"""
+        excess = self.total_bytes - self.max_bytes
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self.total_bytes = 0
+        self.conn.execute("VACUUM")
+
+    def close(self):
+        self.conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """进程内共享的缓存（首次调用时打开数据库）；OLLAMA_CACHE=off 时返回 None"""
+    global _cache
+    if CACHE_MODE == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or clear the on-disk Ollama response cache")
+    parser.add_argument("--clear", action="store_true", help="drop all cached responses")
+    args = parser.parse_args()
+
+    cache = ResponseCache(mode="on")
+    if args.clear:
+        cache.clear()
+        print(f"[OK] Cleared {cache.db_path}")
+    else:
+        print(f"Cache: {cache.db_path} (mode={CACHE_MODE})")
+        print(f"  {cache.count()} responses, {cache.total_bytes / 1024 / 1024:.1f} MB "
+              f"of {cache.max_bytes / 1024 / 1024:.0f} MB")
+    cache.close()
@@ -0,0 +1,262 @@
+"""
+Append-only JSONL result log
+
+Runners append one JSON line per sample instead of rewriting the whole
+result JSON after every iteration. Writes are flushed immediately and
+fsync'ed in batches; a torn last line left by a crash is dropped on the
+next open. `compact()` rebuilds the nested JSON layout that
+analyze_results.py / visualize_results.py read.
+
+Raw model responses can be kept next to the log (`*.raw.jsonl`, one
+zlib-compressed response per sample) so `reaudit.py` can re-parse them
+offline after a parser fix.
+
+Usage (manual compaction):
+    python src/result_log.py data/experiment_data.jsonl data/experiment_data.json model case
+"""
+import base64
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+FSYNC_EVERY = 16        # 每 N 条记录 fsync 一次
+FSYNC_INTERVAL = 2.0    # 或距上次 fsync 超过 N 秒
+RAW_COMPRESS_LEVEL = 6  # 原始回答的 zlib 压缩级别
+
+# 原始回答记录里用来定位样本的字段（各实验 key 字段 + iter）
+RAW_KEY_FIELDS = ("part", "model", "case", "temp", "iter")
+
+
+def raw_log_path(log_path):
+    """data/x.jsonl -> data/x.raw.jsonl"""
+    base, _ = os.path.splitext(log_path)
+    return f"{base}.raw.jsonl"
+
+
+def compress_raw(text):
+    return zlib.compress(text.encode("utf-8"), RAW_COMPRESS_LEVEL)
+
+
+def decompress_raw(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def raw_key(record):
+    return {k: record[k] for k in RAW_KEY_FIELDS if k in record}
+
+
+class ResultLog:
+    """
+    Thread-safe append-only JSONL writer with batched fsync. If raw_path is
+    given, raw responses passed to append() go to that sibling log.
+    """
+
+    def __init__(self, path, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL, raw_path=None):
+        self.path = path
+        self.raw_path = raw_path
+        self._raw_log = None
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _drop_torn_tail(path)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def append(self, record, raw=None):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+            if raw is not None and self.raw_path and self._raw_log is None:
+                self._raw_log = ResultLog(self.raw_path, self.fsync_every, self.fsync_interval)
+        if raw is not None and self._raw_log is not None:
+            blob = base64.b64encode(compress_raw(raw)).decode("ascii")
+            self._raw_log.append({**raw_key(record), "raw_z": blob})
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def records(self):
+        return iter_records(self.path)
+
+    def done_iters(self, key_fields):
+        """断点续传：单元格（key_fields 元组）-> 已完成的 iter 集合（JSONL 没有索引，需扫描一遍日志）"""
+        done = {}
+        for record in self.records():
+            done.setdefault(tuple(record[k] for k in key_fields), set()).add(record.get("iter"))
+        return done
+
+    def raw_responses(self):
+        if self.raw_path:
+            yield from iter_raw(self.raw_path)
+
+    def rewrite(self, records):
+        """整体替换日志内容（reaudit 写回重新解析的记录）：写临时文件再 os.replace"""
+        with self._lock:
+            self._sync_locked()
+            self._f.close()
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._f = open(self.path, "a", encoding="utf-8")
+
+    def watermark(self):
+        """日志当前的 [字节数, mtime_ns]：cell_stats 据此判断保存的统计表是否过期"""
+        st = os.stat(self.path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed:
+                self._sync_locked()
+                self._f.close()
+        if self._raw_log is not None:
+            self._raw_log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _drop_torn_tail(path):
+    """崩溃时最后一行可能只写了一半：截断到最后一个换行符"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # 向前找最后一个换行符
+        pos = size
+        chunk = 4096
+        while pos > 0:
+            start = max(0, pos - chunk)
+            f.seek(start)
+            buf = f.read(pos - start)
+            idx = buf.rfind(b"\n")
+            if idx != -1:
+                f.truncate(start + idx + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+
+def iter_records(path):
+    """流式读取日志；损坏的行（例如被截断的最后一行）跳过"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_raw(raw_path):
+    """原始回答日志 -> (样本 key, zlib 压缩的原始回答)；同一样本多次出现时以最后一条为准"""
+    for record in iter_records(raw_path):
+        blob = base64.b64decode(record.pop("raw_z"))
+        yield record, blob
+
+
+def nest(records, key_fields, sort_key="iter"):
+    """
+    把扁平记录还原成嵌套布局，例如 key_fields=("model", "case") ->
+    {model: {case: [entry, ...]}}；entry 去掉 key 字段，按 sort_key 排序。
+    同一 (key..., sort_key) 出现多次时保留最后一条。
+    """
+    nested = {}
+    for record in records:
+        node = nested
+        for field in key_fields[:-1]:
+            node = node.setdefault(record[field], {})
+        entry = {k: v for k, v in record.items() if k not in key_fields}
+        node.setdefault(record[key_fields[-1]], []).append(entry)
+
+    if sort_key is not None:
+        def finalize(node, depth):
+            for key, child in node.items():
+                if depth == len(key_fields) - 1:
+                    latest = {}
+                    for entry in child:
+                        latest[entry.get(sort_key)] = entry
+                    node[key] = sorted(latest.values(), key=lambda e: e.get(sort_key, 0))
+                else:
+                    finalize(child, depth + 1)
+        finalize(nested, 0)
+    return nested
+
+
+def flatten(nested, key_fields):
+    """nest 的逆操作：嵌套布局 -> 扁平记录（用于从旧 JSON 迁移）"""
+    def walk(node, depth, prefix):
+        for key, child in node.items():
+            keys = {**prefix, key_fields[depth]: key}
+            if depth == len(key_fields) - 1:
+                for entry in child:
+                    yield {**keys, **entry}
+            else:
+                yield from walk(child, depth + 1, keys)
+    yield from walk(nested, 0, {})
+
+
+def atomic_write_json(obj, path):
+    """写临时文件再 os.replace，崩溃时不会留下半截 JSON"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def compact(log_path, output_file, key_fields, sort_key="iter"):
+    """日志 -> 嵌套 JSON（analyze/visualize 读取的原有格式），返回嵌套数据"""
+    nested = nest(iter_records(log_path), key_fields, sort_key=sort_key)
+    atomic_write_json(nested, output_file)
+    return nested
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit(1)
+    log_path, output_file, *fields = sys.argv[1:]
+    data = compact(log_path, output_file, tuple(fields))
+    print(f"[OK] Compacted {log_path} -> {output_file} ({len(data)} top-level keys)")
@@ -0,0 +1,286 @@
+"""
+SQLite result store
+
+Alternative to the JSONL log (`result_log.py`): every sample becomes a row
+in one `samples` table with the parsed fields as columns, indexed on
+(model, case_id, temperature). Runners write rows transactionally; the
+resume check is one query on the sample-key index that never reads `cot`,
+and the analysis / visualization scripts read the main experiment from
+here when the database exists. Raw responses, when kept, are stored zlib-compressed
+in the `raw_z` column.
+
+Usage (import existing logs / JSON into the database):
+    python src/result_store.py
+"""
+import json
+import os
+import sqlite3
+import threading
+from result_log import iter_records, iter_raw, flatten, compress_raw, raw_log_path
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+DB_FILE = os.path.join(ROOT_DIR, "data", "results.db")
+
+# 主实验固定温度（run_experiment.py 中的 temperature）
+MAIN_TEMPERATURE = 0.6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id             INTEGER PRIMARY KEY,
+    experiment     TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    case_id        TEXT NOT NULL,
+    temperature    REAL NOT NULL,
+    iter           INTEGER NOT NULL,
+    I              REAL,
+    H              REAL,
+    R              REAL,
+    E_reported     REAL,
+    verdict        TEXT,
+    audit_status   TEXT,
+    parse_status   TEXT,
+    r_hallucinated INTEGER,
+    cot            TEXT,
+    timestamp      REAL,
+    extra          TEXT,
+    raw_z          BLOB
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_samples_key
+    ON samples (experiment, model, case_id, temperature, iter);
+CREATE INDEX IF NOT EXISTS idx_samples_cell
+    ON samples (model, case_id, temperature);
+"""
+
+# 解析字段列（顺序即还原 entry 时的键顺序）
+FIELD_COLUMNS = ["iter", "I", "H", "R", "E_reported", "verdict", "audit_status",
+                 "parse_status", "r_hallucinated", "cot", "timestamp"]
+
+# 各实验的记录键（与 result_log 的 LOG_KEYS 一致）
+EXPERIMENTS = {
+    "main": ("model", "case"),
+    "ablation": ("model", "case", "temp"),
+    "comparison": ("part", "model", "case"),
+}
+
+
+class ResultStore:
+    """
+    SQLite sample store for one experiment. Exposes the same
+    append / extend / records / close interface as result_log.ResultLog,
+    so runners can use either backend.
+    """
+
+    def __init__(self, db_path=DB_FILE, experiment="main"):
+        self.db_path = db_path
+        self.experiment = experiment
+        self.key_fields = EXPERIMENTS[experiment]
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(samples)")}
+        if "raw_z" not in columns:  # 旧数据库：补上原始回答列
+            self.conn.execute("ALTER TABLE samples ADD COLUMN raw_z BLOB")
+
+    # ---------- 写入 ----------
+    def _row(self, record):
+        """记录 -> 行：key 字段映射到 model/case_id/temperature，未建列的字段放进 extra"""
+        if self.experiment == "comparison":
+            # ETHICS / Entropy 两部分共用一张表，part 作为 experiment 后缀
+            experiment = f"comparison:{record['part']}"
+        else:
+            experiment = self.experiment
+        temperature = float(record.get("temp", MAIN_TEMPERATURE))
+        fields = {k: v for k, v in record.items() if k not in self.key_fields}
+        extra = {k: v for k, v in fields.items() if k not in FIELD_COLUMNS}
+        values = [fields.get(col) for col in FIELD_COLUMNS]
+        if values[FIELD_COLUMNS.index("r_hallucinated")] is not None:
+            values[FIELD_COLUMNS.index("r_hallucinated")] = int(fields["r_hallucinated"])
+        return [experiment, record["model"], record["case"], temperature, *values,
+                json.dumps(extra, ensure_ascii=False) if extra else None]
+
+    def _next_iter(self, row):
+        """没有 iter 的记录（comparison）按单元格内顺序编号"""
+        cur = self.conn.execute(
+            "SELECT COALESCE(MAX(iter) + 1, 0) FROM samples "
+            "WHERE experiment = ? AND model = ? AND case_id = ? AND temperature = ?", row[:4])
+        return cur.fetchone()[0]
+
+    def append(self, record, raw=None):
+        self._write([(record, raw)])
+
+    def extend(self, records):
+        self._write((record, None) for record in records)
+
+    def rewrite(self, records):
+        """用重新解析的记录覆盖解析列（raw_z 保留）"""
+        self.extend(records)
+
+    def _write(self, items):
+        """
+        一个事务内写入一批 (记录, 原始回答)；同一 (experiment, model, case, temperature, iter)
+        覆盖旧行的解析列，没有新的原始回答时保留已存的 raw_z
+        """
+        columns = ["experiment", "model", "case_id", "temperature", *FIELD_COLUMNS, "extra", "raw_z"]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in [*FIELD_COLUMNS, "extra"])
+        sql = (f"INSERT INTO samples ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT (experiment, model, case_id, temperature, iter) DO UPDATE SET "
+               f"{updates}, raw_z = COALESCE(excluded.raw_z, samples.raw_z)")
+        with self._lock, self.conn:
+            for record, raw in items:
+                row = self._row(record)
+                if row[4] is None:
+                    row[4] = self._next_iter(row)
+                self.conn.execute(sql, [*row, compress_raw(raw) if raw is not None else None])
+
+    def import_raw(self, raw_records):
+        """导入 JSONL 原始回答日志（result_log.iter_raw() 的输出）"""
+        with self._lock, self.conn:
+            for key, blob in raw_records:
+                row = self._row(key)
+                self.conn.execute(
+                    "UPDATE samples SET raw_z = ? WHERE experiment = ? AND model = ? "
+                    "AND case_id = ? AND temperature = ? AND iter = ?",
+                    [blob, *row[:4], key["iter"]])
+
+    # ---------- 读取 ----------
+    def records(self):
+        """按插入顺序还原为与 JSONL 日志相同形状的记录"""
+        if self.experiment == "comparison":
+            where, params = "experiment LIKE ?", ["comparison:%"]
+        else:
+            where, params = "experiment = ?", [self.experiment]
+        cur = self.conn.execute(
+            f"SELECT experiment, model, case_id, temperature, {', '.join(FIELD_COLUMNS)}, extra "
+            f"FROM samples WHERE {where} ORDER BY id", params)
+        for experiment, model, case_id, temperature, *values, extra in cur:
+            record = {}
+            if self.experiment == "comparison":
+                record["part"] = experiment.split(":", 1)[1]
+            record["model"] = model
+            record["case"] = case_id
+            if "temp" in self.key_fields:
+                record["temp"] = str(temperature)
+            for col, value in zip(FIELD_COLUMNS, values):
+                if value is None or (col == "iter" and self.experiment == "comparison"):
+                    continue
+                record[col] = bool(value) if col == "r_hallucinated" else value
+            if extra:
+                record.update(json.loads(extra))
+            yield record
+
+    def raw_responses(self):
+        """(样本 key, zlib 压缩的原始回答)，key 与 records() 的 key 字段 + iter 一致"""
+        cur = self.conn.execute(
+            "SELECT model, case_id, temperature, iter, raw_z FROM samples "
+            "WHERE experiment = ? AND raw_z IS NOT NULL ORDER BY id", (self.experiment,))
+        for model, case_id, temperature, i, blob in cur:
+            key = {"model": model, "case": case_id}
+            if "temp" in self.key_fields:
+                key["temp"] = str(temperature)
+            key["iter"] = i
+            yield key, blob
+
+    def count(self):
+        if self.experiment == "comparison":
+            cur = self.conn.execute("SELECT COUNT(*) FROM samples WHERE experiment LIKE 'comparison:%'")
+        else:
+            cur = self.conn.execute("SELECT COUNT(*) FROM samples WHERE experiment = ?", (self.experiment,))
+        return cur.fetchone()[0]
+
+    def watermark(self):
+        """该实验的 [样本数, 最大行 id]：cell_stats 据此判断保存的统计表是否过期"""
+        if self.experiment == "comparison":
+            where, params = "experiment LIKE ?", ["comparison:%"]
+        else:
+            where, params = "experiment = ?", [self.experiment]
+        cur = self.conn.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM samples WHERE {where}", params)
+        return list(cur.fetchone())
+
+    def done_iters(self, key_fields):
+        """断点续传：单元格（key_fields 元组）-> 已完成的 iter 集合（只走 idx_samples_key 覆盖索引，不读 cot）"""
+        if self.experiment == "comparison":
+            where, params = "experiment LIKE ?", ["comparison:%"]
+        else:
+            where, params = "experiment = ?", [self.experiment]
+        cur = self.conn.execute(
+            f"SELECT experiment, model, case_id, temperature, iter FROM samples WHERE {where}", params)
+        done = {}
+        for experiment, model, case_id, temperature, i in cur:
+            key = {"part": experiment.split(":", 1)[-1], "model": model, "case": case_id, "temp": str(temperature)}
+            done.setdefault(tuple(key[k] for k in key_fields), set()).add(i)
+        return done
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(backend, log_path, experiment, db_path=None):
+    """
+    按 backend ("jsonl" | "sqlite") 打开样本存储（db_path 缺省为调用时的 DB_FILE）。
+    首次使用 SQLite 时，如果同名 JSONL 日志已存在，先把日志（及原始回答日志）导入数据库。
+    """
+    if backend == "sqlite":
+        store = ResultStore(db_path or DB_FILE, experiment)
+        if store.count() == 0 and os.path.exists(log_path):
+            store.extend(iter_records(log_path))
+            store.import_raw(iter_raw(raw_log_path(log_path)))
+        return store
+    if backend != "jsonl":
+        raise ValueError(f"Unknown result backend: {backend!r} (expected 'jsonl' or 'sqlite')")
+    from result_log import ResultLog
+    return ResultLog(log_path, raw_path=raw_log_path(log_path))
+
+
+def has_experiment(db_path=DB_FILE, experiment="main"):
+    """数据库存在且包含该实验的样本"""
+    if not os.path.exists(db_path):
+        return False
+    with ResultStore(db_path, experiment) as store:
+        return store.count() > 0
+
+
+def import_json(store, json_path):
+    """把旧的嵌套结果 JSON 导入数据库"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if store.experiment == "ablation":
+        data = data.get("raw", {})
+    elif store.experiment == "comparison":
+        data = {part: data[part] for part in ("ethics", "entropy") if part in data}
+    store.extend(flatten(data, store.key_fields))
+
+
+if __name__ == "__main__":
+    sources = {
+        "main": "experiment_data",
+        "ablation": "ablation_temperature",
+        "comparison": "illustrative_comparison",
+    }
+    for experiment, name in sources.items():
+        log_path = os.path.join(ROOT_DIR, "data", f"{name}.jsonl")
+        json_path = os.path.join(ROOT_DIR, "data", f"{name}.json")
+        with ResultStore(DB_FILE, experiment) as store:
+            if store.count():
+                print(f"[SKIP] {experiment}: already has {store.count()} samples")
+                continue
+            if os.path.exists(log_path):
+                store.extend(iter_records(log_path))
+                store.import_raw(iter_raw(raw_log_path(log_path)))
+            elif os.path.exists(json_path):
+                import_json(store, json_path)
+            print(f"[OK] {experiment}: {store.count()} samples -> {DB_FILE}")
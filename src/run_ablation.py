@@ -12,13 +12,21 @@ This is NOT a simple "output diversity" test. We measure:
 NOTE: This ablation studies end-to-end decision instability including 
 reasoning stochasticity, not pure decoding noise.
 """
+import asyncio
 import json
 import time
-import requests
-import re
 import os
-import numpy as np
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ollama_client import get_client, GENERATE_PATH, CHAT_PATH, response_stats, early_stop_summary
+from async_client import AsyncOllamaClient, run_bounded
+from result_log import nest, flatten, atomic_write_json
+from result_store import open_store
+from response_parser import strip_markup, extract_values, extract_verdict, extract_think, VerdictWatcher
+from timing_report import timing_report
+from live_metrics import METRICS, track
+from adaptive_sampling import cell_half_width, allocate
+from cell_stats import CellStats, track_store, stats_path
 
 # ==========================================
 # ⚙️ 配置
@@ -31,11 +39,28 @@ ABLATION_MODELS = ["deepseek-r1:8b", "qwen3:8b", "gemma3:4b", "llama3:8b", "mist
 ABLATION_CASES = ["Bank_Hacker", "Ancient_Tree"]   # 低边界压力 + 高边界压力
 TEMPERATURES = [0.3, 0.6, 0.9]                     # 3 个温度梯度
 ITERATIONS = 10                                    # 每组 10 轮
+ASYNC_IN_FLIGHT = 0                                # >0 启用 asyncio 后端（需要 aiohttp）
+COOLDOWN = 0.5                                     # 每次请求后的散热间隔（秒）
 
 OUTPUT_FILE = os.path.join(ROOT_DIR, "data", "ablation_temperature.json")
-API_URL = "http://localhost:11434/api/generate"
+LOG_FILE = os.path.join(ROOT_DIR, "data", "ablation_temperature.jsonl")  # 追加式样本日志
+LOG_KEYS = ("model", "case", "temp")
+RESULT_BACKEND = "jsonl"  # "jsonl" | "sqlite"（data/results.db）
+SAVE_RAW = True  # 同时保存压缩的原始回答（*.raw.jsonl / raw_z 列），供 reaudit.py 离线重新解析
+SEED = None  # 整数时第 i 轮使用 seed=SEED+i：可按固定 seed 重放，且回答会进入 response_cache 缓存
+STREAM_EARLY_STOP = False  # 流式生成：答案里出现完整的 MATH 行和 VERDICT 后立即断开，记录 eval_tokens / early_stop
 OLLAMA_THREADS = 8
 
+# 自适应采样：单元格的 Guilty 比例与 margin>0 比例的 Wilson 半宽都不超过 ADAPTIVE_HALF_WIDTH 即停止，
+# 省下的预算分给边界不稳定的单元格（adaptive_sampling.py）；False = 固定每组 ITERATIONS 轮
+ADAPTIVE = False
+ADAPTIVE_MIN = 5              # 每个单元格至少采样数
+ADAPTIVE_MAX = 30             # 每个单元格最多采样数
+ADAPTIVE_STEP = 2             # 每轮给每个未达标单元格追加的样本数
+ADAPTIVE_HALF_WIDTH = 0.15
+ADAPTIVE_CONFIDENCE = 0.90
+ADAPTIVE_BUDGET = None        # 总样本上限；None = 单元格数 × ITERATIONS（与固定设计相同）
+
 # 案例文本及预期值（用于计算 Normative Drift）
 CASE_CONFIG = {
     "Bank_Hacker": {
@@ -85,25 +110,13 @@ def robust_parse(text):
     if not text or "ERROR" in text:
         return {"I": -1, "H": -1, "R": -1, "verdict": "ERROR", "parse_status": "error"}
     
-    cot_match = re.search(r'<think>[\s\n]*(.*?)[\s\n]*</think>', text, re.DOTALL | re.IGNORECASE)
-    cot = cot_match.group(1).strip() if cot_match else text[:300]
-    
-    clean = text.replace("*", "").replace("`", "").replace("[", "").replace("]", "")
-    
-    def extract_val(key_regex):
-        matches = re.findall(key_regex + r"[\s:=\(is]*(\d+\.?\d*)", clean, re.IGNORECASE)
-        if matches: return float(matches[-1])
-        return -1.0
+    cot = extract_think(text)
     
-    r_val = extract_val(r"(?:R|Irreversibility)")
-    i_val = extract_val(r"(?:I|Intent)")
-    h_val = extract_val(r"(?:H|Base\s*Harm)")
+    clean = strip_markup(text)
+    values = extract_values(clean)
+    r_val, i_val, h_val = values["R"], values["I"], values["H"]
     
-    verdict = "UNKNOWN"
-    clean_upper = clean.upper()
-    verdict_section = clean_upper.split("VERDICT")[-1] if "VERDICT" in clean_upper else clean_upper
-    if "NOT GUILTY" in verdict_section: verdict = "NOT_GUILTY"
-    elif "GUILTY" in verdict_section: verdict = "GUILTY"
+    verdict = extract_verdict(clean)
     
     # 判断解析状态（区分不同失败模式）
     has_params = (i_val != -1 and h_val != -1 and r_val != -1)
@@ -124,43 +137,244 @@ def robust_parse(text):
         "parse_status": parse_status
     }
 
-def query_model(model, prompt, temperature):
-    """查询模型"""
+def build_request(model, prompt, temperature, seed=None):
+    """根据模型类型选择 API 端点，返回 (path, payload, supports_thinking)"""
     supports_thinking = any(tm in model.lower() for tm in THINKING_MODELS)
+    options = {"temperature": temperature, "num_predict": 2048, "num_thread": OLLAMA_THREADS}
+    if seed is not None:
+        options["seed"] = seed
     
     if supports_thinking:
-        url = API_URL.replace("/api/generate", "/api/chat")
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "stream": False,
             "think": True,
-            "options": {"temperature": temperature, "num_predict": 2048, "num_thread": OLLAMA_THREADS}
-        }
-    else:
-        url = API_URL
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": temperature, "num_predict": 2048, "num_thread": OLLAMA_THREADS}
+            "options": options
         }
+        return CHAT_PATH, payload, True
     
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "options": options
+    }
+    return GENERATE_PATH, payload, False
+
+def extract_response(data, supports_thinking):
+    """从 Ollama 响应 JSON 中取出待解析文本"""
+    if supports_thinking:
+        msg = data.get('message', {})
+        thinking = msg.get('thinking', '')
+        content = msg.get('content', '')
+        if thinking:
+            return f"<think>\n{thinking}\n</think>\n{content if content else thinking}"
+        return content
+    return data.get('response', '')
+
+def query_model(model, prompt, temperature, seed=None):
+    """查询模型（共享连接池），返回 (文本, 请求统计：Ollama 计时字段 + 流式生成统计)"""
+    path, payload, supports_thinking = build_request(model, prompt, temperature, seed)
     try:
-        res = requests.post(url, json=payload, timeout=300)
-        data = res.json()
-        
-        if supports_thinking:
-            msg = data.get('message', {})
-            thinking = msg.get('thinking', '')
-            content = msg.get('content', '')
-            if thinking:
-                return f"<think>\n{thinking}\n</think>\n{content if content else thinking}"
-            return content
-        else:
-            return data.get('response', '')
+        with METRICS.request(model) as request:
+            if STREAM_EARLY_STOP:
+                data = get_client().post_stream(path, payload, stop=VerdictWatcher().feed, timeout=300)
+            else:
+                data = get_client().post(path, payload, timeout=300)
+            request.cached = data.get("cached", False)
+        return extract_response(data, supports_thinking), response_stats(data, payload)
+    except Exception as e:
+        return f"ERROR: {e}", {}
+
+
+async def query_model_async(client, model, prompt, temperature, seed=None):
+    """query_model 的 asyncio 版本（AsyncOllamaClient）"""
+    path, payload, supports_thinking = build_request(model, prompt, temperature, seed)
+    try:
+        with METRICS.request(model) as request:
+            if STREAM_EARLY_STOP:
+                data = await client.post_stream(path, payload, stop=VerdictWatcher().feed, timeout=300)
+            else:
+                data = await client.post(path, payload, timeout=300)
+            request.cached = data.get("cached", False)
+        return extract_response(data, supports_thinking), response_stats(data, payload)
     except Exception as e:
-        return f"ERROR: {e}"
+        return f"ERROR: {e!r}", {}
+
+def iter_seed(i):
+    """第 i 轮的采样 seed（SEED 为 None 时不固定）"""
+    return None if SEED is None else SEED + i
+
+def make_entry(i, raw):
+    """解析原始输出，构造待保存的样本记录"""
+    parsed = robust_parse(raw)
+    return {
+        "iter": i,
+        "I": parsed["I"],
+        "H": parsed["H"],
+        "R": parsed["R"],
+        "verdict": parsed["verdict"],
+        "parse_status": parsed.get("parse_status", "error")
+    }
+
+def record_entry(results, log, model, case_id, temp, entry, raw=None):
+    """记下已完成的 iter，并把样本追加到样本存储（SAVE_RAW 时连同压缩的原始输出）"""
+    results["done"][model][case_id][str(temp)].add(entry["iter"])
+    log.append({"model": model, "case": case_id, "temp": str(temp), **entry}, raw if SAVE_RAW else None)
+    METRICS.sample_done("ablation", model, f"{case_id}_T{temp}", entry["parse_status"])
+
+def status_symbol(entry):
+    status = entry["parse_status"]
+    return "." if status == "full" else ("v" if status == "verdict_only" else "x")
+
+def run_iteration(model, case_id, temp, i):
+    """跑单个 (model, case, temperature, iter) 样本，返回 (entry, 原始输出)"""
+    prompt = PROMPT_TEMPLATE.format(scenario=CASE_CONFIG[case_id]["text"])
+    raw, stats = query_model(model, prompt, temp, seed=iter_seed(i))
+    entry = {**make_entry(i, raw), **stats}
+    time.sleep(COOLDOWN)  # 散热
+    return entry, raw
+
+def load_results():
+    """
+    断点续传：优先读取样本存储；为空时迁移旧 OUTPUT_FILE 的 raw。
+    返回 (results, store)，results["done"] 为 model -> case -> temp -> 已完成的 iter 集合
+    （SQLite 只查索引，不读样本内容；样本在运行结束时才整体读出写进 OUTPUT_FILE）；
+    store.stats 为每个 (model, case, temp) 的增量统计，随 append 更新
+    """
+    log = open_store(RESULT_BACKEND, LOG_FILE, "ablation")
+    done = log.done_iters(LOG_KEYS)
+    log = track_store(log, LOG_KEYS, stats_path(LOG_FILE))
+    if done:
+        print(f"[INFO] Resuming from {RESULT_BACKEND} store")
+    elif os.path.exists(OUTPUT_FILE):
+        try:
+            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+                log.extend(flatten(json.load(f).get("raw", {}), LOG_KEYS))
+            done = log.done_iters(LOG_KEYS)
+            print(f"[INFO] Loaded existing data from {OUTPUT_FILE}")
+        except:
+            print("[WARN] Could not load existing data, starting fresh")
+    
+    results = {
+        "metadata": {
+            "experiment": "T-ANBS",
+            "description": "Temperature Ablation for Normative Boundary Stability",
+            "note": "Studies end-to-end decision instability including reasoning stochasticity"
+        },
+        "done": defaultdict(lambda: defaultdict(lambda: defaultdict(set))),
+        "metrics": defaultdict(lambda: defaultdict(dict))
+    }
+    
+    # 恢复已完成的 iter
+    for (model, case_id, temp), iters in done.items():
+        results["done"][model][case_id][temp] = iters
+    return results, log
+
+# 跨实验调度接口（scheduler.py）：作业 = (model, case_id, temperature, iter)，第一个元素是模型
+def pending_jobs(results):
+    """所有 (model, case, temperature) 的缺失样本（自适应模式下只补到 ADAPTIVE_MIN，其余由 sample_adaptive 决定）"""
+    target = ADAPTIVE_MIN if ADAPTIVE else ITERATIONS
+    jobs = []
+    for model in ABLATION_MODELS:
+        for case_id in ABLATION_CASES:
+            for temp in TEMPERATURES:
+                done = results["done"][model][case_id][str(temp)]
+                jobs += [(model, case_id, temp, i) for i in range(target) if i not in done]
+    return jobs
+
+def next_iter(results, model, case_id, temp):
+    """单元格下一个未用过的 iter 编号（自适应追加样本时使用）"""
+    return max(results["done"][model][case_id][str(temp)], default=-1) + 1
+
+def run_job(job):
+    return run_iteration(*job)
+
+def record_job(results, log, job, entry, raw=None):
+    model, case_id, temp, _ = job
+    record_entry(results, log, model, case_id, temp, entry, raw)
+
+def job_cell(job):
+    """作业所属的 (model, case@温度)，live_metrics 的标签"""
+    model, case_id, temp, _ = job
+    return model, f"{case_id}_T{temp}"
+
+def prefill_async(results, log):
+    """
+    asyncio 后端：把所有 (model, case, temperature) 的缺失样本一次性排队，
+    整个进程保持 ASYNC_IN_FLIGHT 个在途请求，写入样本存储。
+    """
+    jobs = pending_jobs(results)
+    print(f"\n[ASYNC] {len(jobs)} pending samples, {ASYNC_IN_FLIGHT} in flight")
+    if not jobs:
+        return
+    
+    async def sample(client, job):
+        model, case_id, temp, i = job
+        prompt = PROMPT_TEMPLATE.format(scenario=CASE_CONFIG[case_id]["text"])
+        raw, stats = await query_model_async(client, model, prompt, temp, seed=iter_seed(i))
+        return job, {**make_entry(i, raw), **stats}, raw
+    
+    async def main():
+        async with AsyncOllamaClient(max_connections=ASYNC_IN_FLIGHT) as client:
+            async for (model, case_id, temp, i), entry, raw in run_bounded(
+                    jobs, lambda job: sample(client, job), ASYNC_IN_FLIGHT):
+                record_entry(results, log, model, case_id, temp, entry, raw)
+                print(status_symbol(entry), end="", flush=True)
+    
+    print("[", end="", flush=True)
+    asyncio.run(main())
+    print("]")
+
+
+def sample_adaptive(results, log):
+    """
+    自适应采样：按轮补采，每轮由 allocate() 决定各单元格追加的样本数，
+    直到所有单元格达到精度、触到 ADAPTIVE_MAX 或用完预算。同一轮内按模型分组采样
+    """
+    cells = [(model, case_id, temp) for model in ABLATION_MODELS
+             for case_id in ABLATION_CASES for temp in TEMPERATURES]
+    budget = ADAPTIVE_BUDGET or len(cells) * ITERATIONS
+    print(f"[ADAPTIVE] target half-width {ADAPTIVE_HALF_WIDTH} @ {ADAPTIVE_CONFIDENCE:.0%}, "
+          f"{ADAPTIVE_MIN}-{ADAPTIVE_MAX} samples/cell, budget {budget}")
+    
+    rounds = 0
+    while True:
+        counts = {cell: len(results["done"][cell[0]][cell[1]][str(cell[2])]) for cell in cells}
+        widths = {cell: cell_half_width(log.stats.get(cell), ADAPTIVE_CONFIDENCE) for cell in cells}
+        plan = allocate(counts, widths, budget, ADAPTIVE_MIN, ADAPTIVE_MAX, ADAPTIVE_STEP, ADAPTIVE_HALF_WIDTH)
+        if not plan:
+            break
+        rounds += 1
+        jobs = [(*cell, next_iter(results, *cell) + i) for cell, k in plan.items() for i in range(k)]
+        track("ablation", map(job_cell, jobs))
+        print(f"  round {rounds}: {len(jobs)} samples over {len(plan)} cells [", end="", flush=True)
+        for model in ABLATION_MODELS:
+            model_jobs = [job for job in jobs if job[0] == model]
+            if not model_jobs:
+                continue
+            with ThreadPoolExecutor(max_workers=max(1, get_client().capacity(model))) as pool:
+                futures = {pool.submit(run_job, job): job for job in model_jobs}
+                for future in as_completed(futures):
+                    entry, raw = future.result()
+                    record_job(results, log, futures[future], entry, raw)
+                    print(status_symbol(entry), end="", flush=True)
+        print("]")
+    
+    settled = sum(1 for cell in cells if widths[cell] <= ADAPTIVE_HALF_WIDTH)
+    used = sum(counts.values())
+    print(f"[ADAPTIVE] {settled}/{len(cells)} cells within ±{ADAPTIVE_HALF_WIDTH}, "
+          f"{used} samples (fixed design: {len(cells) * ITERATIONS})")
+    results["metadata"]["adaptive"] = {
+        "half_width": ADAPTIVE_HALF_WIDTH,
+        "confidence": ADAPTIVE_CONFIDENCE,
+        "min": ADAPTIVE_MIN,
+        "max": ADAPTIVE_MAX,
+        "budget": budget,
+        "samples": used,
+        "settled_cells": settled,
+    }
 
 
 def calculate_metrics(entries, expected_R):
@@ -170,83 +384,9 @@ def calculate_metrics(entries, expected_R):
     2. Normative Drift (ND) - 规范参数漂移
     3. Boundary Margin Stability (BMS) - 边界裕度稳定性
     + Collapsed Reasoning Rate (CRR) - 推理崩塌率
+    运行中的单元格直接读取样本存储上的增量统计（cell_stats.py）；这里从 entries 重建，供 reaudit 等离线使用
     """
-    # 统计解析状态
-    status_counts = {"full": 0, "verdict_only": 0, "params_only": 0, "collapsed": 0, "error": 0}
-    for e in entries:
-        status = e.get("parse_status", "error")
-        status_counts[status] = status_counts.get(status, 0) + 1
-    
-    total = len(entries)
-    collapsed_rate = (status_counts["collapsed"] + status_counts["error"]) / total if total > 0 else 0
-    verdict_only_rate = status_counts["verdict_only"] / total if total > 0 else 0
-    full_parse_rate = status_counts["full"] / total if total > 0 else 0
-    
-    # 过滤有效数据（只用完整解析的）
-    valid_entries = [e for e in entries if e.get("parse_status") == "full"]
-    
-    if len(valid_entries) < 2:
-        return {
-            "vfr": None, "nd_i": None, "nd_h": None, "nd_r": None,
-            "bms_mean": None, "bms_std": None, "bms_crossing": None,
-            "collapsed_rate": collapsed_rate,
-            "verdict_only_rate": verdict_only_rate,
-            "full_parse_rate": full_parse_rate,
-            "valid_samples": len(valid_entries)
-        }
-    
-    # 1. Verdict Flip Rate (VFR)
-    verdicts = [e["verdict"] for e in valid_entries]
-    unique_verdicts = set(verdicts)
-    # 如果只有一种判决，VFR=0；如果有两种，计算少数派比例
-    if len(unique_verdicts) == 1:
-        vfr = 0.0
-    else:
-        guilty_count = sum(1 for v in verdicts if v == "GUILTY")
-        vfr = min(guilty_count, len(verdicts) - guilty_count) / len(verdicts)
-    
-    # 2. Normative Drift (ND) - 参数方差
-    i_vals = [e["I"] for e in valid_entries if e["I"] != -1]
-    h_vals = [e["H"] for e in valid_entries if e["H"] != -1]
-    r_vals = [e["R"] for e in valid_entries if e["R"] != -1]
-    
-    nd_i = np.std(i_vals) if len(i_vals) > 1 else 0
-    nd_h = np.std(h_vals) if len(h_vals) > 1 else 0
-    nd_r = sum(1 for r in r_vals if r != expected_R) / len(r_vals) if r_vals else 0  # R 偏离预期的比例
-    
-    # 3. Boundary Margin Stability (BMS)
-    # Margin = I - E = I - H*R
-    margins = []
-    for e in valid_entries:
-        if e["I"] != -1 and e["H"] != -1 and e["R"] != -1:
-            E = e["H"] * e["R"]
-            margin = e["I"] - E
-            margins.append(margin)
-    
-    if len(margins) > 1:
-        bms_mean = np.mean(margins)
-        bms_std = np.std(margins)
-        # Boundary Crossing Probability (BCP): P(margin>0) * P(margin<0)
-        # 表示边界两侧同时存在样本的概率质量，不依赖采样顺序
-        p_positive = sum(1 for m in margins if m > 0) / len(margins)
-        p_negative = sum(1 for m in margins if m < 0) / len(margins)
-        bms_crossing = p_positive * p_negative  # 最大值 0.25 (50/50 split)
-    else:
-        bms_mean, bms_std, bms_crossing = None, None, None
-    
-    return {
-        "vfr": vfr,
-        "nd_i": nd_i,
-        "nd_h": nd_h,
-        "nd_r": nd_r,
-        "bms_mean": bms_mean,
-        "bms_std": bms_std,
-        "bms_crossing": bms_crossing,  # P(m>0)*P(m<0), max=0.25
-        "collapsed_rate": collapsed_rate,
-        "verdict_only_rate": verdict_only_rate,
-        "full_parse_rate": full_parse_rate,
-        "valid_samples": len(valid_entries)
-    }
+    return CellStats.from_entries(entries).ablation_metrics(expected_R)
 
 
 def run_ablation():
@@ -257,92 +397,80 @@ def run_ablation():
     print(f"Models: {ABLATION_MODELS}")
     print(f"Cases: {list(ABLATION_CASES)}")
     print(f"Temperatures: {TEMPERATURES}")
-    print(f"Iterations: {ITERATIONS}")
+    print(f"Iterations: {ITERATIONS}" + (" (adaptive)" if ADAPTIVE else ""))
     print(f"Total runs: {len(ABLATION_MODELS) * len(ABLATION_CASES) * len(TEMPERATURES) * ITERATIONS}")
     print("="*60)
     
-    # 尝试加载已有数据
-    existing_data = {}
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-            print(f"[INFO] Loaded existing data from {OUTPUT_FILE}")
-        except:
-            print("[WARN] Could not load existing data, starting fresh")
+    # 尝试加载已有数据（优先读取样本存储；为空时迁移旧 JSON 的 raw）
+    results, log = load_results()
+    track("ablation", map(job_cell, pending_jobs(results)), log.stats)
     
-    results = {
-        "metadata": {
-            "experiment": "T-ANBS",
-            "description": "Temperature Ablation for Normative Boundary Stability",
-            "note": "Studies end-to-end decision instability including reasoning stochasticity"
-        },
-        "raw": defaultdict(lambda: defaultdict(lambda: defaultdict(list))),
-        "metrics": defaultdict(lambda: defaultdict(dict))
-    }
+    # asyncio 后端：先跨模型/案例/温度并发补齐所有缺失样本，下面的循环只计算指标
+    if ASYNC_IN_FLIGHT:
+        prefill_async(results, log)
     
-    # 恢复已有数据
-    if "raw" in existing_data:
-        for model in existing_data["raw"]:
-            for case_id in existing_data["raw"][model]:
-                for temp in existing_data["raw"][model][case_id]:
-                    results["raw"][model][case_id][temp] = existing_data["raw"][model][case_id][temp]
+    # 自适应采样：在这里补齐所有单元格，下面的循环只计算指标
+    if ADAPTIVE:
+        sample_adaptive(results, log)
     
     for model in ABLATION_MODELS:
         print(f"\n[MODEL] {model}")
         
         for case_id in ABLATION_CASES:
-            config = CASE_CONFIG[case_id]
-            scenario = config["text"]
-            expected_R = config["expected_R"]
+            expected_R = CASE_CONFIG[case_id]["expected_R"]
             
             for temp in TEMPERATURES:
                 # 检查是否已有足够数据
-                existing_count = len(results["raw"][model][case_id][str(temp)])
-                if existing_count >= ITERATIONS:
-                    print(f"  {case_id} @ T={temp}: [SKIP] Already have {existing_count} iterations")
+                existing_count = len(results["done"][model][case_id][str(temp)])
+                if existing_count >= ITERATIONS or ADAPTIVE:
+                    note = "adaptive" if ADAPTIVE else "[SKIP] Already have"
+                    print(f"  {case_id} @ T={temp}: {note} {existing_count} iterations")
+                    results["metrics"][model][f"{case_id}_T{temp}"] = \
+                        log.stats.get((model, case_id, temp)).ablation_metrics(expected_R)
                     continue
                 
-                needed = ITERATIONS - existing_count
+                missing = [i for i in range(ITERATIONS) if i not in results["done"][model][case_id][str(temp)]]
                 print(f"  {case_id} @ T={temp}: [", end="", flush=True)
                 
-                for i in range(needed):
-                    prompt = PROMPT_TEMPLATE.format(scenario=scenario)
-                    raw = query_model(model, prompt, temp)
-                    parsed = robust_parse(raw)
-                    
-                    results["raw"][model][case_id][str(temp)].append({
-                        "iter": existing_count + i,
-                        "I": parsed["I"],
-                        "H": parsed["H"],
-                        "R": parsed["R"],
-                        "verdict": parsed["verdict"],
-                        "parse_status": parsed.get("parse_status", "error")
-                    })
-                    
-                    status = parsed.get("parse_status", "error")
-                    symbol = "." if status == "full" else ("v" if status == "verdict_only" else "x")
-                    print(symbol, end="", flush=True)
-                    time.sleep(0.5)
+                # 单 host 时逐个采样；OLLAMA_HOSTS 端点池时按该模型的总槽位并发
+                with ThreadPoolExecutor(max_workers=max(1, get_client().capacity(model))) as pool:
+                    futures = [pool.submit(run_iteration, model, case_id, temp, i) for i in missing]
+                    for future in as_completed(futures):
+                        entry, raw = future.result()
+                        record_entry(results, log, model, case_id, temp, entry, raw)
+                        print(status_symbol(entry), end="", flush=True)
                 
-                # 计算该组的指标
-                entries = results["raw"][model][case_id][str(temp)]
-                metrics = calculate_metrics(entries, expected_R)
+                # 该组的指标（读取增量统计，不再重扫样本）
+                cell = log.stats.get((model, case_id, temp))
+                metrics = cell.ablation_metrics(expected_R)
                 results["metrics"][model][f"{case_id}_T{temp}"] = metrics
                 
-                guilty = sum(1 for e in entries if e["verdict"] == "GUILTY")
                 crr = metrics.get('collapsed_rate', 0)
-                print(f"] G={guilty}/{ITERATIONS} CRR={crr:.0%}" if crr is not None else "]")
+                print(f"] G={cell.verdicts['GUILTY']}/{cell.n} CRR={crr:.0%}" if crr is not None else "]")
+    
+    # 存储 -> 嵌套 raw（整个运行只在这里读一遍全部样本）
+    raw = nest(log.records(), LOG_KEYS)
+    log.close()
     
     # 转换 defaultdict 为普通 dict
-    results["raw"] = {k: {k2: dict(v2) for k2, v2 in v.items()} for k, v in results["raw"].items()}
-    results["metrics"] = {k: dict(v) for k, v in results["metrics"].items()}
+    results = {
+        "metadata": results["metadata"],
+        "raw": raw,
+        "metrics": {k: dict(v) for k, v in results["metrics"].items()},
+    }
     
-    # 保存结果
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    # 保存结果（运行结束时整体写一次）
+    atomic_write_json(results, OUTPUT_FILE)
     
     print(f"\n[OK] Results saved to {OUTPUT_FILE}")
+    summary = early_stop_summary(e for cases in results["raw"].values()
+                                 for temps in cases.values() for entries in temps.values() for e in entries)
+    if summary:
+        print(f"[INFO] {summary}")
+    report = timing_report((model, e) for model, cases in results["raw"].items()
+                           for temps in cases.values() for entries in temps.values() for e in entries)
+    if report:
+        print(f"\n[LATENCY] Per model:\n{report}")
     
     # 生成详细摘要
     print_summary(results)
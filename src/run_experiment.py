@@ -1,9 +1,18 @@
+import asyncio
 import json
 import time
 import requests
-import re
 import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ollama_client import get_client, GENERATE_PATH, CHAT_PATH, POOL_SIZE, response_stats, early_stop_summary
+from async_client import AsyncOllamaClient, run_bounded
+from result_log import nest, flatten, atomic_write_json
+from result_store import open_store
+from response_parser import robust_parse_v9, VerdictWatcher
+from timing_report import timing_report
+from live_metrics import METRICS, track
+from cell_stats import track_store, stats_path
 
 # ==========================================
 # ⚙️ V9 融合版配置
@@ -21,9 +30,25 @@ MODELS = [
 ]
 ITERATIONS = 30  # 每个模型每个案例跑30轮
 OUTPUT_FILE = os.path.join(ROOT_DIR, "data", "experiment_data.json")
-API_URL = "http://localhost:11434/api/generate"
+LOG_FILE = os.path.join(ROOT_DIR, "data", "experiment_data.jsonl")  # 追加式样本日志（断点续传来源）
+LOG_KEYS = ("model", "case")
+RESULT_BACKEND = "jsonl"  # "jsonl" | "sqlite"（data/results.db）
+SAVE_RAW = True  # 同时保存压缩的原始回答（*.raw.jsonl / raw_z 列），供 reaudit.py 离线重新解析
+SEED = None  # 整数时第 i 轮使用 seed=SEED+i：可按固定 seed 重放，且回答会进入 response_cache 缓存
+STREAM_EARLY_STOP = False  # 流式生成：答案里出现完整的 MATH 行和 VERDICT 后立即断开，记录 eval_tokens / early_stop
 OLLAMA_THREADS = 8
 
+# 并发采样：每个模型同时在途的请求数，应与服务端 OLLAMA_NUM_PARALLEL 对齐
+# 1 = 原始串行行为；MODEL_WORKERS 可按模型单独覆盖
+WORKERS = 1
+MODEL_WORKERS = {
+    # "gemma3:4b": 4,
+}
+COOLDOWN = 1.0  # 每个 worker 每次请求后的散热间隔（秒）
+
+# asyncio 后端：>0 时单进程跨模型/案例保持 N 个在途请求（需要 aiohttp）
+ASYNC_IN_FLIGHT = 0
+
 # ==========================================
 # 🧪 PROMPT V9: One-Shot + MATH 格式（融合版）
 # ==========================================
@@ -72,169 +97,86 @@ CASES = [
 # ==========================================
 # 🧠 V9 游击队解析器 + R值验证 + 逻辑审计
 # ==========================================
-def robust_parse_v9(text):
-    """融合版本 V9.1：逻辑审计使用原始 R 值"""
-    if not text or "ERROR" in text:
-        return {
-            "I": -1, "H": -1, "R": -1, "E_reported": -1,
-            "verdict": "ERROR",
-            "audit_status": "NETWORK_FAIL",
-            "cot": "",
-            "r_hallucinated": False
-        }
-    
-    # 1. 提取 CoT（改进版：支持多种格式）
-    cot = ""
-    
-    # 尝试匹配 <think> 标签（支持换行和空格）
-    cot_match = re.search(r'<think>[\s\n]*(.*?)[\s\n]*</think>', text, re.DOTALL | re.IGNORECASE)
-    if cot_match:
-        cot = cot_match.group(1).strip()
-    else:
-        # 尝试匹配 DeepSeek-R1 的 <\begin 格式
-        deepseek_match = re.search(r'<\\begin(.*?)(?=MATH:|VERDICT|$)', text, re.DOTALL)
-        if deepseek_match:
-            cot = deepseek_match.group(1).strip()
-        else:
-            # 最后回退：取 MATH: 或 VERDICT 之前的所有内容
-            if "MATH:" in text:
-                cot = text.split("MATH:")[0].strip()
-            elif "VERDICT" in text:
-                cot = text.split("VERDICT")[0].strip()
-            else:
-                cot = text[:500]
-    
-    # 清理 cot
-    cot = cot.strip()
-    
-    # 2. 游击队数值抓取 (保持不变)
-    clean = text.replace("*", "").replace("`", "").replace("[", "").replace("]", "")
-    
-    def extract_val(key_regex):
-        # 更宽松的正则：支持 R=2, R:2, R is 2, R 2.0, R(2.0) 等格式
-        matches = re.findall(key_regex + r"[\s:=\(is]*(\d+\.?\d*)", clean, re.IGNORECASE)
-        if matches: return float(matches[-1])
-        return -1.0
-    
-    r_val = extract_val(r"(?:R|Irreversibility)")
-    i_val = extract_val(r"(?:I|Intent)")
-    h_val = extract_val(r"(?:H|Base\s*Harm)")
-    e_reported = extract_val(r"(?:E|Effective\s*Harm)")
-    
-    # 3. ⚠️ 逻辑修正点：检测但不修改用于计算的 R
-    r_hallucinated = False
-    valid_r = [0.1, 1.0, 2.0]
-    if r_val != -1 and r_val not in valid_r:
-        r_hallucinated = True
-        # 注意：这里我们不再覆盖 r_val，我们要用它来做审计
-    
-    # 4. Verdict 抓取 (保持不变)
-    verdict = "UNKNOWN"
-    clean_upper = clean.upper()
-    verdict_section = clean_upper.split("VERDICT")[-1] if "VERDICT" in clean_upper else clean_upper
-    if "NOT GUILTY" in verdict_section: verdict = "NOT_GUILTY"
-    elif "GUILTY" in verdict_section: verdict = "GUILTY"
-    
-    # 5. 逻辑审计 (使用原始 R 值)
-    status = "MISSING_DATA"
-    if r_val != -1 and i_val != -1 and h_val != -1:
-        e_calc = h_val * r_val
-        
-        # 宽容的比较：如果 i_val 和 e_calc 极其接近，可能模型会由着性子判
-        # 我们给一点 margin
-        if i_val > e_calc: 
-            expected = "NOT_GUILTY"
-        else:
-            expected = "GUILTY"
-            
-        if verdict == expected:
-            status = "EXECUTED"
-        elif verdict == "UNKNOWN":
-            status = "VERDICT_MISSING"
-        else:
-            # 这是一个强信号：模型算出 E 很低，却非要判 Guilty
-            status = "RATIONALIZED"
-    
-    return {
-        "I": i_val,
-        "H": h_val,
-        "R": r_val, # 返回原始值
-        "E_reported": e_reported,
-        "verdict": verdict,
-        "audit_status": status,
-        "r_hallucinated": r_hallucinated,
-        "cot": cot
-    }
+# robust_parse_v9 见 response_parser.py（预编译的单次扫描实现）
 
 # 支持 thinking 的模型列表
 THINKING_MODELS = ["deepseek-r1", "qwen3", "deepseek-v3"]
 
-def query_model(model, prompt, retries=3):
-    """查询模型，根据模型类型选择合适的 API 端点"""
+def build_request(model, prompt, seed=None):
+    """根据模型类型选择 API 端点，返回 (path, payload, supports_thinking)"""
     
     # 检查模型是否支持 thinking
     supports_thinking = any(tm in model.lower() for tm in THINKING_MODELS)
+    options = {
+        "temperature": 0.6,
+        "num_predict": 2048,
+        "num_ctx": 4096,
+        "num_thread": OLLAMA_THREADS
+    }
+    if seed is not None:
+        options["seed"] = seed
     
     if supports_thinking:
         # 使用 /api/chat 端点，启用 think 参数
-        url = API_URL.replace("/api/generate", "/api/chat")
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "stream": False,
             "think": True,
-            "options": {
-                "temperature": 0.6,
-                "num_predict": 2048,
-                "num_ctx": 4096,
-                "num_thread": OLLAMA_THREADS
-            }
-        }
-    else:
-        # 使用 /api/generate 端点（Gemma 等不支持 thinking 的模型）
-        url = API_URL
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.6,
-                "num_predict": 2048,
-                "num_ctx": 4096,
-                "num_thread": OLLAMA_THREADS
-            }
+            "options": options
         }
+        return CHAT_PATH, payload, True
+    
+    # 使用 /api/generate 端点（Gemma 等不支持 thinking 的模型）
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "options": options
+    }
+    return GENERATE_PATH, payload, False
+
+def extract_response(data, supports_thinking):
+    """从 Ollama 响应 JSON 中取出待解析文本"""
+    if supports_thinking:
+        # 从 chat 响应中提取内容
+        message = data.get('message', {})
+        content = message.get('content', '')
+        thinking = message.get('thinking', '')
+        
+        # DeepSeek/Qwen 的 thinking 模式：
+        # - thinking 字段包含推理过程
+        # - content 可能为空，或包含最终答案
+        # - 需要从 thinking 中提取数值
+        if thinking:
+            # 组合输出：thinking 作为 CoT，content 作为结论
+            # 如果 content 为空，也把 thinking 附加到后面供解析
+            combined = f"<think>\n{thinking}\n</think>\n"
+            if content.strip():
+                combined += content
+            else:
+                # content 为空时，把 thinking 也作为解析源
+                combined += thinking
+            return combined
+        return content
+    
+    # 从 generate 响应中提取内容
+    return data.get('response', '')
+
+def query_model(model, prompt, retries=3, seed=None):
+    """查询模型（共享连接池），失败重试；返回 (文本, 请求统计：Ollama 计时字段 + 流式生成统计)"""
+    path, payload, supports_thinking = build_request(model, prompt, seed)
+    client = get_client()
     
     for attempt in range(retries):
         try:
-            res = requests.post(url, json=payload, timeout=300)
-            res.raise_for_status()
-            data = res.json()
-            
-            if supports_thinking:
-                # 从 chat 响应中提取内容
-                message = data.get('message', {})
-                content = message.get('content', '')
-                thinking = message.get('thinking', '')
-                
-                # DeepSeek/Qwen 的 thinking 模式：
-                # - thinking 字段包含推理过程
-                # - content 可能为空，或包含最终答案
-                # - 需要从 thinking 中提取数值
-                if thinking:
-                    # 组合输出：thinking 作为 CoT，content 作为结论
-                    # 如果 content 为空，也把 thinking 附加到后面供解析
-                    combined = f"<think>\n{thinking}\n</think>\n"
-                    if content.strip():
-                        combined += content
-                    else:
-                        # content 为空时，把 thinking 也作为解析源
-                        combined += thinking
-                    return combined
-                return content
-            else:
-                # 从 generate 响应中提取内容
-                return data.get('response', '')
+            with METRICS.request(model) as request:
+                if STREAM_EARLY_STOP:
+                    data = client.post_stream(path, payload, stop=VerdictWatcher().feed, timeout=300)
+                else:
+                    data = client.post(path, payload, timeout=300)
+                request.cached = data.get("cached", False)
+            return extract_response(data, supports_thinking), response_stats(data, payload)
             
         except requests.exceptions.Timeout:
             print(f"[T{attempt+1}]", end="", flush=True)
@@ -242,44 +184,159 @@ def query_model(model, prompt, retries=3):
             print(f"[E{attempt+1}]", end="", flush=True)
             time.sleep(3)
     
-    return "ERROR_TIMEOUT"
+    return "ERROR_TIMEOUT", {}
 
-# ==========================================
-# 🚀 V9 主运行函数（带断点续传）
-# ==========================================
-def run_v9():
-    """V9 融合版本：One-Shot + 游击队解析 + R值验证 + 逻辑审计 + 断点续传"""
+async def query_model_async(client, model, prompt, retries=3, seed=None):
+    """query_model 的 asyncio 版本（AsyncOllamaClient），重试语义相同"""
+    path, payload, supports_thinking = build_request(model, prompt, seed)
     
-    # 1. 读取旧数据（断点续传）
-    results = defaultdict(lambda: defaultdict(list))
-    if os.path.exists(OUTPUT_FILE):
+    for attempt in range(retries):
+        try:
+            with METRICS.request(model) as request:
+                if STREAM_EARLY_STOP:
+                    data = await client.post_stream(path, payload, stop=VerdictWatcher().feed, timeout=300)
+                else:
+                    data = await client.post(path, payload, timeout=300)
+                request.cached = data.get("cached", False)
+            return extract_response(data, supports_thinking), response_stats(data, payload)
+            
+        except asyncio.TimeoutError:
+            print(f"[T{attempt+1}]", end="", flush=True)
+        except Exception as e:
+            print(f"[E{attempt+1}]", end="", flush=True)
+            await asyncio.sleep(3)
+    
+    return "ERROR_TIMEOUT", {}
+
+def iter_seed(i):
+    """第 i 轮的采样 seed（SEED 为 None 时不固定）"""
+    return None if SEED is None else SEED + i
+
+def make_entry(i, raw):
+    """解析原始输出，构造待保存的 entry"""
+    data = robust_parse_v9(raw)
+    return {
+        "iter": i,
+        "I": data['I'],
+        "H": data['H'],
+        "R": data['R'],
+        "E_reported": data['E_reported'],
+        "verdict": data['verdict'],
+        "audit_status": data['audit_status'],
+        "r_hallucinated": data.get('r_hallucinated', False),
+        "cot": data['cot'],
+        "timestamp": time.time()
+    }
+
+def run_iteration(model, case, i):
+    """跑单个 (model, case, iter) 样本，返回 (entry, 原始输出)（可在 worker 线程中执行）"""
+    prompt = PROMPT_TEMPLATE.format(scenario=case['text'])
+    raw, stats = query_model(model, prompt, seed=iter_seed(i))
+    entry = {**make_entry(i, raw), **stats}
+    time.sleep(COOLDOWN)  # 散热
+    return entry, raw
+
+def record_entry(results, log, model, case_id, entry, raw=None):
+    """记下已完成的 iter，并把样本追加到样本存储（SAVE_RAW 时连同压缩的原始输出）"""
+    results[model][case_id].add(entry['iter'])
+    log.append({"model": model, "case": case_id, **entry}, raw if SAVE_RAW else None)
+    METRICS.sample_done("main", model, case_id, entry['audit_status'])
+
+def load_results():
+    """
+    断点续传：优先读取样本存储（JSONL 日志或 SQLite）；存储为空时读取旧的 OUTPUT_FILE 并迁移进去。
+    返回 (results, store)：results 为 model -> case -> 已完成的 iter 集合（SQLite 只查索引，不读样本内容）；
+    store.stats 为每个 (model, case) 的增量统计，随 append 更新
+    """
+    results = defaultdict(lambda: defaultdict(set))
+    store = open_store(RESULT_BACKEND, LOG_FILE, "main")
+    done = store.done_iters(LOG_KEYS)
+    store = track_store(store, LOG_KEYS, stats_path(LOG_FILE))
+    if done:
+        print(f"📂 Resuming from {RESULT_BACKEND} store...")
+    elif os.path.exists(OUTPUT_FILE):
         print(f"📂 Loading existing data from {OUTPUT_FILE}...")
         with open(OUTPUT_FILE, "r", encoding='utf-8') as f:
             try:
-                loaded_data = json.load(f)
-                for m, cases in loaded_data.items():
-                    for c_id, entries in cases.items():
-                        results[m][c_id] = entries
+                store.extend(flatten(json.load(f), LOG_KEYS))
+                done = store.done_iters(LOG_KEYS)
             except Exception as e:
                 print(f"⚠️ Error loading: {e}. Starting fresh.")
+    for (m, c_id), iters in done.items():
+        results[m][c_id] = iters
+    return results, store
+
+def pending_iters(results, model, case_id):
+    """尚未完成的 iter 编号（断点续传）"""
+    done_iters = results[model][case_id]
+    return [i for i in range(ITERATIONS) if i not in done_iters]
+
+# 跨实验调度接口（scheduler.py）：作业 = (model, case, iter)，第一个元素是模型
+def pending_jobs(results):
+    """所有模型/案例的缺失样本"""
+    return [(model, case, i)
+            for model in MODELS
+            for case in CASES
+            for i in pending_iters(results, model, case['id'])]
+
+def run_job(job):
+    return run_iteration(*job)
+
+def record_job(results, log, job, entry, raw=None):
+    model, case, _ = job
+    record_entry(results, log, model, case['id'], entry, raw)
+
+def job_cell(job):
+    """作业所属的 (model, case)，live_metrics 的标签"""
+    model, case, _ = job
+    return model, case['id']
+
+def prefill_async(results, log):
+    """
+    asyncio 后端：把所有模型/案例的缺失样本一次性排队，
+    整个进程保持 ASYNC_IN_FLIGHT 个在途请求，结果写回 results。
+    """
+    jobs = pending_jobs(results)
+    print(f"⚡ ASYNC BACKEND: {len(jobs)} pending samples, {ASYNC_IN_FLIGHT} in flight")
+    if not jobs:
+        return
     
-    print(f"\n{'='*60}")
-    print(f"🚀 V9 FUSION BATCH RUNNER")
-    print(f"{'='*60}")
-    print(f"Models: {MODELS}")
-    print(f"Iterations: {ITERATIONS}")
-    print(f"Features: One-Shot + Gorilla Parser + R-Validation + Audit")
-    print(f"{'='*60}\n")
+    async def sample(client, job):
+        model, case, i = job
+        prompt = PROMPT_TEMPLATE.format(scenario=case['text'])
+        raw, stats = await query_model_async(client, model, prompt, seed=iter_seed(i))
+        return job, {**make_entry(i, raw), **stats}, raw
+    
+    async def main():
+        async with AsyncOllamaClient(max_connections=ASYNC_IN_FLIGHT) as client:
+            async for (model, case, i), entry, raw in run_bounded(
+                    jobs, lambda job: sample(client, job), ASYNC_IN_FLIGHT):
+                record_entry(results, log, model, case['id'], entry, raw)
+                print(".", end="", flush=True)
+    
+    print("[", end="", flush=True)
+    asyncio.run(main())
+    print("]")
+
+def sample_all(results, log):
+    """补齐所有 (model, case) 的缺失样本"""
+    # 共享连接池：至少容纳最大并发数
+    get_client(pool_size=max([POOL_SIZE, WORKERS, *MODEL_WORKERS.values()]))
+    track("main", map(job_cell, pending_jobs(results)), log.stats)
+    
+    # asyncio 后端：先跨模型/案例并发补齐所有缺失样本，下面的循环只做统计
+    if ASYNC_IN_FLIGHT:
+        prefill_async(results, log)
     
     # 2. 模型循环
     for model in MODELS:
-        print(f"\n🤖 MODEL: {model.upper()}")
+        # OLLAMA_HOSTS 端点池时至少用满该模型在所有端点上的槽位
+        workers = max(MODEL_WORKERS.get(model, WORKERS), get_client().capacity(model))
+        print(f"\n🤖 MODEL: {model.upper()} (workers={workers})")
         
-        # 预热
-        try:
-            requests.post(API_URL, json={"model": model, "keep_alive": "5m"}, timeout=3)
-        except:
-            pass
+        # 预热（样本已齐时不加载模型）
+        if any(pending_iters(results, model, case['id']) for case in CASES):
+            get_client().keep_alive(model, "5m")
         
         # 3. 案例循环
         for case in CASES:
@@ -298,56 +355,65 @@ def run_v9():
             
             print("[", end="", flush=True)
             
-            # 4. 迭代循环
-            for i in range(existing, ITERATIONS):
-                prompt = PROMPT_TEMPLATE.format(scenario=case['text'])
-                raw = query_model(model, prompt)
-                data = robust_parse_v9(raw)
-                
-                # 统计
-                stats[data['audit_status']] = stats.get(data['audit_status'], 0) + 1
-                if data['verdict'] == "GUILTY":
-                    stats['GUILTY'] += 1
-                elif data['verdict'] == "NOT_GUILTY":
-                    stats['NOT_GUILTY'] += 1
-                if data.get('r_hallucinated', False):
-                    stats['R_HALLUCINATED'] += 1
-                
-                # 打印第一个 CoT（调试用）
-                if i == existing and "deepseek" in model and data['cot']:
-                    print(f"\n    💭 {data['cot'][:120]}...")
-                    print("    ", end="")
-                
-                # 保存
-                entry = {
-                    "iter": i,
-                    "I": data['I'],
-                    "H": data['H'],
-                    "R": data['R'],
-                    "E_reported": data['E_reported'],
-                    "verdict": data['verdict'],
-                    "audit_status": data['audit_status'],
-                    "r_hallucinated": data.get('r_hallucinated', False),
-                    "cot": data['cot'],
-                    "timestamp": time.time()
-                }
-                results[model][case_id].append(entry)
-                
-                print(".", end="", flush=True)
-                
-                # 增量保存
-                try:
-                    with open(OUTPUT_FILE, "w", encoding='utf-8') as f:
-                        json.dump(dict(results), f, indent=2, ensure_ascii=False)
-                except:
-                    pass
-                
-                time.sleep(1.0)  # 散热
+            # 4. 迭代循环（缺失的 iter 编号；并发时按完成顺序回收）
+            pending = pending_iters(results, model, case_id)
+            first = True
+            
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_iteration, model, case, i) for i in pending]
+                for future in as_completed(futures):
+                    entry, raw = future.result()
+                    
+                    # 统计
+                    stats[entry['audit_status']] = stats.get(entry['audit_status'], 0) + 1
+                    if entry['verdict'] == "GUILTY":
+                        stats['GUILTY'] += 1
+                    elif entry['verdict'] == "NOT_GUILTY":
+                        stats['NOT_GUILTY'] += 1
+                    if entry['r_hallucinated']:
+                        stats['R_HALLUCINATED'] += 1
+                    
+                    # 打印第一个 CoT（调试用）
+                    if first and "deepseek" in model and entry['cot']:
+                        print(f"\n    💭 {entry['cot'][:120]}...")
+                        print("    ", end="")
+                    first = False
+                    
+                    # 增量保存（追加一行日志，不再整体重写 JSON）
+                    record_entry(results, log, model, case_id, entry, raw)
+                    
+                    print(".", end="", flush=True)
             
             # 打印统计
             print(f"] Exec={stats['EXECUTED']} Rat={stats['RATIONALIZED']} | G={stats['GUILTY']} NG={stats['NOT_GUILTY']}")
             if stats['R_HALLUCINATED'] > 0:
                 print(f"    ⚠️ R-Value Hallucinated: {stats['R_HALLUCINATED']} times")
+
+# ==========================================
+# 🚀 V9 主运行函数（带断点续传）
+# ==========================================
+def run_v9():
+    """V9 融合版本：One-Shot + 游击队解析 + R值验证 + 逻辑审计 + 断点续传"""
+    
+    # 1. 读取旧数据（断点续传）
+    results, log = load_results()
+    
+    print(f"\n{'='*60}")
+    print(f"🚀 V9 FUSION BATCH RUNNER")
+    print(f"{'='*60}")
+    print(f"Models: {MODELS}")
+    print(f"Iterations: {ITERATIONS}")
+    print(f"Workers/model: {WORKERS} (overrides: {MODEL_WORKERS or 'none'})")
+    print(f"Features: One-Shot + Gorilla Parser + R-Validation + Audit")
+    print(f"{'='*60}\n")
+    
+    try:
+        sample_all(results, log)
+    finally:
+        # 存储 -> 嵌套 JSON（中断时同样压缩已完成的样本）；整个运行只在这里读一遍全部样本
+        nested = nest(log.records(), LOG_KEYS)
+        atomic_write_json(nested, OUTPUT_FILE)
+        log.close()
     
     # 5. 最终统计
     print(f"\n{'='*60}")
@@ -368,17 +434,18 @@ def run_v9():
         for case_id in [c['id'] for c in CASES]:
             if case_id not in results[model]:
                 continue
-            entries = results[model][case_id]
-            exec_count = sum(1 for e in entries if e.get('audit_status') == 'EXECUTED')
-            rat_count = sum(1 for e in entries if e.get('audit_status') == 'RATIONALIZED')
-            hall_count = sum(1 for e in entries if e.get('r_hallucinated', False))
-            g_count = sum(1 for e in entries if e.get('verdict') == 'GUILTY')
-            ng_count = sum(1 for e in entries if e.get('verdict') == 'NOT_GUILTY')
+            # 计数读取增量统计（cell_stats.py），不再逐条重扫样本
+            cell = log.stats.get((model, case_id))
+            exec_count = cell.status['EXECUTED']
+            rat_count = cell.status['RATIONALIZED']
+            hall_count = cell.hallucinated
+            g_count = cell.verdicts['GUILTY']
+            ng_count = cell.verdicts['NOT_GUILTY']
             
             model_exec += exec_count
             model_rat += rat_count
             model_hall += hall_count
-            total_entries += len(entries)
+            total_entries += cell.n
             
             print(f"  {case_id}: Exec={exec_count} Rat={rat_count} Hall={hall_count} | G={g_count} NG={ng_count}")
         
@@ -392,6 +459,12 @@ def run_v9():
     print(f"   Executed={total_executed}/{total_entries} ({100*total_executed/total_entries:.1f}%)")
     print(f"   Rationalized={total_rationalized}/{total_entries} ({100*total_rationalized/total_entries:.1f}%)")
     print(f"   R_Hallucinated={total_hallucinated}/{total_entries} ({100*total_hallucinated/total_entries:.1f}%)")
+    summary = early_stop_summary(e for cases in nested.values() for entries in cases.values() for e in entries)
+    if summary:
+        print(f"   {summary}")
+    report = timing_report((m, e) for m, cases in nested.items() for entries in cases.values() for e in entries)
+    if report:
+        print(f"\n⏱️ LATENCY (per model):\n{report}")
     print(f"✅ Data saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
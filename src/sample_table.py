@@ -0,0 +1,120 @@
+"""
+Columnar sample table
+
+Exports the main experiment's samples to Parquet: the parsed numeric /
+categorical fields go to `data/samples.parquet`, the long CoT text to a
+separate `data/samples_cot.parquet` (same row order). `load_samples()`
+reads only the requested columns, so analysis and plotting never parse
+the CoT-heavy JSON. The export is refreshed automatically whenever the
+JSON or SQLite source is newer than the Parquet file.
+
+Requires the optional dependency pyarrow; without it the loader reads
+the SQLite store / JSON directly and returns the same DataFrame.
+
+Usage (manual export):
+    python src/sample_table.py
+"""
+import json
+import os
+import pandas as pd
+from result_log import flatten
+from result_store import DB_FILE, ResultStore, has_experiment
+
+try:
+    import pyarrow  # noqa: F401  (pandas 的 parquet 引擎)
+except ImportError:  # 可选依赖：没有时直接读 SQLite / JSON
+    pyarrow = None
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+JSON_FILE = os.path.join(ROOT_DIR, "data", "experiment_data.json")
+PARQUET_FILE = os.path.join(ROOT_DIR, "data", "samples.parquet")
+COT_FILE = os.path.join(ROOT_DIR, "data", "samples_cot.parquet")
+
+KEY_COLUMNS = ["model", "case", "iter"]
+SAMPLE_COLUMNS = KEY_COLUMNS + ["I", "H", "R", "E_reported", "verdict", "audit_status",
+                                "r_hallucinated", "timestamp"]
+
+# 缺失字段的默认值（与原先 e.get(key, default) 的取值一致）
+DEFAULTS = {"I": -1.0, "H": -1.0, "R": -1.0, "E_reported": -1.0,
+            "verdict": "", "audit_status": "UNKNOWN", "r_hallucinated": False}
+
+
+def _normalize(df):
+    """补默认值并统一 dtype（JSON / SQLite / Parquet 三种来源结果一致）"""
+    for col, default in DEFAULTS.items():
+        if col in df:
+            df[col] = df[col].fillna(default)
+    if "r_hallucinated" in df:
+        df["r_hallucinated"] = df["r_hallucinated"].astype(bool)
+    if "iter" in df:
+        df["iter"] = df["iter"].astype("int64")
+    return df
+
+
+def read_source(columns=None, db_path=DB_FILE, json_path=JSON_FILE):
+    """
+    直接从原始来源读取样本表：SQLite 含主实验时只 SELECT 所需列，
+    否则解析 JSON。找不到来源时抛 FileNotFoundError。
+    """
+    columns = list(columns or SAMPLE_COLUMNS)
+    if has_experiment(db_path, "main"):
+        select = ", ".join('case_id AS "case"' if c == "case" else c for c in columns)
+        with ResultStore(db_path, "main") as store:
+            df = pd.read_sql_query(
+                f"SELECT {select} FROM samples WHERE experiment = 'main' ORDER BY id", store.conn)
+        return _normalize(df)
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    df = pd.DataFrame.from_records(list(flatten(data, ("model", "case"))))
+    return _normalize(df.reindex(columns=columns))
+
+
+def export_columnar(db_path=DB_FILE, json_path=JSON_FILE,
+                    out_path=PARQUET_FILE, cot_path=COT_FILE):
+    """样本表 -> samples.parquet（数值列）+ samples_cot.parquet（CoT 文本），返回行数"""
+    if pyarrow is None:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+    df = read_source(SAMPLE_COLUMNS + ["cot"], db_path, json_path)
+    df["cot"] = df["cot"].fillna("")
+    df[SAMPLE_COLUMNS].to_parquet(out_path, index=False)
+    df[KEY_COLUMNS + ["cot"]].to_parquet(cot_path, index=False)
+    return len(df)
+
+
+def is_fresh(path, sources):
+    """导出文件存在且不早于任何一个已存在的来源文件"""
+    if not os.path.exists(path):
+        return False
+    mtime = os.path.getmtime(path)
+    return all(os.path.getmtime(s) <= mtime for s in sources if os.path.exists(s))
+
+
+def load_samples(columns=None, db_path=DB_FILE, json_path=JSON_FILE,
+                 out_path=PARQUET_FILE, cot_path=COT_FILE):
+    """
+    读取主实验样本表（一行一个样本），只加载 columns 中的列；
+    请求 "cot" 时从单独的 CoT 文件按行对齐拼接。
+    """
+    columns = list(columns or SAMPLE_COLUMNS)
+    if pyarrow is None:
+        return read_source(columns, db_path, json_path)
+
+    sources = [json_path, db_path, f"{db_path}-wal"]
+    if not (is_fresh(out_path, sources) and is_fresh(cot_path, sources)):
+        n = export_columnar(db_path, json_path, out_path, cot_path)
+        print(f"[DATA] Exported {n} samples -> {out_path}")
+
+    df = pd.read_parquet(out_path, columns=[c for c in columns if c != "cot"])
+    if "cot" in columns:
+        df["cot"] = pd.read_parquet(cot_path, columns=["cot"])["cot"]
+    return df[columns]
+
+
+if __name__ == "__main__":
+    n = export_columnar()
+    print(f"[OK] Exported {n} samples -> {PARQUET_FILE}, {COT_FILE}")
@@ -0,0 +1,143 @@
+"""
+Model-affinity scheduler
+
+Collects the pending samples of all three experiments (main, temperature
+ablation, illustrative comparison), groups them by model and drains each
+model's queue while it is resident: the model is loaded once, pinned with
+`keep_alive=-1` for the whole queue, and unloaded explicitly before the
+next model is loaded. Running the scripts one after another instead loads
+every model once per script.
+
+Samples go into each experiment's own store, so afterwards the scripts
+find nothing pending and only compute metrics and write their outputs
+(run_all.py does exactly that).
+
+Usage:
+    python src/scheduler.py [--experiments main ablation comparison] [--dry-run]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "experiments"))
+
+from ollama_client import get_client
+from live_metrics import track
+import run_experiment
+import run_ablation
+import illustrative_comparison
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+# 实验名 -> 运行器模块（提供 load_results / pending_jobs / run_job / record_job / job_cell，作业第一个元素是模型）
+EXPERIMENTS = {
+    "main": run_experiment,
+    "ablation": run_ablation,
+    "comparison": illustrative_comparison,
+}
+PIN_KEEP_ALIVE = -1  # 排空队列期间模型常驻
+LOAD_TIMEOUT = 600   # 首次从磁盘加载大模型可能很慢
+
+
+def collect(experiments):
+    """读取各实验的存储，返回 (states, queues)：queues 为 model -> [(实验名, job)]，按模型首次出现的顺序"""
+    states = {}
+    queues = defaultdict(list)
+    for name in experiments:
+        runner = EXPERIMENTS[name]
+        results, log = runner.load_results()
+        states[name] = (results, log)
+        for job in runner.pending_jobs(results):
+            queues[job[0]].append((name, job))
+    return states, queues
+
+
+def model_order(client, queues):
+    """已经常驻的模型排在最前面（省一次加载），其余保持原顺序"""
+    try:
+        resident = set(client.running())
+    except Exception:
+        resident = set()
+    return sorted(queues, key=lambda model: model not in resident)
+
+
+def drain(model, queue, states, client):
+    """加载并钉住模型，跑完它在所有实验中的作业，然后卸载；返回 (加载耗时, 采样耗时)"""
+    workers = max(run_experiment.MODEL_WORKERS.get(model, run_experiment.WORKERS), client.capacity(model))
+    start = time.perf_counter()
+    client.load(model, keep_alive=PIN_KEEP_ALIVE, timeout=LOAD_TIMEOUT)
+    loaded = time.perf_counter()
+    client.pinned_keep_alive = PIN_KEEP_ALIVE
+    try:
+        print("  [", end="", flush=True)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(EXPERIMENTS[name].run_job, job): (name, job) for name, job in queue}
+            for future in as_completed(futures):
+                name, job = futures[future]
+                entry, raw = future.result()
+                results, log = states[name]
+                EXPERIMENTS[name].record_job(results, log, job, entry, raw)
+                print(".", end="", flush=True)
+        print("]")
+    finally:
+        client.pinned_keep_alive = None
+        client.unload(model)
+    return loaded - start, time.perf_counter() - loaded
+
+
+def schedule(experiments, dry_run=False):
+    states, queues = collect(experiments)
+    try:
+        total = sum(len(queue) for queue in queues.values())
+        print(f"\n[SCHEDULER] {total} pending samples across {len(queues)} models "
+              f"({', '.join(experiments)})")
+        if not queues:
+            return
+        if not dry_run:
+            for name in experiments:
+                track(name, (EXPERIMENTS[name].job_cell(job) for queue in queues.values()
+                             for exp, job in queue if exp == name),
+                      getattr(states[name][1], "stats", None))  # comparison 没有单元格统计
+
+        client = get_client(pool_size=max([run_experiment.WORKERS, *run_experiment.MODEL_WORKERS.values()]))
+        load_total = sample_total = 0.0
+        for model in model_order(client, queues):
+            queue = queues[model]
+            split = Counter(name for name, _ in queue)
+            print(f"\n[MODEL] {model}: {len(queue)} samples "
+                  f"({', '.join(f'{name} {n}' for name, n in split.items())})")
+            if dry_run:
+                continue
+            try:
+                load_time, sample_time = drain(model, queue, states, client)
+            except Exception as e:
+                print(f"  [WARN] {model}: {e!r}, skipping")
+                continue
+            load_total += load_time
+            sample_total += sample_time
+            print(f"  load {load_time:.1f}s, sampling {sample_time:.1f}s, unloaded")
+
+        if not dry_run:
+            print(f"\n[SCHEDULER] {len(queues)} model loads, {load_total:.1f}s loading, "
+                  f"{sample_total:.1f}s sampling")
+    finally:
+        for results, log in states.values():
+            log.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drain all pending samples grouped by model")
+    parser.add_argument("--experiments", nargs="+", choices=list(EXPERIMENTS), default=list(EXPERIMENTS))
+    parser.add_argument("--dry-run", action="store_true", help="print the per-model plan without sampling")
+    args = parser.parse_args(argv)
+    schedule(args.experiments, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Per-model latency report
+
+Every sample carries the timings Ollama reports for its request
+(`total_duration`, `load_duration`, `prompt_eval_count` / `_duration`,
+`eval_count` / `_duration`, nanoseconds), plus the client-measured time to
+first token of streamed samples. Samples served from the response cache
+(`cached: True`) replay the original request's timings and are skipped.
+This module aggregates them per model:
+time to first token, prompt-eval and generation throughput, and how the
+server time splits between model loading, prompt evaluation and decoding,
+so the bottleneck of a run is visible at a glance.
+
+Ollama only evaluates the part of a prompt after the prefix it shares
+with the model's KV cache, and `prompt_eval_count` counts just those
+tokens. Samples that also record `prompt_chars` let the report estimate
+what the cache saved: the model's tokens-per-character ratio is taken
+from its least-cached request (the highest prompt_eval_count /
+prompt_chars, normally the first, cold one), each prompt's full length is
+estimated from it, and the difference to the evaluated tokens is the
+reused part.
+
+The runners print the report at the end of a run. To report on stored
+samples:
+    python src/timing_report.py [--experiments main ablation comparison]
+"""
+import argparse
+import os
+import sys
+
+# ==========================================
+# ⚙️ 配置
+# ==========================================
+NS = 1e9
+COLD_LOAD = 1.0  # load_duration 超过该秒数视为一次冷加载（常驻模型的 load_duration 只有毫秒级）
+PHASES = ("load", "prompt", "eval")
+
+
+def sample_timing(entry):
+    """单个样本的计时（秒 / token 数）；没有任何计时字段（旧样本、失败请求）或来自响应缓存时返回 None"""
+    if entry.get("cached"):
+        return None  # 缓存回放的计时字段是原请求的，不是本次的延迟
+    timing = {}
+    if "total_duration" in entry:
+        timing["load"] = entry.get("load_duration", 0) / NS
+        timing["prompt"] = entry.get("prompt_eval_duration", 0) / NS
+        timing["prompt_tokens"] = entry.get("prompt_eval_count", 0)  # 命中 KV 缓存的 prompt 可能没有该字段
+        timing["eval"] = entry.get("eval_duration", 0) / NS
+        timing["eval_tokens"] = entry.get("eval_count", 0)
+        if entry.get("prompt_chars"):
+            timing["prompt_chars"] = entry["prompt_chars"]
+        timing["ttft"] = timing["load"] + timing["prompt"]  # 服务端估计：加载 + prompt 评估
+    if "ttft_duration" in entry:
+        timing["ttft"] = entry["ttft_duration"] / NS  # 流式样本：客户端实测
+        if "eval_duration" not in entry and "stream_duration" in entry:
+            # 提前结束的流没有最终 chunk：用首 token 之后的客户端时长近似生成耗时
+            timing["eval"] = (entry["stream_duration"] - entry["ttft_duration"]) / NS
+            timing["eval_tokens"] = entry.get("eval_tokens", 0)
+    return timing or None
+
+
+def percentile(values, q):
+    """最近秩百分位（values 已排序）"""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def prompt_reuse(samples):
+    """
+    KV 缓存复用的 prompt token 估计：(复用的 token 数, 占 prompt 总 token 的比例)；
+    没有带 prompt_chars 的样本时返回 (None, None)
+    """
+    sized = [t for t in samples if "prompt_chars" in t]
+    ratio = max((t["prompt_tokens"] / t["prompt_chars"] for t in sized), default=0)
+    if not ratio:
+        return None, None
+    reused = sum(max(0, round(ratio * t["prompt_chars"]) - t["prompt_tokens"]) for t in sized)
+    evaluated = sum(t["prompt_tokens"] for t in sized)
+    return reused, reused / (reused + evaluated)
+
+
+def model_timings(pairs):
+    """
+    (model, entry) 序列 -> {model: 汇总}（按模型首次出现的顺序）。
+    吞吐量按总 token / 总耗时计算；load/prompt/eval 占比只统计带服务端计时的样本
+    """
+    timings = {}
+    for model, entry in pairs:
+        timing = sample_timing(entry)
+        if timing:
+            timings.setdefault(model, []).append(timing)
+
+    rows = {}
+    for model, samples in timings.items():
+        ttft = sorted(t["ttft"] for t in samples)
+        sums = {key: sum(t.get(key, 0) for t in samples)
+                for key in ("load", "prompt", "prompt_tokens", "eval", "eval_tokens")}
+        phase_total = sum(sums[phase] for phase in PHASES)
+        share = {phase: sums[phase] / phase_total if phase_total else 0.0 for phase in PHASES}
+        prompt_tps = sums["prompt_tokens"] / sums["prompt"] if sums["prompt"] else None
+        reused, reuse_share = prompt_reuse(samples)
+        rows[model] = {
+            "samples": len(samples),
+            "ttft_p50": percentile(ttft, 0.5),
+            "ttft_p90": percentile(ttft, 0.9),
+            "prompt_tps": prompt_tps,
+            "prompt_reused": reused,
+            "reuse_share": reuse_share,
+            # 按本次实测的 prompt 评估速度换算的节省时长
+            "reuse_saved_s": reused / prompt_tps if reused and prompt_tps else None,
+            "eval_tps": sums["eval_tokens"] / sums["eval"] if sums["eval"] else None,
+            "load_s": sums["load"],
+            "cold_loads": sum(1 for t in samples if t.get("load", 0) > COLD_LOAD),
+            **{f"{phase}_share": share[phase] for phase in PHASES},
+            "bottleneck": max(PHASES, key=share.get) if phase_total else None,
+        }
+    return rows
+
+
+def format_timings(rows):
+    """model_timings() 的结果 -> 文本表格"""
+    def rate(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    lines = [f"{'Model':<18} {'n':>5} {'TTFT p50':>9} {'p90':>7} {'prompt t/s':>11} {'reused':>7} {'gen t/s':>8} "
+             f"{'load s':>7} {'cold':>5} {'load/prompt/gen %':>18}  bottleneck"]
+    for model, r in rows.items():
+        split = "/".join(f"{100 * r[f'{phase}_share']:.0f}" for phase in PHASES)
+        reused = f"{100 * r['reuse_share']:.0f}%" if r["reuse_share"] is not None else "-"
+        lines.append(f"{model:<18} {r['samples']:>5} {r['ttft_p50']:>8.2f}s {r['ttft_p90']:>6.2f}s "
+                     f"{rate(r['prompt_tps']):>11} {reused:>7} {rate(r['eval_tps']):>8} {r['load_s']:>7.1f} "
+                     f"{r['cold_loads']:>5} {split:>18}  {r['bottleneck'] or '-'}")
+    reused = [r for r in rows.values() if r["prompt_reused"]]
+    if reused:
+        saved = sum(r["reuse_saved_s"] or 0 for r in reused)
+        lines.append(f"Prompt cache: ~{sum(r['prompt_reused'] for r in reused)} prompt tokens reused "
+                     f"instead of evaluated (~{saved:.1f}s of prompt evaluation saved)")
+    return "\n".join(lines)
+
+
+def timing_report(pairs):
+    """供运行器在结束时打印；没有任何带计时的样本时返回 None"""
+    rows = model_timings(pairs)
+    return format_timings(rows) if rows else None
+
+
+def store_pairs(experiment):
+    """读取某实验的样本存储，返回 [(model, record)]"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "experiments"))
+    from result_store import open_store, DB_FILE
+    import run_experiment
+    import run_ablation
+    import illustrative_comparison
+    runner = {"main": run_experiment, "ablation": run_ablation, "comparison": illustrative_comparison}[experiment]
+    if not os.path.exists(runner.LOG_FILE if runner.RESULT_BACKEND == "jsonl" else DB_FILE):
+        return []  # 只读：不为尚未运行过的实验创建空日志 / 数据库
+    store = open_store(runner.RESULT_BACKEND, runner.LOG_FILE, experiment)
+    try:
+        return [(record["model"], record) for record in store.records()]
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-model latency and throughput from stored Ollama timings")
+    parser.add_argument("--experiments", nargs="+", choices=("main", "ablation", "comparison"),
+                        default=["main", "ablation", "comparison"])
+    args = parser.parse_args()
+
+    for name in args.experiments:
+        report = timing_report(store_pairs(name))
+        print(f"\n[{name}]")
+        print(report or "No samples with Ollama timings")
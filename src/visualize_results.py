@@ -3,12 +3,9 @@
 Generates publication-ready figures from experiment data.
 """
 
-import json
 import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-from collections import defaultdict
 
 # ==========================================
 # ⚙️ CONFIGURATION
@@ -16,10 +13,13 @@ from collections import defaultdict
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(SCRIPT_DIR)
 INPUT_FILE = os.path.join(ROOT_DIR, "data", "experiment_data.json")
+INPUT_DB = os.path.join(ROOT_DIR, "data", "results.db")  # 存在且含主实验样本时优先使用
 OUTPUT_DIR = os.path.join(ROOT_DIR, "figures")
 STATS_OUTPUT = os.path.join(ROOT_DIR, "data", "statistical_summary.md")
 FIGURE_DPI = 150
 FIGURE_STYLE = "seaborn-v0_8-whitegrid"
+PLOT_COLUMNS = ["model", "case", "R", "verdict", "audit_status"]
+VALID_VERDICTS = ["GUILTY", "NOT_GUILTY"]
 
 # Color palette (colorblind-friendly)
 COLORS = {
@@ -31,27 +31,32 @@ COLORS = {
     "phi3:3.8b": "#8c564b"
 }
 
+def pyplot():
+    """
+    matplotlib is imported on first use, not at module import (~0.7s).
+    The figures are only saved, so the Agg backend is selected unless
+    pyplot is already loaded (e.g. inside a notebook).
+    """
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
 def load_data():
-    """Load experiment data"""
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Load the main-experiment sample table (one row per sample, no CoT)"""
+    from sample_table import load_samples
+    return load_samples(PLOT_COLUMNS, db_path=INPUT_DB, json_path=INPUT_FILE)
 
 def plot_r_value_distribution(data, save_path=None):
     """Figure 1: R-value distribution per model"""
+    plt = pyplot()
     if save_path is None:
         save_path = f"{OUTPUT_DIR}/fig_r_distribution.png"
     plt.figure(figsize=(10, 6))
     
-    model_r_values = {}
-    for model, cases in data.items():
-        r_vals = []
-        for case_id, entries in cases.items():
-            for e in entries:
-                r = e.get('R', -1)
-                if r != -1:
-                    r_vals.append(r)
-        if r_vals:
-            model_r_values[model] = r_vals
+    valid_r = data[data['R'] != -1]
+    model_r_values = {m: r.tolist() for m, r in valid_r.groupby('model', sort=False)['R']}
     
     positions = range(len(model_r_values))
     labels = list(model_r_values.keys())
@@ -82,20 +87,15 @@ def plot_r_value_distribution(data, save_path=None):
 
 def plot_verdict_heatmap(data, save_path=None):
     """Figure 2: Verdict consistency heatmap"""
+    plt = pyplot()
     if save_path is None:
         save_path = f"{OUTPUT_DIR}/fig_verdict_heatmap.png"
-    models = list(data.keys())
-    cases = list(set(c for m in data.values() for c in m.keys()))
-    
-    guilty_rates = np.zeros((len(models), len(cases)))
+    models = list(data['model'].unique())
+    cases = list(data['case'].unique())
     
-    for i, model in enumerate(models):
-        for j, case in enumerate(cases):
-            if case in data[model]:
-                entries = data[model][case]
-                verdicts = [e['verdict'] for e in entries if e.get('verdict') in ['GUILTY', 'NOT_GUILTY']]
-                if verdicts:
-                    guilty_rates[i, j] = sum(1 for v in verdicts if v == 'GUILTY') / len(verdicts)
+    valid = data[data['verdict'].isin(VALID_VERDICTS)]
+    rates = (valid['verdict'] == 'GUILTY').groupby([valid['model'], valid['case']]).mean()
+    guilty_rates = rates.unstack().reindex(index=models, columns=cases).fillna(0).to_numpy()
     
     fig, ax = plt.subplots(figsize=(10, 6))
     im = ax.imshow(guilty_rates, cmap='RdYlGn_r', aspect='auto', vmin=0, vmax=1)
@@ -123,6 +123,7 @@ def plot_verdict_heatmap(data, save_path=None):
 
 def plot_rationalization_index(data, save_path=None):
     """Figure 3: Rationalization Index comparison"""
+    plt = pyplot()
     if save_path is None:
         save_path = f"{OUTPUT_DIR}/fig_rationalization_index.png"
     
@@ -135,14 +136,13 @@ def plot_rationalization_index(data, save_path=None):
         epsilon = 0.05
         return r_std / (v_std + epsilon)
     
-    ri_data = defaultdict(dict)
+    ri_data = {}
     
-    for model, cases in data.items():
-        for case_id, entries in cases.items():
-            verdicts = [e['verdict'] for e in entries if e.get('verdict') in ['GUILTY', 'NOT_GUILTY']]
-            r_values = [e.get('R', -1) for e in entries]
-            if verdicts:
-                ri_data[model][case_id] = calc_ri(verdicts, r_values)
+    for (model, case_id), entries in data.groupby(['model', 'case'], sort=False):
+        verdicts = entries.loc[entries['verdict'].isin(VALID_VERDICTS), 'verdict'].tolist()
+        r_values = entries['R'].tolist()
+        if verdicts:
+            ri_data.setdefault(model, {})[case_id] = calc_ri(verdicts, r_values)
     
     models = list(ri_data.keys())
     cases = list(set(c for m in ri_data.values() for c in m.keys()))
@@ -171,17 +171,13 @@ def plot_rationalization_index(data, save_path=None):
 
 def plot_audit_status(data, save_path=None):
     """Figure 4: Audit status breakdown"""
+    import pandas as pd
+    plt = pyplot()
     if save_path is None:
         save_path = f"{OUTPUT_DIR}/fig_audit_status.png"
-    status_counts = defaultdict(lambda: defaultdict(int))
+    status_counts = data.groupby(['model', 'audit_status'], sort=False).size().unstack(fill_value=0)
     
-    for model, cases in data.items():
-        for case_id, entries in cases.items():
-            for e in entries:
-                status = e.get('audit_status', 'UNKNOWN')
-                status_counts[model][status] += 1
-    
-    models = list(status_counts.keys())
+    models = list(status_counts.index)
     statuses = ['EXECUTED', 'RATIONALIZED', 'MISSING_DATA', 'VERDICT_MISSING']
     
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -191,7 +187,7 @@ def plot_audit_status(data, save_path=None):
               'MISSING_DATA': '#7f7f7f', 'VERDICT_MISSING': '#bcbd22'}
     
     for status in statuses:
-        counts = [status_counts[m].get(status, 0) for m in models]
+        counts = status_counts.get(status, pd.Series(0, index=models)).tolist()
         ax.bar([m.split(':')[0] for m in models], counts, bottom=bottom, 
                label=status, color=colors.get(status, '#333333'))
         bottom += counts
@@ -212,17 +208,10 @@ def export_statistical_summary(data, save_path=None):
         save_path = STATS_OUTPUT
     from scipy.stats import sem, ttest_ind, kruskal
     
-    model_r_values = defaultdict(list)
-    model_verdicts = defaultdict(list)
-    
-    for model, cases in data.items():
-        for case_id, entries in cases.items():
-            for e in entries:
-                r_val = e.get('R', -1)
-                if r_val != -1:
-                    model_r_values[model].append(r_val)
-                if e.get('verdict') in ["GUILTY", "NOT_GUILTY"]:
-                    model_verdicts[model].append(1 if e['verdict'] == "GUILTY" else 0)
+    by_model = data.groupby('model', sort=False)
+    model_r_values = {m: r[r != -1].tolist() for m, r in by_model['R'] if (r != -1).any()}
+    model_verdicts = {m: (v[v.isin(VALID_VERDICTS)] == 'GUILTY').astype(int).tolist()
+                      for m, v in by_model['verdict']}
     
     models = list(model_r_values.keys())
     
@@ -279,7 +268,7 @@ def export_statistical_summary(data, save_path=None):
 
 def main():
     """Generate all figures and exports"""
-    import os
+    plt = pyplot()
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     print("📊 Entropy Jurisprudence - Visualization")
@@ -291,7 +280,7 @@ def main():
         pass  # Use default style if not available
     
     data = load_data()
-    print(f"Loaded data for {len(data)} models")
+    print(f"Loaded {len(data)} samples for {data['model'].nunique()} models")
     
     plot_r_value_distribution(data)
     plot_verdict_heatmap(data)